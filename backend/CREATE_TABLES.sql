@@ -1,83 +1,126 @@
 -- PostgreSQL Table Creation Script
 -- Masbanat AL-Akhawayn Laundry Booking System
+--
+-- Mirrors models.py. The app creates the same schema itself (db.create_all()
+-- plus migrations.py) when DATABASE_URL points at Postgres, so this script is
+-- only needed to prepare a database by hand.
+
+-- Enum types (SQLAlchemy stores the enum member names)
+CREATE TYPE userrole AS ENUM ('STUDENT', 'ATTENDANT', 'ADMIN');
+CREATE TYPE bookingstatus AS ENUM ('CONFIRMED', 'RECEIVED', 'WASHING', 'COMPLETED', 'NO_SHOW', 'CANCELLED');
+CREATE TYPE loadtype AS ENUM ('COMBINED', 'SEPARATE_WHITES', 'SEPARATE_COLORS');
+CREATE TYPE waitliststatus AS ENUM ('WAITING', 'PROMOTED', 'EXPIRED');
+CREATE TYPE emailstatus AS ENUM ('PENDING', 'SENDING', 'SENT', 'DEAD');
 
 -- Create Users Table
 CREATE TABLE users (
     id SERIAL PRIMARY KEY,
-    student_id VARCHAR(20) UNIQUE NOT NULL,
-    email VARCHAR(255) UNIQUE NOT NULL,
-    password_hash VARCHAR(255) NOT NULL,
-    full_name VARCHAR(100) NOT NULL,
-    phone_number VARCHAR(15),
-    user_type VARCHAR(20) CHECK (user_type IN ('student', 'staff', 'admin')) DEFAULT 'student',
-    is_active BOOLEAN DEFAULT TRUE,
+    email VARCHAR(120) UNIQUE NOT NULL,
+    password VARCHAR(255) NOT NULL,
+    student_id VARCHAR(50) UNIQUE,
+    full_name VARCHAR(100),
+    phone VARCHAR(20),
+    role userrole NOT NULL DEFAULT 'STUDENT',
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
 -- Create Machines Table
 CREATE TABLE machines (
     id SERIAL PRIMARY KEY,
-    machine_number INTEGER UNIQUE NOT NULL,
-    machine_name VARCHAR(50) NOT NULL,
-    status VARCHAR(20) CHECK (status IN ('available', 'in_use', 'maintenance')) DEFAULT 'available',
-    pair_group INTEGER NOT NULL,
-    location VARCHAR(100) DEFAULT 'Laundry Room',
+    machine_number INTEGER NOT NULL,
+    pair_id INTEGER NOT NULL,
+    status VARCHAR(20) DEFAULT 'available',  -- available, out_of_order, maintenance
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
 -- Create Time Slots Table
 CREATE TABLE time_slots (
     id SERIAL PRIMARY KEY,
-    start_time TIME NOT NULL,
-    end_time TIME NOT NULL,
-    slot_date DATE NOT NULL,
-    machine_id INTEGER REFERENCES machines(id),
-    is_available BOOLEAN DEFAULT TRUE,
-    UNIQUE(machine_id, slot_date, start_time)
+    pair_id INTEGER NOT NULL,
+    date DATE NOT NULL,
+    start_time TIMESTAMP NOT NULL,
+    end_time TIMESTAMP NOT NULL,
+    available_machines INTEGER DEFAULT 2,          -- 0 when disabled by admin
+    booked_machines INTEGER NOT NULL DEFAULT 0,    -- machines held by active bookings
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT unique_pair_time UNIQUE (pair_id, start_time)
 );
 
+CREATE INDEX ix_time_slots_date_pair ON time_slots (date, pair_id);
+CREATE INDEX ix_time_slots_date_start ON time_slots (date, start_time);
+
 -- Create Bookings Table
 CREATE TABLE bookings (
     id SERIAL PRIMARY KEY,
-    user_id INTEGER REFERENCES users(id),
-    machine_id INTEGER REFERENCES machines(id),
-    time_slot_id INTEGER REFERENCES time_slots(id),
-    wash_type VARCHAR(20) CHECK (wash_type IN ('mixed', 'separate')) NOT NULL,
-    status VARCHAR(20) CHECK (status IN ('confirmed', 'completed', 'cancelled', 'no_show')) DEFAULT 'confirmed',
-    clothes_description TEXT,
-    booking_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    scheduled_time TIMESTAMP NOT NULL,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    ticket_id VARCHAR(36) UNIQUE NOT NULL,
+    user_id INTEGER NOT NULL REFERENCES users(id),
+    slot_id INTEGER NOT NULL REFERENCES time_slots(id),
+    load_type loadtype NOT NULL DEFAULT 'COMBINED',
+    status bookingstatus NOT NULL DEFAULT 'CONFIRMED',
+    drop_off_time TIMESTAMP,
+    machines_used INTEGER DEFAULT 1,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+CREATE INDEX ix_bookings_slot_status ON bookings (slot_id, status);
+CREATE INDEX ix_bookings_user_status ON bookings (user_id, status);
+CREATE INDEX ix_bookings_created_at ON bookings (created_at);  -- Recent bookings (sort=created)
+
 -- Create Waitlist Table
 CREATE TABLE waitlist (
     id SERIAL PRIMARY KEY,
-    user_id INTEGER REFERENCES users(id),
-    preferred_date DATE NOT NULL,
-    preferred_time TIME NOT NULL,
-    wash_type VARCHAR(20) CHECK (wash_type IN ('mixed', 'separate')) NOT NULL,
-    status VARCHAR(20) CHECK (status IN ('waiting', 'notified', 'cancelled')) DEFAULT 'waiting',
-    position INTEGER,
+    user_id INTEGER NOT NULL REFERENCES users(id),
+    slot_id INTEGER NOT NULL REFERENCES time_slots(id),
+    position INTEGER NOT NULL, -- Immutable enqueue sequence; queue position is derived on read
+    status waitliststatus NOT NULL DEFAULT 'WAITING',
+    load_type loadtype NOT NULL DEFAULT 'COMBINED',
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
--- Insert Sample Machines
-INSERT INTO machines (machine_number, machine_name, pair_group) VALUES
-(1, 'Washer 1 - Pair A', 1),
-(2, 'Washer 2 - Pair A', 1),
-(3, 'Washer 3 - Pair B', 2),
-(4, 'Washer 4 - Pair B', 2),
-(5, 'Washer 5 - Pair C', 3),
-(6, 'Washer 6 - Pair C', 3),
-(7, 'Washer 7 - Pair D', 4),
-(8, 'Washer 8 - Pair D', 4),
-(9, 'Washer 9 - Pair E', 5),
-(10, 'Washer 10 - Pair E', 5);
+CREATE INDEX ix_waitlist_slot_status_position ON waitlist (slot_id, status, position);
+CREATE INDEX ix_waitlist_user_status ON waitlist (user_id, status);
+CREATE INDEX ix_waitlist_waiting_slot ON waitlist (slot_id, position) WHERE status = 'WAITING';
+
+-- Create Email Outbox Table (sent by the worker pool in services/email_outbox.py)
+CREATE TABLE email_outbox (
+    id SERIAL PRIMARY KEY,
+    recipients TEXT NOT NULL,
+    subject VARCHAR(255) NOT NULL,
+    text_body TEXT,
+    html_body TEXT,
+    template VARCHAR(50),              -- rendered by the worker when set
+    context TEXT,                      -- JSON values for the template
+    status emailstatus NOT NULL DEFAULT 'PENDING',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    claim_token VARCHAR(36),
+    claimed_at TIMESTAMP,
+    last_error TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    sent_at TIMESTAMP
+);
+
+CREATE INDEX ix_email_outbox_status_next_attempt ON email_outbox (status, next_attempt_at);
+CREATE INDEX ix_email_outbox_claim_token ON email_outbox (claim_token);
+
+-- Create Data Versions Table (ETags for slot and machine listings, services/data_versions.py)
+CREATE TABLE data_versions (
+    resource VARCHAR(50) PRIMARY KEY,  -- 'slots:<date>', 'slots:*' or 'machines'
+    version INTEGER NOT NULL DEFAULT 0
+);
+
+-- Insert Machines (5 pairs: 1&2, 3&4, 5&6, 7&8, 9&10)
+INSERT INTO machines (machine_number, pair_id) VALUES
+(1, 1), (2, 1),
+(3, 2), (4, 2),
+(5, 3), (6, 3),
+(7, 4), (8, 4),
+(9, 5), (10, 5);
 
--- Insert Admin User
-INSERT INTO users (student_id, email, password_hash, full_name, user_type) VALUES
-('admin001', 'admin@aui.ma', 'hashed_password_123', 'System Administrator', 'admin');
+-- Insert Admin User (change the password!)
+INSERT INTO users (email, password, student_id, full_name, role) VALUES
+('admin@laundry.com', 'admin123', 'ADMIN001', 'Admin User', 'ADMIN');
 
 -- Display created tables
 SELECT 'Database tables created successfully!' as message;
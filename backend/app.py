@@ -1,44 +1,61 @@
+"""
+Laundry booking API
+
+create_app() builds the Flask app: configuration, the database binding,
+CORS, metrics and the routes below. It does not touch the schema, add
+data or start threads, so gunicorn workers and scripts start in
+milliseconds. The rest are explicit commands:
+
+    flask --app app init-data       migrations, machines, 15 days of slots
+    flask --app app run-scheduler   slot generation, no-show sweeps and the
+                                    email workers, in one dedicated process
+    python app.py                   development server doing all of the above
+
+flask_mail and apscheduler are only imported by the processes that send
+mail or run jobs.
+"""
+
 import os
-from flask import Flask, request, jsonify
+from flask import Blueprint, Flask, Response, current_app, request, jsonify
+from flask.cli import with_appcontext
 from flask_cors import CORS
+import click
 import jwt
 from functools import wraps
+from sqlalchemy.orm import contains_eager, joinedload
 from datetime import datetime, timedelta
-from apscheduler.schedulers.background import BackgroundScheduler
-from apscheduler.triggers.cron import CronTrigger
-from flask_mail import Mail, Message
-from threading import Thread
-
-# Create Flask app FIRST
-app = Flask(__name__)
-
-# Set secret key and other configs
-app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'your-secret-key-change-in-production')
-
-# Email Configuration
-app.config['MAIL_SERVER'] = 'smtp.mailersend.net'
-app.config['MAIL_PORT'] = 2525
-app.config['MAIL_USE_TLS'] = True
-app.config['MAIL_USERNAME'] = 'username' # for security reason I won't provide the info here
-app.config['MAIL_PASSWORD'] = 'password'
-app.config['MAIL_DEFAULT_SENDER'] = 'noreply@domainname.com'
-
-mail = Mail(app)
-
-# NOW import database and initialize it
+import atexit
+import hashlib
+import logging
+import time
+from logging_config import configure_logging, SAMPLED
 from database import db, init_db
-
-# Initialize database - this sets SQLALCHEMY_DATABASE_URI and calls db.init_app(app)
-db_path = init_db(app)
-
-# Initialize CORS AFTER database is set up
-CORS(app, resources={r"/api/*": {"origins": "*"}})
-
-# NOW import models AFTER db is initialized
 from models import User, Booking, TimeSlot, Machine, Waitlist, UserRole, BookingStatus, LoadType, WaitlistStatus
 
 # Import slot generator functions
-from services.slot_generator import generate_daily_slots, initialize_machines
+from services.slot_generator import generate_slot_horizon, initialize_machines
+from services.availability import get_slot_availability
+from services.admin_stats import get_admin_stats, parse_windows
+from services.booking_queries import booking_rows, count_bookings, get_booking_page, parse_booking_filters, parse_page_size, parse_sort
+from migrations import run_migrations
+from services.occupancy import free_machines, set_booking_status
+from services.admission import admit_booking
+from services.waitlist_service import get_waitlist_position, promote_from_waitlist, slots_waited_by, waiting_entries_with_position
+from services.auth_cache import get_authenticated_user
+from services.data_versions import get_versions, slot_resource
+from services.live_updates import LIVE_TOKEN_SCOPE, LIVE_TOKEN_SECONDS, broker, stream_events, version_watcher
+from services.email_outbox import EmailWorkerPool, enqueue_email, enqueue_template_email
+from services.email_templates import booking_email_context
+from services.metrics import METRICS_ENABLED, CONTENT_TYPE as METRICS_CONTENT_TYPE, init_metrics, render_metrics
+from services.scheduler import create_scheduler, timed_job
+# @query_budget: SQL statements a route may run, enforced by check_query_budgets.py
+from services.query_budget import query_budget
+
+# A fixed name: under `python app.py` __name__ is '__main__', and LOG_LEVELS="app=..." must still apply
+logger = logging.getLogger('app')
+
+# Every route of the API, registered by create_app()
+api = Blueprint('api', __name__)
 
 # Operational hours configuration
 OPERATIONAL_HOURS = {
@@ -51,410 +68,71 @@ OPERATIONAL_HOURS = {
     6: None  # Sunday - Closed
 }
 
+# Days ahead that always have slots
+SLOT_HORIZON_DAYS = 15
+
 
-def auto_generate_slots():
+@timed_job('auto_generate_slots')
+def auto_generate_slots(app=None):
     """
     Automatically generate time slots for the next 15 days
     This runs daily to ensure slots are always available
+    Dates that already have slots are left as they are
     """
-    print("=== AUTO GENERATE SLOTS STARTED ===")
+    logger.info("Auto slot generation started")
+    app = app or current_app._get_current_object()
     with app.app_context():
         try:
-            print(f"Database path: {app.config['SQLALCHEMY_DATABASE_URI']}")
-            today = datetime.now().date()
-            slots_generated = 0
-
-            for day_offset in range(15):
-                target_date = today + timedelta(days=day_offset)
-                day_of_week = target_date.weekday()
-
-                # Skip if it's Sunday or if operational hours are not set
-                if OPERATIONAL_HOURS.get(day_of_week) is None:
-                    print(f"Skipping {target_date} (Sunday - Closed)")
-                    continue
-
-                operational_hours = OPERATIONAL_HOURS[day_of_week]
-
-                # Check if slots already exist for this date
-                existing_slots = TimeSlot.query.filter_by(date=target_date).count()
-
-                if existing_slots == 0:
-                    count = generate_daily_slots(
-                        date=target_date,
-                        operational_hours=operational_hours,
-                        slot_duration_minutes=60
-                    )
-                    slots_generated += count
-                    print(f"Generated {count} slots for {target_date}")
-                else:
-                    print(f"Slots already exist for {target_date}")
-
-            print(f"Auto-generation complete: {slots_generated} total slots created")
-
-        except Exception as e:
-            print(f"Error in auto_generate_slots: {str(e)}")
-
+            slots_generated = generate_slot_horizon(
+                start_date=datetime.now().date(),
+                days=SLOT_HORIZON_DAYS,
+                hours_by_weekday=OPERATIONAL_HOURS,
+                slot_duration_minutes=60
+            )
+            logger.info("Auto-generation complete: %d total slots created", slots_generated)
 
-# Initialize scheduler
-scheduler = BackgroundScheduler()
-scheduler.add_job(
-    func=auto_generate_slots,
-    trigger=CronTrigger(hour=3, minute=31),  # Run daily at 12:05 AM
-    id='auto_generate_slots',
-    name='Generate time slots for next 15 days',
-    replace_existing=True
-)
-
-
-def send_async_email(app, msg):
-    """Send email asynchronously"""
-    with app.app_context():
-        try:
-            print(f"=== ATTEMPTING TO SEND EMAIL ===")
-            print(f"From: {msg.sender}")
-            print(f"To: {msg.recipients}")
-            print(f"Subject: {msg.subject}")
-            print(f"SMTP Server: {app.config['MAIL_SERVER']}")
-            print(f"SMTP Port: {app.config['MAIL_PORT']}")
-            print(f"SMTP Username: {app.config['MAIL_USERNAME']}")
-
-            mail.send(msg)
-            print(f"✅ Email sent successfully to {msg.recipients}")
-        except Exception as e:
-            print(f"❌ Failed to send email: {str(e)}")
-            print(f"Error type: {type(e).__name__}")
-            import traceback
-            traceback.print_exc()
+        except Exception:
+            logger.exception("Error in auto_generate_slots")
 
 
 def send_email(subject, recipients, text_body, html_body):
-    """Send email with both text and HTML versions"""
-    print(f"\n=== SEND_EMAIL FUNCTION CALLED ===")
-    print(f"Subject: {subject}")
-    print(f"Recipients: {recipients}")
-
+    """
+    Queue an email with both text and HTML versions in the outbox
+    The row joins the caller's transaction and is sent once that commits
+    """
     try:
-        msg = Message(subject, recipients=recipients)
-        msg.body = text_body
-        msg.html = html_body
-        print(f"Message object created successfully")
-
-        # Send asynchronously to avoid blocking the request
-        Thread(target=send_async_email, args=(app, msg)).start()
-        print(f"Email thread started")
-    except Exception as e:
-        print(f"❌ Error in send_email: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        # Stored in email_outbox and sent by the worker pool, never on the request thread
+        enqueue_email(subject, recipients, text_body, html_body)
+        logger.debug("Queued email '%s' to %s", subject, recipients)
+    except Exception:
+        logger.exception("Error in send_email")
 
 
 def send_booking_confirmation_email(user, booking, slot):
     """Send booking confirmation email to user"""
-    subject = f"Booking Confirmed - Ticket #{booking.ticket_id}"
-
-    # Format time for display
-    start_time = slot.start_time.strftime("%I:%M %p")
-    end_time = slot.end_time.strftime("%I:%M %p")
-    date = slot.date.strftime("%B %d, %Y")
-
-    # Text version
-    text_body = f"""
-Hello {user.full_name},
-
-Your laundry booking has been confirmed!
-
-Booking Details:
-- Ticket ID: {booking.ticket_id}
-- Date: {date}
-- Time: {start_time} - {end_time}
-- Machine Pair: {slot.pair_id}
-- Load Type: {booking.load_type.value.replace('_', ' ').title()}
-- Machines Used: {booking.machines_used}
-
-Please arrive on time and present your ticket ID at the laundry facility.
-
-Important Reminders:
-- Arrive at least 5 minutes before your scheduled time
-- Bring your laundry detergent and fabric softener
-- Maximum load capacity per machine: 10kg
-- Don't forget to collect your laundry after the cycle
-
-Thank you for using our laundry service!
-
-Best regards,
-Laundry Management Team
-"""
-
-    # HTML version
-    html_body = f"""
-<!DOCTYPE html>
-<html>
-<head>
-    <style>
-        body {{
-            font-family: Arial, sans-serif;
-            line-height: 1.6;
-            color: #333;
-        }}
-        .container {{
-            max-width: 600px;
-            margin: 0 auto;
-            padding: 20px;
-            background-color: #f9f9f9;
-        }}
-        .header {{
-            background-color: #4CAF50;
-            color: white;
-            padding: 20px;
-            text-align: center;
-            border-radius: 8px 8px 0 0;
-        }}
-        .content {{
-            background-color: white;
-            padding: 30px;
-            border-radius: 0 0 8px 8px;
-        }}
-        .ticket-box {{
-            background-color: #e8f5e9;
-            border-left: 4px solid #4CAF50;
-            padding: 20px;
-            margin: 20px 0;
-        }}
-        .detail-row {{
-            display: flex;
-            justify-content: space-between;
-            padding: 10px 0;
-            border-bottom: 1px solid #eee;
-        }}
-        .detail-label {{
-            font-weight: bold;
-            color: #666;
-        }}
-        .detail-value {{
-            color: #333;
-        }}
-        .reminder-box {{
-            background-color: #fff3cd;
-            border-left: 4px solid #ffc107;
-            padding: 15px;
-            margin: 20px 0;
-        }}
-        .footer {{
-            text-align: center;
-            margin-top: 20px;
-            color: #666;
-            font-size: 12px;
-        }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="header">
-            <h1>🧺 Booking Confirmed!</h1>
-        </div>
-        <div class="content">
-            <p>Hello <strong>{user.full_name}</strong>,</p>
-            <p>Your laundry booking has been confirmed successfully!</p>
-
-            <div class="ticket-box">
-                <h2 style="margin-top: 0; color: #4CAF50;">Booking Details</h2>
-                <div class="detail-row">
-                    <span class="detail-label">🎫 Ticket ID:</span>
-                    <span class="detail-value"><strong>{booking.ticket_id}</strong></span>
-                </div>
-                <div class="detail-row">
-                    <span class="detail-label">📅 Date:</span>
-                    <span class="detail-value">{date}</span>
-                </div>
-                <div class="detail-row">
-                    <span class="detail-label">🕐 Time:</span>
-                    <span class="detail-value">{start_time} - {end_time}</span>
-                </div>
-                <div class="detail-row">
-                    <span class="detail-label">🔧 Machine Pair:</span>
-                    <span class="detail-value">Pair #{slot.pair_id}</span>
-                </div>
-                <div class="detail-row">
-                    <span class="detail-label">🧺 Load Type:</span>
-                    <span class="detail-value">{booking.load_type.value.replace('_', ' ').title()}</span>
-                </div>
-                <div class="detail-row">
-                    <span class="detail-label">🔢 Machines Used:</span>
-                    <span class="detail-value">{booking.machines_used}</span>
-                </div>
-            </div>
-
-            <div class="reminder-box">
-                <h3 style="margin-top: 0;">⚠️ Important Reminders:</h3>
-                <ul>
-                    <li>Arrive at least <strong>5 minutes before</strong> your scheduled time</li>
-                    <li>Bring your <strong>laundry detergent</strong> and fabric softener</li>
-                    <li>Maximum load capacity per machine: <strong>10kg</strong></li>
-                    <li>Present your <strong>Ticket ID</strong> at the facility</li>
-                    <li>Don't forget to <strong>collect your laundry</strong> after the cycle</li>
-                </ul>
-            </div>
-
-            <p>Thank you for using our laundry service!</p>
-            <p><strong>Best regards,</strong><br>Laundry Management Team</p>
-        </div>
-        <div class="footer">
-            <p>This is an automated message, please do not reply to this email.</p>
-        </div>
-    </div>
-</body>
-</html>
-"""
-
-    send_email(subject, [user.email], text_body, html_body)
+    send_template_email('booking_confirmation', user, booking, slot)
 
 
 def send_booking_completed_email(user, booking, slot):
     """Send booking completion notification email to user"""
-    subject = f"Laundry Completed - Ticket #{booking.ticket_id}"
-
-    # Format time for display
-    start_time = slot.start_time.strftime("%I:%M %p")
-    end_time = slot.end_time.strftime("%I:%M %p")
-    date = slot.date.strftime("%B %d, %Y")
-
-    # Text version
-    text_body = f"""
-Hello {user.full_name},
-
-Good news! Your laundry has been completed and is ready for pickup.
+    send_template_email('booking_completed', user, booking, slot)
 
-Booking Details:
-- Ticket ID: {booking.ticket_id}
-- Date: {date}
-- Time Slot: {start_time} - {end_time}
-- Machine Pair: {slot.pair_id}
-- Load Type: {booking.load_type.value.replace('_', ' ').title()}
 
-Please collect your laundry as soon as possible.
+def send_booking_cancelled_email(user, booking, slot):
+    """Send booking cancellation confirmation email to user"""
+    send_template_email('booking_cancelled', user, booking, slot)
 
-⏰ Reminder: Laundry left uncollected for more than 2 hours may be removed to free up space.
 
-Thank you for using our laundry service!
-
-Best regards,
-Laundry Management Team
-"""
-
-    # HTML version
-    html_body = f"""
-<!DOCTYPE html>
-<html>
-<head>
-    <style>
-        body {{
-            font-family: Arial, sans-serif;
-            line-height: 1.6;
-            color: #333;
-        }}
-        .container {{
-            max-width: 600px;
-            margin: 0 auto;
-            padding: 20px;
-            background-color: #f9f9f9;
-        }}
-        .header {{
-            background-color: #2196F3;
-            color: white;
-            padding: 20px;
-            text-align: center;
-            border-radius: 8px 8px 0 0;
-        }}
-        .content {{
-            background-color: white;
-            padding: 30px;
-            border-radius: 0 0 8px 8px;
-        }}
-        .completed-box {{
-            background-color: #e3f2fd;
-            border-left: 4px solid #2196F3;
-            padding: 20px;
-            margin: 20px 0;
-            text-align: center;
-        }}
-        .detail-row {{
-            display: flex;
-            justify-content: space-between;
-            padding: 10px 0;
-            border-bottom: 1px solid #eee;
-        }}
-        .detail-label {{
-            font-weight: bold;
-            color: #666;
-        }}
-        .detail-value {{
-            color: #333;
-        }}
-        .warning-box {{
-            background-color: #fff3cd;
-            border-left: 4px solid #ffc107;
-            padding: 15px;
-            margin: 20px 0;
-        }}
-        .footer {{
-            text-align: center;
-            margin-top: 20px;
-            color: #666;
-            font-size: 12px;
-        }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="header">
-            <h1>✅ Laundry Completed!</h1>
-        </div>
-        <div class="content">
-            <p>Hello <strong>{user.full_name}</strong>,</p>
-
-            <div class="completed-box">
-                <h2 style="margin: 0; color: #2196F3;">🎉 Your laundry is ready for pickup!</h2>
-            </div>
-
-            <h3>Booking Details:</h3>
-            <div class="detail-row">
-                <span class="detail-label">🎫 Ticket ID:</span>
-                <span class="detail-value"><strong>{booking.ticket_id}</strong></span>
-            </div>
-            <div class="detail-row">
-                <span class="detail-label">📅 Date:</span>
-                <span class="detail-value">{date}</span>
-            </div>
-            <div class="detail-row">
-                <span class="detail-label">🕐 Time Slot:</span>
-                <span class="detail-value">{start_time} - {end_time}</span>
-            </div>
-            <div class="detail-row">
-                <span class="detail-label">🔧 Machine Pair:</span>
-                <span class="detail-value">Pair #{slot.pair_id}</span>
-            </div>
-            <div class="detail-row">
-                <span class="detail-label">🧺 Load Type:</span>
-                <span class="detail-value">{booking.load_type.value.replace('_', ' ').title()}</span>
-            </div>
-
-            <div class="warning-box">
-                <h3 style="margin-top: 0;">⏰ Important Reminder:</h3>
-                <p style="margin: 0;">Please collect your laundry as soon as possible. Laundry left uncollected for more than <strong>2 hours</strong> may be removed to free up space for other users.</p>
-            </div>
-
-            <p>Thank you for using our laundry service!</p>
-            <p><strong>Best regards,</strong><br>Laundry Management Team</p>
-        </div>
-        <div class="footer">
-            <p>This is an automated message, please do not reply to this email.</p>
-        </div>
-    </div>
-</body>
-</html>
-"""
-
-    send_email(subject, [user.email], text_body, html_body)
+def send_template_email(template, user, booking, slot):
+    """
+    Queue a templated email in the caller's transaction; the body is
+    rendered by the outbox worker
+    """
+    try:
+        enqueue_template_email(template, [user.email], booking_email_context(user, booking, slot))
+        logger.debug("Queued %s email to %s", template, user.email)
+    except Exception:
+        logger.exception("Error queueing %s email", template)
 
 # Authentication decorator
 def token_required(f):
@@ -466,8 +144,11 @@ def token_required(f):
         try:
             if token.startswith('Bearer '):
                 token = token[7:]
-            data = jwt.decode(token, app.config['SECRET_KEY'], algorithms=["HS256"])
-            current_user = User.query.get(data['user_id'])
+            data = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=["HS256"])
+            # Stream tokens only open /api/live/availability
+            if data.get('scope') == LIVE_TOKEN_SCOPE:
+                return jsonify({'message': 'Token is invalid'}), 401
+            current_user = get_authenticated_user(data['user_id'], token)
         except:
             return jsonify({'message': 'Token is invalid'}), 401
         return f(current_user, *args, **kwargs)
@@ -488,8 +169,55 @@ def role_required(*roles):
     return decorator
 
 
+# Students see slots appear and drop off as the 2-hour cutoff moves, so
+# their ETags also change once per bucket
+STUDENT_ETAG_BUCKET_SECONDS = 60
+
+
+def requested_slot_dates():
+    """Version resource of the slots a request lists: its ?date=, or every date"""
+    try:
+        return slot_resource(datetime.strptime(request.args['date'], '%Y-%m-%d').date())
+    except (KeyError, ValueError):
+        return 'slots'
+
+
+def conditional_get(*resources):
+    """
+    Serve a strong ETag built from the data versions of resources
+    (names, or callables returning the name for the current request)
+    A request whose If-None-Match still matches gets 304 before the view
+    runs any query; the versions are read first so the ETag is never newer
+    than the body it is sent with
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(current_user, *args, **kwargs):
+            versions = get_versions(*(resource() if callable(resource) else resource for resource in resources))
+            parts = [request.path, current_user.role.value, sorted(request.args.items(multi=True)), sorted(versions.items())]
+            if current_user.role == UserRole.STUDENT:
+                parts.append(int(time.time() // STUDENT_ETAG_BUCKET_SECONDS))
+            etag = hashlib.sha1(repr(parts).encode()).hexdigest()
+
+            if request.if_none_match.contains(etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = current_app.make_response(f(current_user, *args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            # Let browsers keep the body but always revalidate it
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+
+        return decorated_function
+
+    return decorator
+
+
 # Auth Routes
-@app.route('/api/auth/register', methods=['POST'])
+@api.route('/api/auth/register', methods=['POST'])
+@query_budget(5)
 def register():
     data = request.get_json()
 
@@ -518,7 +246,7 @@ def register():
     token = jwt.encode({
         'user_id': new_user.id,
         'exp': datetime.utcnow() + timedelta(days=7)
-    }, app.config['SECRET_KEY'], algorithm="HS256")
+    }, current_app.config['SECRET_KEY'], algorithm="HS256")
 
     return jsonify({
         'message': 'Registration successful',
@@ -532,7 +260,8 @@ def register():
     }), 201
 
 
-@app.route('/api/auth/login', methods=['POST'])
+@api.route('/api/auth/login', methods=['POST'])
+@query_budget(2)
 def login():
     data = request.get_json()
     user = User.query.filter_by(email=data['email']).first()
@@ -543,7 +272,7 @@ def login():
     token = jwt.encode({
         'user_id': user.id,
         'exp': datetime.utcnow() + timedelta(days=7)
-    }, app.config['SECRET_KEY'], algorithm="HS256")
+    }, current_app.config['SECRET_KEY'], algorithm="HS256")
 
     return jsonify({
         'token': token,
@@ -561,33 +290,27 @@ def login():
 
 # Time Slots Routes
 
-@app.route('/api/timeslots', methods=['GET'])
+@api.route('/api/timeslots', methods=['GET'])
+@query_budget(4)
 @token_required
+@conditional_get(requested_slot_dates, 'machines')
 def get_timeslots(current_user):
     date_str = request.args.get('date')
     pair_id = request.args.get('pair_id')
 
-    query = TimeSlot.query
-    if date_str:
-        date = datetime.strptime(date_str, '%Y-%m-%d').date()
-        query = query.filter_by(date=date)
-    if pair_id:
-        query = query.filter_by(pair_id=int(pair_id))
-
-    slots = query.all()
+    date = datetime.strptime(date_str, '%Y-%m-%d').date() if date_str else None
+    slots = get_slot_availability(date=date, pair_id=int(pair_id) if pair_id else None)
     now = datetime.now()
 
     available_slots = []
     for slot in slots:
-        # Refresh the slot from database to get current value
-        db.session.refresh(slot)
         is_disabled = (slot.available_machines == 0)
 
         # For STUDENTS: Apply TIME filters only, but include all slots (even full ones)
         if current_user.role == UserRole.STUDENT:
             # Skip ONLY disabled slots (admin manually disabled)
             if is_disabled:
-                print(f"Skipping disabled slot {slot.id} for student")
+                logger.debug("Skipping disabled slot %s for student", slot.id, extra=SAMPLED)
                 continue
 
             # Skip slots that are in the past or less than 2 hours from now
@@ -598,25 +321,19 @@ def get_timeslots(current_user):
             elif slot.date < now.date():
                 continue
 
-        # Get machines for this slot's pair
-        available_machines_in_pair = Machine.query.filter_by(
-            pair_id=slot.pair_id,
-            status='available'
-        ).count()
-
-        total_machines_in_pair = Machine.query.filter_by(
-            pair_id=slot.pair_id
-        ).count()
+        # Machine counts for this slot's pair come from the aggregated query
+        available_machines_in_pair = slot.working_machines
+        total_machines_in_pair = slot.total_machines
 
-        print(
-            f"Slot {slot.id} - Pair {slot.pair_id}: {available_machines_in_pair}/{total_machines_in_pair} machines available (not in maintenance)")
+        logger.debug("Slot %s - Pair %s: %s/%s machines available (not in maintenance)",
+                     slot.id, slot.pair_id, available_machines_in_pair, total_machines_in_pair, extra=SAMPLED)
 
         # CRITICAL FIX: Separate "machines in maintenance" from "slot full"
         # If ALL machines are in maintenance, this is different from "slot is full"
         all_machines_in_maintenance = (available_machines_in_pair == 0)
 
         if all_machines_in_maintenance:
-            print(f"All machines in pair {slot.pair_id} are in maintenance")
+            logger.debug("All machines in pair %s are in maintenance", slot.pair_id, extra=SAMPLED)
             if current_user.role == UserRole.STUDENT:
                 # Don't show to students - they can't book OR join waitlist
                 continue
@@ -637,20 +354,11 @@ def get_timeslots(current_user):
                 })
                 continue
 
-        # Calculate actual available machines based on confirmed bookings
-        confirmed_bookings = Booking.query.filter_by(
-            slot_id=slot.id
-        ).filter(
-            Booking.status.in_([BookingStatus.CONFIRMED, BookingStatus.RECEIVED, BookingStatus.WASHING])
-        ).all()
-
-        total_machines_used = sum(booking.machines_used for booking in confirmed_bookings)
+        # Machines used by active bookings, kept on the slot's occupancy counter
+        total_machines_used = slot.machines_used
 
-        # Calculate available based on working machines minus bookings
-        if is_disabled:
-            actual_available = 0
-        else:
-            actual_available = max(0, available_machines_in_pair - total_machines_used)
+        # Capacity capped by working machines, minus bookings (0 once disabled)
+        actual_available = free_machines(slot.available_machines, total_machines_used, available_machines_in_pair)
 
         # CRITICAL: Determine if slot is "full due to bookings" vs "unavailable due to maintenance"
         slot_full_due_to_bookings = (actual_available == 0 and not is_disabled and not all_machines_in_maintenance)
@@ -668,14 +376,83 @@ def get_timeslots(current_user):
             'machines_in_maintenance': all_machines_in_maintenance
         }
 
-        print(
-            f"Slot {slot.id}: available={actual_available}, total={available_machines_in_pair}, is_full={slot_full_due_to_bookings}, maintenance={all_machines_in_maintenance}")
+        logger.debug("Slot %s: available=%s, total=%s, is_full=%s, maintenance=%s",
+                     slot.id, actual_available, available_machines_in_pair,
+                     slot_full_due_to_bookings, all_machines_in_maintenance, extra=SAMPLED)
         available_slots.append(slot_data)
 
-    print(f"Returning {len(available_slots)} slots for {current_user.role.value}")
+    logger.debug("Returning %d slots for %s", len(available_slots), current_user.role.value)
     return jsonify(available_slots)
 
-@app.route('/api/timeslots/<int:slot_id>', methods=['DELETE'])
+@api.route('/api/live/token', methods=['POST'])
+@query_budget(2)
+@token_required
+def live_token(current_user):
+    """
+    Short-lived token for /api/live/availability
+    EventSource cannot send headers, so the stream takes its token in the
+    query string, where access logs and proxies see it; this one expires
+    after LIVE_TOKEN_SECONDS and is refused by every other route
+    """
+    token = jwt.encode({
+        'user_id': current_user.id,
+        'scope': LIVE_TOKEN_SCOPE,
+        'exp': datetime.utcnow() + timedelta(seconds=LIVE_TOKEN_SECONDS)
+    }, current_app.config['SECRET_KEY'], algorithm="HS256")
+    return jsonify({'token': token, 'expires_in': LIVE_TOKEN_SECONDS})
+
+
+@api.route('/api/live/availability', methods=['GET'])
+@query_budget(3)
+def live_availability():
+    """
+    Server-Sent Events stream of slot, booking and machine changes
+    Authenticated with a stream token from POST /api/live/token as ?token=
+    (or a regular token in the Authorization header);
+    ?date=YYYY-MM-DD[,YYYY-MM-DD] limits slot and booking events to those dates
+    """
+    token = request.args.get('token')
+    header = request.headers.get('Authorization', '')
+    if not token and header.startswith('Bearer '):
+        token = header[7:]
+    if not token:
+        return jsonify({'message': 'Token is missing'}), 401
+    try:
+        data = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=["HS256"])
+        # Long-lived tokens must not travel in the URL
+        if request.args.get('token') and data.get('scope') != LIVE_TOKEN_SCOPE:
+            return jsonify({'message': 'Use a stream token from /api/live/token'}), 401
+        current_user = get_authenticated_user(data['user_id'], token)
+    except:
+        return jsonify({'message': 'Token is invalid'}), 401
+
+    dates = None
+    if request.args.get('date'):
+        try:
+            dates = {datetime.strptime(value.strip(), '%Y-%m-%d').date().isoformat()
+                     for value in request.args['date'].split(',')}
+        except ValueError:
+            return jsonify({'message': 'date must be one or more YYYY-MM-DD dates'}), 400
+
+    # Changes committed by other processes arrive as 'refresh' events
+    version_watcher.start(current_app._get_current_object())
+    subscription = broker.subscribe(dates, staff=current_user.role in (UserRole.ADMIN, UserRole.ATTENDANT))
+    if subscription is None:
+        return jsonify({'message': 'Too many live connections, poll /api/timeslots instead'}), 503
+
+    # Versions taken after subscribing: a change committed in between is both
+    # in the refetch and on the stream, never in neither
+    ready = {'versions': get_versions('slots', 'machines')}
+    db.session.remove()
+
+    return Response(stream_events(subscription, ready), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+
+@api.route('/api/timeslots/<int:slot_id>', methods=['DELETE'])
+@query_budget(6)
 @token_required
 @role_required(UserRole.ADMIN)
 def delete_timeslot(current_user, slot_id):
@@ -699,7 +476,8 @@ def delete_timeslot(current_user, slot_id):
 
 
 
-@app.route('/api/timeslots/<int:slot_id>/disable', methods=['PUT'])
+@api.route('/api/timeslots/<int:slot_id>/disable', methods=['PUT'])
+@query_budget(5)
 @token_required
 @role_required(UserRole.ADMIN)
 def disable_timeslot(current_user, slot_id):
@@ -711,7 +489,7 @@ def disable_timeslot(current_user, slot_id):
 
     try:
         db.session.commit()
-        print(f"Slot {slot_id} disabled - available_machines set to 0")
+        logger.info("Slot %s disabled - available_machines set to 0", slot_id)
         return jsonify({
             'message': 'Time slot disabled successfully',
             'slot_id': slot_id,
@@ -719,39 +497,38 @@ def disable_timeslot(current_user, slot_id):
         })
     except Exception as e:
         db.session.rollback()
-        print(f"Error disabling slot {slot_id}: {str(e)}")
+        logger.exception("Error disabling slot %s", slot_id)
         return jsonify({'message': f'Failed to disable slot: {str(e)}'}), 500
 
 
-@app.route('/api/timeslots/<int:slot_id>/enable', methods=['PUT'])
+@api.route('/api/timeslots/<int:slot_id>/enable', methods=['PUT'])
+@query_budget(5)
 @token_required
 @role_required(UserRole.ADMIN)
 def enable_timeslot(current_user, slot_id):
     """Admin can re-enable a time slot"""
     slot = TimeSlot.query.get_or_404(slot_id)
 
-    # Calculate actual available machines based on confirmed bookings
-    confirmed_bookings = Booking.query.filter_by(slot_id=slot_id).filter(
-        Booking.status.in_([BookingStatus.CONFIRMED, BookingStatus.RECEIVED, BookingStatus.WASHING])
-    ).all()
-
-    total_machines_used = sum(booking.machines_used for booking in confirmed_bookings)
-    slot.available_machines = max(0, 2 - total_machines_used)
+    # Restore the pair's capacity; active bookings are tracked by booked_machines
+    slot.available_machines = 2
+    working = Machine.query.filter_by(pair_id=slot.pair_id, status='available').count()
+    remaining = free_machines(slot.available_machines, slot.booked_machines, working)
 
     try:
         db.session.commit()
-        print(f"Slot {slot_id} enabled - available_machines set to {slot.available_machines}")
+        logger.info("Slot %s enabled - %s machines free", slot_id, remaining)
         return jsonify({
             'message': 'Time slot enabled successfully',
             'slot_id': slot_id,
-            'available_machines': slot.available_machines
+            'available_machines': remaining
         })
     except Exception as e:
         db.session.rollback()
-        print(f"Error enabling slot {slot_id}: {str(e)}")
+        logger.exception("Error enabling slot %s", slot_id)
         return jsonify({'message': f'Failed to enable slot: {str(e)}'}), 500
 
-@app.route('/api/admin/regenerate-slots', methods=['POST'])
+@api.route('/api/admin/regenerate-slots', methods=['POST'])
+@query_budget(4)
 @token_required
 @role_required(UserRole.ADMIN)
 def manual_regenerate_slots(current_user):
@@ -761,56 +538,76 @@ def manual_regenerate_slots(current_user):
 
 
 # Booking Routes
-# Replace your current get_bookings function with this:
 
-@app.route('/api/bookings', methods=['GET'])
+@api.route('/api/bookings', methods=['GET'])
+@query_budget(4)
 @token_required
 def get_bookings(current_user):
-    if current_user.role == UserRole.STUDENT:
-        # Get bookings with time slot information for the current student
-        bookings = db.session.query(Booking, TimeSlot).join(
-            TimeSlot, Booking.slot_id == TimeSlot.id
-        ).filter(
-            Booking.user_id == current_user.id
-        ).order_by(
-            TimeSlot.date.desc(),
-            TimeSlot.start_time.desc()
-        ).all()
-    else:
-        # Get all bookings with time slot information for admin/attendant
-        bookings = db.session.query(Booking, TimeSlot).join(
-            TimeSlot, Booking.slot_id == TimeSlot.id
-        ).order_by(
-            TimeSlot.date.desc(),
-            TimeSlot.start_time.desc()
-        ).all()
+    """
+    List bookings with time slot information, newest slot first
 
-    result = []
-    for booking, slot in bookings:
-        # Debug: Print slot data to see what we're getting
-        print(f"Slot {slot.id}: date={slot.date}, start={slot.start_time}, end={slot.end_time}")
+    Filters: date_from, date_to (YYYY-MM-DD), status (comma-separated),
+    pair_id and, for admins/attendants, user_id. Students only ever see
+    their own bookings. sort=created lists the newest bookings first.
 
-        result.append({
-            'id': booking.id,
-            'ticket_id': booking.ticket_id,
-            'user_id': booking.user_id,
-            'slot_id': booking.slot_id,
-            'load_type': booking.load_type.value,
-            'status': booking.status.value,
-            'machines_used': booking.machines_used,
-            'created_at': booking.created_at.isoformat() if booking.created_at else None,
-            # Add time slot information with proper null checking
-            'date': slot.date.isoformat() if slot.date else None,
-            'start_time': slot.start_time.isoformat() if slot.start_time else None,
-            'end_time': slot.end_time.isoformat() if slot.end_time else None,
-            'pair_id': slot.pair_id,
-            'machine_type': 'both'  # You can enhance this based on load_type if needed
-        })
+    Passing limit, cursor or count=true switches to paginated mode and
+    returns {bookings, next_cursor, has_more[, total]}; follow next_cursor
+    to get the next page. Without them the full list is returned.
+    """
+    try:
+        filters = parse_booking_filters(request.args)
+        limit = parse_page_size(request.args.get('limit'))
+        sort = parse_sort(request.args.get('sort'))
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
 
-    return jsonify(result)
+    if current_user.role == UserRole.STUDENT:
+        filters['user_id'] = current_user.id
 
+    paginated = any(name in request.args for name in ('limit', 'cursor', 'count'))
+    if not paginated:
+        return jsonify([_booking_json(booking, slot) for booking, slot in booking_rows(filters, sort)])
 
-@app.route('/api/bookings', methods=['POST'])
+    try:
+        rows, next_cursor = get_booking_page(filters, cursor=request.args.get('cursor'), limit=limit, sort=sort)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+    page = {
+        'bookings': [_booking_json(booking, slot) for booking, slot in rows],
+        'next_cursor': next_cursor,
+        'has_more': next_cursor is not None
+    }
+    if request.args.get('count', '').lower() in ('1', 'true', 'yes'):
+        page['total'] = count_bookings(filters)
+
+    return jsonify(page)
+
+
+def _booking_json(booking, slot):
+    logger.debug("Slot %s: date=%s, start=%s, end=%s",
+                 slot.id, slot.date, slot.start_time, slot.end_time, extra=SAMPLED)
+
+    return {
+        'id': booking.id,
+        'ticket_id': booking.ticket_id,
+        'user_id': booking.user_id,
+        'slot_id': booking.slot_id,
+        'load_type': booking.load_type.value,
+        'status': booking.status.value,
+        'machines_used': booking.machines_used,
+        'created_at': booking.created_at.isoformat() if booking.created_at else None,
+        # Add time slot information with proper null checking
+        'date': slot.date.isoformat() if slot.date else None,
+        'start_time': slot.start_time.isoformat() if slot.start_time else None,
+        'end_time': slot.end_time.isoformat() if slot.end_time else None,
+        'pair_id': slot.pair_id,
+        'machine_type': 'both'  # You can enhance this based on load_type if needed
+    }
+
+
+@api.route('/api/bookings', methods=['POST'])
+@query_budget(15)
 @token_required
 def create_booking(current_user):
     data = request.get_json()
@@ -854,7 +651,7 @@ def create_booking(current_user):
         Booking.user_id == current_user.id,
         TimeSlot.date == slot.date,
         Booking.status.in_([BookingStatus.CONFIRMED, BookingStatus.RECEIVED, BookingStatus.WASHING])
-    ).all()
+    ).options(contains_eager(Booking.time_slot)).all()
 
     buffer_minutes = 10
 
@@ -871,70 +668,36 @@ def create_booking(current_user):
     load_type = LoadType(data.get('load_type', 'combined'))
     machines_needed = 2 if load_type != LoadType.COMBINED else 1
 
-    # Calculate actual available machines
-    confirmed_bookings = Booking.query.filter_by(slot_id=slot.id).filter(
-        Booking.status.in_([BookingStatus.CONFIRMED, BookingStatus.RECEIVED, BookingStatus.WASHING])
-    ).all()
-
-    total_machines_used = sum(booking.machines_used for booking in confirmed_bookings)
-    actual_available = 2 - total_machines_used
-
     # Check if slot is disabled
     if slot.available_machines == 0:
         return jsonify({'message': 'This time slot has been disabled by the administrator'}), 400
 
-    if actual_available < machines_needed:
-        # Slot is full - add to waitlist
-
-        # Check waitlist cap (max 10 people per slot)
-        current_waitlist_count = Waitlist.query.filter_by(
-            slot_id=slot.id,
-            status=WaitlistStatus.WAITING
-        ).count()
-
-        if current_waitlist_count >= 10:
-            return jsonify({
-                'message': 'Waitlist is full for this time slot. Please try another slot.',
-                'waitlist_full': True
-            }), 400
+    # Reserve machines with a conditional update, or join the waitlist if the slot is full
+    # The confirmation email is queued in the same transaction as the booking
+    outcome, record = admit_booking(
+        current_user.id, slot.id, load_type, machines_needed,
+        on_booked=lambda booking: send_booking_confirmation_email(current_user, booking, slot)
+    )
 
-        # Add to waitlist
-        position = current_waitlist_count + 1
-        waitlist_entry = Waitlist(
-            user_id=current_user.id,
-            slot_id=slot.id,
-            position=position,
-            load_type=load_type
-        )
+    if outcome == 'conflict':
+        return jsonify({'message': 'Too many booking requests right now. Please try again.'}), 503
 
-        db.session.add(waitlist_entry)
-        db.session.commit()
+    if outcome == 'waitlist_full':
+        return jsonify({
+            'message': 'Waitlist is full for this time slot. Please try another slot.',
+            'waitlist_full': True
+        }), 400
 
+    if outcome == 'waitlisted':
         return jsonify({
             'message': f'Time slot is full. You have been added to the waitlist.',
             'waitlist': True,
-            'position': position,
-            'waitlist_id': waitlist_entry.id
+            'position': get_waitlist_position(record),
+            'waitlist_id': record.id
         }), 202
 
-    # Create booking
-    new_booking = Booking(
-        user_id=current_user.id,
-        slot_id=slot.id,
-        load_type=load_type,
-        machines_used=machines_needed
-    )
-
-    db.session.add(new_booking)
-    db.session.commit()
-
-    # Send confirmation email
-    try:
-        send_booking_confirmation_email(current_user, new_booking, slot)
-        print(f"Booking confirmation email sent to {current_user.email}")
-    except Exception as e:
-        print(f"Failed to send booking confirmation email: {str(e)}")
-        # Don't fail the booking if email fails
+    new_booking = record
+    logger.info("Booking confirmation email queued for %s", current_user.email)
 
     return jsonify({
         'message': 'Booking created successfully',
@@ -947,7 +710,8 @@ def create_booking(current_user):
     }), 201
 
 
-@app.route('/api/bookings/<int:booking_id>', methods=['PUT'])
+@api.route('/api/bookings/<int:booking_id>', methods=['PUT'])
+@query_budget(10)
 @token_required
 def update_booking(current_user, booking_id):
     booking = Booking.query.get_or_404(booking_id)
@@ -958,30 +722,31 @@ def update_booking(current_user, booking_id):
     data = request.get_json()
     old_status = booking.status
 
-    if 'status' in data:
-        booking.status = BookingStatus(data['status'])
+    if 'status' in data and not set_booking_status(booking, BookingStatus(data['status'])):
+        db.session.rollback()
+        return jsonify({'message': 'The time slot no longer has room for this booking'}), 409
     if 'drop_off_time' in data:
         booking.drop_off_time = datetime.fromisoformat(data['drop_off_time'])
 
-    db.session.commit()
-
-    # Send completion email when status changes to COMPLETED
+    # Completion email when status changes to COMPLETED, committed with the status
     if 'status' in data and booking.status == BookingStatus.COMPLETED and old_status != BookingStatus.COMPLETED:
-        try:
-            user = User.query.get(booking.user_id)
-            slot = booking.time_slot
-            send_booking_completed_email(user, booking, slot)
-            print(f"Booking completion email sent to {user.email}")
-        except Exception as e:
-            print(f"Failed to send booking completion email: {str(e)}")
+        user = User.query.get(booking.user_id)
+        send_booking_completed_email(user, booking, booking.time_slot)
+        logger.info("Booking completion email queued for %s", user.email)
+
+    db.session.commit()
 
     return jsonify({'message': 'Booking updated'})
 
 
-@app.route('/api/bookings/<int:booking_id>', methods=['DELETE'])
+@api.route('/api/bookings/<int:booking_id>', methods=['DELETE'])
+@query_budget(17)
 @token_required
 def cancel_booking(current_user, booking_id):
-    booking = Booking.query.get_or_404(booking_id)
+    # With the user and slot the cancellation email needs
+    booking = Booking.query.options(
+        joinedload(Booking.user), joinedload(Booking.time_slot)
+    ).get_or_404(booking_id)
 
     if current_user.role == UserRole.STUDENT and booking.user_id != current_user.id:
         return jsonify({'message': 'Unauthorized'}), 403
@@ -990,55 +755,48 @@ def cancel_booking(current_user, booking_id):
     if booking.status in [BookingStatus.COMPLETED, BookingStatus.CANCELLED]:
         return jsonify({'message': f'Cannot cancel booking with status: {booking.status.value}'}), 400
 
-    slot = booking.time_slot
-
-    # Calculate current available machines based on active bookings
-    confirmed_bookings = Booking.query.filter_by(
-        slot_id=slot.id
-    ).filter(
-        Booking.status.in_([BookingStatus.CONFIRMED, BookingStatus.RECEIVED, BookingStatus.WASHING])
-    ).all()
-
-    total_machines_used = sum(b.machines_used for b in confirmed_bookings if b.id != booking_id)
+    slot_id = booking.slot_id
 
-    booking.status = BookingStatus.CANCELLED
+    # Releases the booking's machines on the slot counter in the same transaction
+    set_booking_status(booking, BookingStatus.CANCELLED)
+    send_booking_cancelled_email(booking.user, booking, booking.time_slot)
 
     db.session.commit()
 
-    # Promote waitlist
-    promote_from_waitlist(slot.id)
+    # Fill the freed machines from the waitlist
+    promote_from_waitlist(slot_id)
 
     return jsonify({'message': 'Booking cancelled successfully'})
 
 
 # Waitlist Routes
-@app.route('/api/waitlist', methods=['GET'])
+@api.route('/api/waitlist', methods=['GET'])
+@query_budget(3)
 @token_required
 def get_waitlist(current_user):
     """Get user's waitlist entries"""
     if current_user.role == UserRole.STUDENT:
-        entries = Waitlist.query.filter_by(
-            user_id=current_user.id,
-            status=WaitlistStatus.WAITING
+        # Rank the whole queues the student is in, then keep their own entries
+        entries = waiting_entries_with_position(slots_waited_by(current_user.id)).filter(
+            Waitlist.user_id == current_user.id
         ).order_by(Waitlist.created_at).all()
     else:
         # Admins see all waitlist entries
-        entries = Waitlist.query.filter_by(
-            status=WaitlistStatus.WAITING
-        ).order_by(Waitlist.slot_id, Waitlist.position).all()
+        entries = waiting_entries_with_position().order_by(Waitlist.slot_id, Waitlist.sequence).all()
 
     return jsonify([{
         'id': entry.id,
         'user_id': entry.user_id,
         'slot_id': entry.slot_id,
-        'position': entry.position,
+        'position': position,
         'load_type': entry.load_type.value,
         'status': entry.status.value,
         'created_at': entry.created_at.isoformat()
-    } for entry in entries])
+    } for entry, position in entries])
 
 
-@app.route('/api/waitlist/<int:waitlist_id>', methods=['DELETE'])
+@api.route('/api/waitlist/<int:waitlist_id>', methods=['DELETE'])
+@query_budget(4)
 @token_required
 def leave_waitlist(current_user, waitlist_id):
     """Remove user from waitlist"""
@@ -1048,39 +806,56 @@ def leave_waitlist(current_user, waitlist_id):
     if current_user.role == UserRole.STUDENT and entry.user_id != current_user.id:
         return jsonify({'message': 'Unauthorized'}), 403
 
-    slot_id = entry.slot_id
-    position_removed = entry.position
-
-    # Remove the entry
+    # Remove the entry; positions behind it are derived, so nothing else changes
     db.session.delete(entry)
+    db.session.commit()
 
-    # Update positions for remaining waitlist entries in the same slot
-    remaining_entries = Waitlist.query.filter_by(
-        slot_id=slot_id,
-        status=WaitlistStatus.WAITING
-    ).filter(
-        Waitlist.position > position_removed
-    ).all()
+    return jsonify({'message': 'Successfully left the waitlist'})
 
-    for remaining_entry in remaining_entries:
-        remaining_entry.position -= 1
 
-    db.session.commit()
+@api.route('/api/admin/stats', methods=['GET'])
+@query_budget(8)
+@token_required
+@role_required(UserRole.ADMIN)
+def get_admin_dashboard_stats(current_user):
+    """
+    Dashboard figures computed with GROUP BY queries and cached briefly:
+    bookings by status, today's utilization per pair, waitlist depth and
+    no-show rates over ?windows=7,30 (days)
+    """
+    try:
+        windows = parse_windows(request.args.get('windows'))
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
 
-    return jsonify({'message': 'Successfully left the waitlist'})
+    stats, _ = get_admin_stats(windows)
+    return jsonify(stats)
+
+
+@api.route('/api/admin/metrics', methods=['GET'])
+@query_budget(3)
+@token_required
+@role_required(UserRole.ADMIN)
+def get_metrics(current_user):
+    """Request, SQL, job, email queue and cache metrics in the Prometheus text format"""
+    if not METRICS_ENABLED:
+        return jsonify({'message': 'Metrics are disabled'}), 404
+    return Response(render_metrics(), content_type=METRICS_CONTENT_TYPE)
 
 
-@app.route('/api/admin/waitlist', methods=['GET'])
+@api.route('/api/admin/waitlist', methods=['GET'])
+@query_budget(3)
 @token_required
 @role_required(UserRole.ADMIN, UserRole.ATTENDANT)
 def get_all_waitlist(current_user):
     """Get all waitlist entries with details (admin/attendant only)"""
-    entries = Waitlist.query.filter_by(
-        status=WaitlistStatus.WAITING
-    ).order_by(Waitlist.slot_id, Waitlist.position).all()
+    # Users and slots come with the entries rather than one lazy load per row
+    entries = waiting_entries_with_position().options(
+        joinedload(Waitlist.user), joinedload(Waitlist.time_slot)
+    ).order_by(Waitlist.slot_id, Waitlist.sequence).all()
 
     result = []
-    for entry in entries:
+    for entry, position in entries:
         slot = entry.time_slot
         user = entry.user
 
@@ -1099,7 +874,7 @@ def get_all_waitlist(current_user):
                 'end_time': slot.end_time.isoformat(),
                 'pair_id': slot.pair_id
             },
-            'position': entry.position,
+            'position': position,
             'load_type': entry.load_type.value,
             'created_at': entry.created_at.isoformat()
         })
@@ -1107,8 +882,10 @@ def get_all_waitlist(current_user):
     return jsonify(result)
 
 # Machine Routes
-@app.route('/api/machines', methods=['GET'])
+@api.route('/api/machines', methods=['GET'])
+@query_budget(3)
 @token_required
+@conditional_get('machines')
 def get_machines(current_user):
     machines = Machine.query.all()
     return jsonify([{
@@ -1119,7 +896,8 @@ def get_machines(current_user):
     } for machine in machines])
 
 
-@app.route('/api/machines/<int:machine_id>', methods=['PUT'])
+@api.route('/api/machines/<int:machine_id>', methods=['PUT'])
+@query_budget(4)
 @token_required
 @role_required(UserRole.ADMIN, UserRole.ATTENDANT)
 def update_machine(current_user, machine_id):
@@ -1136,7 +914,8 @@ def update_machine(current_user, machine_id):
 
 # Add this endpoint to your app.py (after the auth routes):
 
-@app.route('/api/user/profile', methods=['GET'])
+@api.route('/api/user/profile', methods=['GET'])
+@query_budget(2)
 @token_required
 def get_user_profile(current_user):
     """Get current user's profile information"""
@@ -1151,32 +930,41 @@ def get_user_profile(current_user):
     })
 
 
-@app.route('/api/user/profile', methods=['PUT'])
+@api.route('/api/user/profile', methods=['PUT'])
+@query_budget(2)
 @token_required
 def update_user_profile(current_user):
     """Update current user's profile information"""
     data = request.get_json()
 
     # Update allowed fields
+    changes = {}
     if 'full_name' in data:
-        current_user.full_name = data['full_name']
+        changes['full_name'] = data['full_name']
     if 'phone' in data:
-        current_user.phone = data['phone']
+        changes['phone'] = data['phone']
 
     # Students can't change their student_id, only admins can
     if 'student_id' in data and current_user.role == UserRole.ADMIN:
-        current_user.student_id = data['student_id']
+        changes['student_id'] = data['student_id']
 
     try:
-        db.session.commit()
+        # current_user is the snapshot auth already loaded: one UPDATE, and the
+        # response is built from it instead of reading the row back. The commit
+        # drops the user's cached tokens (services/auth_cache.py)
+        if changes:
+            db.session.query(User).filter(User.id == current_user.id).execution_options(
+                changed_user_ids=(current_user.id,)
+            ).update(changes, synchronize_session=False)
+            db.session.commit()
         return jsonify({
             'message': 'Profile updated successfully',
             'user': {
                 'id': current_user.id,
                 'email': current_user.email,
-                'full_name': current_user.full_name,
-                'student_id': current_user.student_id,
-                'phone': current_user.phone,
+                'full_name': changes.get('full_name', current_user.full_name),
+                'student_id': changes.get('student_id', current_user.student_id),
+                'phone': changes.get('phone', current_user.phone),
                 'role': current_user.role.value
             }
         })
@@ -1185,94 +973,130 @@ def update_user_profile(current_user):
         return jsonify({'message': f'Failed to update profile: {str(e)}'}), 500
 
 
-def promote_from_waitlist(slot_id):
-    """
-    Promote waitlist entries when slots become available
-    This is called when a booking is cancelled
-    """
-    slot = TimeSlot.query.get(slot_id)
-    if not slot:
-        return
+# Initialize application data (machines and slots)
+def initialize_app_data():
+    """Migrate the schema, add the machines and fill the slot horizon; safe to repeat"""
+    # Bring older databases up to the current schema (creates missing tables)
+    run_migrations()
 
-    # Get waitlist entries ordered by position
-    waitlist = Waitlist.query.filter_by(
-        slot_id=slot_id,
-        status=WaitlistStatus.WAITING
-    ).order_by(Waitlist.position).all()
+    # Initialize machines if not exist
+    if Machine.query.count() == 0:
+        initialize_machines()
 
-    print(f"Processing waitlist for slot {slot_id}: {len(waitlist)} entries")
+    # Generate initial slots for next 15 days
+    auto_generate_slots()
 
-    for entry in waitlist:
-        # Check if slot still has available machines
-        if slot.available_machines == 0:
-            print(f"Slot {slot_id} is full or disabled, stopping promotion")
-            break
 
-        machines_needed = 2 if entry.load_type != LoadType.COMBINED else 1
+def start_email_workers(app):
+    """Fixed pool of threads sending the email outbox over reused SMTP connections"""
+    from flask_mail import Mail
 
-        if slot.available_machines >= machines_needed:
-            try:
-                # Create booking for this waitlist entry
-                new_booking = Booking(
-                    user_id=entry.user_id,
-                    slot_id=slot_id,
-                    load_type=entry.load_type,
-                    machines_used=machines_needed
-                )
+    workers = EmailWorkerPool(app, Mail(app))
+    workers.start()
+    return workers
 
-                # Update slot available machines
-                slot.available_machines -= machines_needed
 
-                # Mark waitlist entry as promoted
-                entry.status = WaitlistStatus.PROMOTED
+def schedule_jobs(app, blocking=False):
+    """Scheduler with the no-show sweep and the daily slot generation, not started yet"""
+    from apscheduler.triggers.cron import CronTrigger
 
-                db.session.add(new_booking)
+    scheduler = create_scheduler(app, blocking=blocking)
+    scheduler.add_job(
+        func=auto_generate_slots,
+        args=[app],
+        trigger=CronTrigger(hour=3, minute=31),  # Run daily at 3:31 AM
+        id='auto_generate_slots',
+        name='Generate time slots for next 15 days',
+        replace_existing=True
+    )
+    return scheduler
 
-                print(f"Promoted waitlist entry {entry.id} to booking for user {entry.user_id}")
 
-                # Here you would send a notification to the user
-                # For now, we'll just log it
-                print(f"NOTIFICATION: User {entry.user_id} promoted from waitlist for slot {slot_id}")
+def start_background_jobs(app):
+    """
+    Run the scheduled jobs and the email workers on background threads
+    of this process; stopped at exit. Exactly one process should do this
+    """
+    workers = start_email_workers(app)
+    scheduler = schedule_jobs(app)
+    scheduler.start()
+    logger.info("Background jobs started in this process")
+
+    def stop():
+        scheduler.shutdown(wait=False)
+        workers.stop()
+
+    atexit.register(stop)
+
+
+@click.command('init-data')
+@with_appcontext
+def init_data_command():
+    """Migrate the schema, add the machines and generate 15 days of slots."""
+    initialize_app_data()
+    click.echo("Database ready")
+
+
+@click.command('run-scheduler')
+@with_appcontext
+def run_scheduler_command():
+    """Run slot generation, no-show sweeps and the email workers until stopped."""
+    app = current_app._get_current_object()
+    workers = start_email_workers(app)
+    scheduler = schedule_jobs(app, blocking=True)
+    click.echo("Scheduler running, press Ctrl+C to stop")
+    try:
+        scheduler.start()
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    finally:
+        workers.stop()
 
-            except Exception as e:
-                print(f"Error promoting waitlist entry {entry.id}: {str(e)}")
-                db.session.rollback()
-                continue
-        else:
-            # Not enough machines, update positions for remaining entries
-            remaining_entries = Waitlist.query.filter_by(
-                slot_id=slot_id,
-                status=WaitlistStatus.WAITING
-            ).order_by(Waitlist.position).all()
 
-            for idx, remaining_entry in enumerate(remaining_entries, start=1):
-                remaining_entry.position = idx
+def create_app(background_jobs=False):
+    """
+    Build the app without touching the database or starting threads
+    background_jobs=True also runs the scheduler and email workers here,
+    for a single-process deployment (see Processes in README.md)
+    """
+    app = Flask(__name__)
+    configure_logging(app)
 
-            break
+    # Set secret key and other configs
+    app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'your-secret-key-change-in-production')
 
-    try:
-        db.session.commit()
-        print(f"Waitlist promotion completed for slot {slot_id}")
-    except Exception as e:
-        print(f"Error committing waitlist promotions: {str(e)}")
-        db.session.rollback()
+    # Email Configuration
+    app.config['MAIL_SERVER'] = 'smtp.mailersend.net'
+    app.config['MAIL_PORT'] = 2525
+    app.config['MAIL_USE_TLS'] = True
+    app.config['MAIL_USERNAME'] = 'username' # for security reason I won't provide the info here
+    app.config['MAIL_PASSWORD'] = 'password'
+    app.config['MAIL_DEFAULT_SENDER'] = 'noreply@domainname.com'
 
+    # Sets SQLALCHEMY_DATABASE_URI and calls db.init_app(app); the schema is
+    # created and migrated by the init-data command
+    init_db(app, create_tables=False)
 
-# Initialize application data (machines and slots)
-def initialize_app_data():
-    with app.app_context():
-        # Initialize machines if not exist
-        if Machine.query.count() == 0:
-            initialize_machines()
+    CORS(app, resources={r"/api/*": {"origins": "*"}})
+
+    # Request timing and SQL counting, only with METRICS_ENABLED
+    init_metrics(app)
+
+    app.register_blueprint(api)
+    app.cli.add_command(init_data_command)
+    app.cli.add_command(run_scheduler_command)
 
-        # Generate initial slots for next 15 days
-        auto_generate_slots()
+    if background_jobs:
+        start_background_jobs(app)
+    return app
 
-initialize_app_data()
-scheduler.start()
 
 if __name__ == '__main__':
-    try:
-        app.run(debug=True, port=5000)
-    except (KeyboardInterrupt, SystemExit):
-        scheduler.shutdown()
+    app = create_app()
+    # The reloader runs this file in a watcher and a serving process;
+    # only the serving one prepares the data and runs the jobs
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        with app.app_context():
+            initialize_app_data()
+        start_background_jobs(app)
+    app.run(debug=True, port=5000)
@@ -0,0 +1,211 @@
+"""
+Email rendering microbenchmark
+Compares the per-message cost of the previous f-string builders in app.py
+with the precompiled templates in services/email_templates.py, and what
+is left on the request thread now that bodies are rendered by the outbox
+worker (building the context only)
+
+Usage: python benchmarks/bench_email_render.py [iterations]
+"""
+
+import os
+import sys
+import timeit
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import LoadType
+from services.email_templates import booking_email_context, render_email
+
+
+def legacy_confirmation(user, booking, slot):
+    """Previous approach: app.py built the whole email with f-strings on every call"""
+    subject = f"Booking Confirmed - Ticket #{booking.ticket_id}"
+
+    # Format time for display
+    start_time = slot.start_time.strftime("%I:%M %p")
+    end_time = slot.end_time.strftime("%I:%M %p")
+    date = slot.date.strftime("%B %d, %Y")
+
+    # Text version
+    text_body = f"""
+Hello {user.full_name},
+
+Your laundry booking has been confirmed!
+
+Booking Details:
+- Ticket ID: {booking.ticket_id}
+- Date: {date}
+- Time: {start_time} - {end_time}
+- Machine Pair: {slot.pair_id}
+- Load Type: {booking.load_type.value.replace('_', ' ').title()}
+- Machines Used: {booking.machines_used}
+
+Please arrive on time and present your ticket ID at the laundry facility.
+
+Important Reminders:
+- Arrive at least 5 minutes before your scheduled time
+- Bring your laundry detergent and fabric softener
+- Maximum load capacity per machine: 10kg
+- Don't forget to collect your laundry after the cycle
+
+Thank you for using our laundry service!
+
+Best regards,
+Laundry Management Team
+"""
+
+    # HTML version
+    html_body = f"""
+<!DOCTYPE html>
+<html>
+<head>
+    <style>
+        body {{
+            font-family: Arial, sans-serif;
+            line-height: 1.6;
+            color: #333;
+        }}
+        .container {{
+            max-width: 600px;
+            margin: 0 auto;
+            padding: 20px;
+            background-color: #f9f9f9;
+        }}
+        .header {{
+            background-color: #4CAF50;
+            color: white;
+            padding: 20px;
+            text-align: center;
+            border-radius: 8px 8px 0 0;
+        }}
+        .content {{
+            background-color: white;
+            padding: 30px;
+            border-radius: 0 0 8px 8px;
+        }}
+        .ticket-box {{
+            background-color: #e8f5e9;
+            border-left: 4px solid #4CAF50;
+            padding: 20px;
+            margin: 20px 0;
+        }}
+        .detail-row {{
+            display: flex;
+            justify-content: space-between;
+            padding: 10px 0;
+            border-bottom: 1px solid #eee;
+        }}
+        .detail-label {{
+            font-weight: bold;
+            color: #666;
+        }}
+        .detail-value {{
+            color: #333;
+        }}
+        .reminder-box {{
+            background-color: #fff3cd;
+            border-left: 4px solid #ffc107;
+            padding: 15px;
+            margin: 20px 0;
+        }}
+        .footer {{
+            text-align: center;
+            margin-top: 20px;
+            color: #666;
+            font-size: 12px;
+        }}
+    </style>
+</head>
+<body>
+    <div class="container">
+        <div class="header">
+            <h1>🧺 Booking Confirmed!</h1>
+        </div>
+        <div class="content">
+            <p>Hello <strong>{user.full_name}</strong>,</p>
+            <p>Your laundry booking has been confirmed successfully!</p>
+
+            <div class="ticket-box">
+                <h2 style="margin-top: 0; color: #4CAF50;">Booking Details</h2>
+                <div class="detail-row">
+                    <span class="detail-label">🎫 Ticket ID:</span>
+                    <span class="detail-value"><strong>{booking.ticket_id}</strong></span>
+                </div>
+                <div class="detail-row">
+                    <span class="detail-label">📅 Date:</span>
+                    <span class="detail-value">{date}</span>
+                </div>
+                <div class="detail-row">
+                    <span class="detail-label">🕐 Time:</span>
+                    <span class="detail-value">{start_time} - {end_time}</span>
+                </div>
+                <div class="detail-row">
+                    <span class="detail-label">🔧 Machine Pair:</span>
+                    <span class="detail-value">Pair #{slot.pair_id}</span>
+                </div>
+                <div class="detail-row">
+                    <span class="detail-label">🧺 Load Type:</span>
+                    <span class="detail-value">{booking.load_type.value.replace('_', ' ').title()}</span>
+                </div>
+                <div class="detail-row">
+                    <span class="detail-label">🔢 Machines Used:</span>
+                    <span class="detail-value">{booking.machines_used}</span>
+                </div>
+            </div>
+
+            <div class="reminder-box">
+                <h3 style="margin-top: 0;">⚠️ Important Reminders:</h3>
+                <ul>
+                    <li>Arrive at least <strong>5 minutes before</strong> your scheduled time</li>
+                    <li>Bring your <strong>laundry detergent</strong> and fabric softener</li>
+                    <li>Maximum load capacity per machine: <strong>10kg</strong></li>
+                    <li>Present your <strong>Ticket ID</strong> at the facility</li>
+                    <li>Don't forget to <strong>collect your laundry</strong> after the cycle</li>
+                </ul>
+            </div>
+
+            <p>Thank you for using our laundry service!</p>
+            <p><strong>Best regards,</strong><br>Laundry Management Team</p>
+        </div>
+        <div class="footer">
+            <p>This is an automated message, please do not reply to this email.</p>
+        </div>
+    </div>
+</body>
+</html>
+"""
+
+    return subject, text_body, html_body
+
+
+def sample_booking():
+    start = datetime(2025, 3, 10, 9, 10)
+    user = SimpleNamespace(full_name='Test Student', email='student@aui.ma')
+    slot = SimpleNamespace(pair_id=2, date=start.date(), start_time=start, end_time=start + timedelta(hours=1))
+    booking = SimpleNamespace(ticket_id='3f1c9a52-8d7e-4b1a-9c2d-6e5f4a3b2c1d',
+                              load_type=LoadType.SEPARATE_WHITES, machines_used=2)
+    return user, booking, slot
+
+
+def per_call_us(func, iterations):
+    return min(timeit.repeat(func, number=iterations, repeat=5)) / iterations * 1e6
+
+
+if __name__ == '__main__':
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    user, booking, slot = sample_booking()
+    context = booking_email_context(user, booking, slot)
+
+    results = [
+        ('f-string builder (before, request thread)', lambda: legacy_confirmation(user, booking, slot)),
+        ('compiled template render (worker)', lambda: render_email('booking_confirmation', context)),
+        ('context + render', lambda: render_email('booking_confirmation', booking_email_context(user, booking, slot))),
+        ('context only (after, request thread)', lambda: booking_email_context(user, booking, slot)),
+    ]
+
+    print(f"=== Email render benchmark: booking confirmation, {iterations} iterations ===")
+    for name, func in results:
+        print(f"  {name:<44} {per_call_us(func, iterations):8.2f} us/message")
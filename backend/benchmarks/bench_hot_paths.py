@@ -0,0 +1,216 @@
+"""
+Hot path microbenchmarks at increasing database sizes
+Generates a SQLite database per size with benchmarks/semester_data.py,
+then runs each handler in-process through the Flask test client and
+reports wall time and SQL statements per call:
+
+- get_timeslots        GET /api/timeslots?date (student)
+- create_booking       POST /api/bookings
+- cancel_booking       DELETE /api/bookings/<id> with a waitlist to promote
+- generate_daily_slots services.slot_generator.generate_daily_slots
+- check_no_shows       services.scheduler.check_no_shows
+- get_today_bookings   GET /api/attendant/today
+
+Each size runs in its own process, because the database engine is bound
+to DATABASE_URL once per process.
+
+Usage: python benchmarks/bench_hot_paths.py [sizes ...] [--rounds 20] [--json results.json]
+(sizes in bookings, default 1k 100k 1M)
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from flask import Flask
+from sqlalchemy import event
+from database import db, init_db
+from models import User, Booking, TimeSlot, Waitlist, UserRole, LoadType
+from semester_data import HORIZON_DAYS, HOURS, generate_semester, parse_count
+
+BENCHMARKS = ('get_timeslots', 'create_booking', 'cancel_booking', 'generate_daily_slots',
+              'check_no_shows', 'get_today_bookings')
+
+
+def seed(db_file, bookings):
+    """A semester database with exactly `bookings` bookings (benchmarks/semester_data.py)"""
+    app = Flask(__name__)
+    init_db(app, db_path=db_file)
+    with app.app_context():
+        generate_semester(bookings=bookings)
+
+
+def measure(db_file, rounds):
+    """Run every benchmark against db_file; returns {name: stats}"""
+    os.environ.update(DATABASE_URL=f'sqlite:///{db_file}', EMAIL_WORKERS='0', LOG_LEVEL='WARNING')
+    import jwt
+    from app import create_app
+    from routes.attendant import attendant_bp
+    from services.occupancy import add_booking
+    from services.scheduler import check_no_shows
+    from services.slot_generator import generate_daily_slots
+
+    app = create_app()
+    app.register_blueprint(attendant_bp)
+    client = app.test_client()
+    today = datetime.now().date()
+
+    with app.app_context():
+        statements = [0]
+        event.listen(db.engine, 'before_cursor_execute', lambda *args: statements.__setitem__(0, statements[0] + 1))
+
+        bench_users = [User(email=f'bench{i}@aui.ma', password='x', student_id=f'B{i:05d}', role=UserRole.STUDENT)
+                       for i in range(rounds * 4)]
+        db.session.add_all(bench_users)
+        db.session.commit()
+        tokens = [jwt.encode({'user_id': user.id, 'exp': datetime.utcnow() + timedelta(days=1)},
+                             app.config['SECRET_KEY'], algorithm='HS256') for user in bench_users]
+        user_ids = [user.id for user in bench_users]
+
+        free_slots = [slot_id for (slot_id,) in db.session.query(TimeSlot.id).filter(
+            TimeSlot.date > today + timedelta(days=1),
+            TimeSlot.booked_machines == 0
+        ).order_by(TimeSlot.start_time, TimeSlot.pair_id).limit(rounds * 2)]
+        listing_date = db.session.query(TimeSlot.date).filter(TimeSlot.date > today).order_by(TimeSlot.date).first()[0]
+        db.session.remove()
+
+    def headers(index):
+        return {'Authorization': f'Bearer {tokens[index]}'}
+
+    def no_setup(index):
+        return index
+
+    def book_setup(index):
+        return index, free_slots[index]
+
+    def book(args):
+        index, slot_id = args
+        response = client.post('/api/bookings', headers=headers(index), json={'slot_id': slot_id, 'load_type': 'combined'})
+        assert response.status_code in (201, 202), response.get_json()
+
+    def cancel_setup(index):
+        # Student A fills the slot, student B waits for it
+        holder, waiting = rounds + 2 * index, rounds + 2 * index + 1
+        slot_id = free_slots[rounds + index]
+        with app.app_context():
+            booking = Booking(user_id=user_ids[holder], slot_id=slot_id, machines_used=2, load_type=LoadType.SEPARATE_WHITES)
+            add_booking(booking)
+            db.session.add(Waitlist(user_id=user_ids[waiting], slot_id=slot_id, sequence=1))
+            db.session.commit()
+            booking_id = booking.id
+            db.session.remove()
+        return holder, booking_id
+
+    def cancel(args):
+        holder, booking_id = args
+        response = client.delete(f'/api/bookings/{booking_id}', headers=headers(holder))
+        assert response.status_code == 200, response.get_json()
+
+    def generate(index):
+        with app.app_context():
+            assert generate_daily_slots(today + timedelta(days=HORIZON_DAYS + 30 + index), HOURS[0])
+            db.session.remove()
+
+    def sweep_setup(index):
+        # Two bookings in a slot that starts now, so the sweep has something to mark
+        with app.app_context():
+            start = datetime.now().replace(second=0, microsecond=0) + timedelta(microseconds=index + 1)
+            slot = TimeSlot(pair_id=index % 5 + 1, date=start.date(), start_time=start, end_time=start + timedelta(hours=1))
+            db.session.add(slot)
+            db.session.flush()
+            for offset in (0, 1):
+                add_booking(Booking(user_id=user_ids[3 * rounds + index], slot_id=slot.id, machines_used=1))
+            db.session.commit()
+            db.session.remove()
+        return index
+
+    def sweep(index):
+        with app.app_context():
+            assert check_no_shows()['marked'] >= 2
+            db.session.remove()
+
+    cases = {
+        'get_timeslots': (no_setup, lambda index: client.get(f'/api/timeslots?date={listing_date}', headers=headers(0))),
+        'create_booking': (book_setup, book),
+        'cancel_booking': (cancel_setup, cancel),
+        'generate_daily_slots': (no_setup, generate),
+        'get_today_bookings': (no_setup, lambda index: client.get('/api/attendant/today')),
+        'check_no_shows': (sweep_setup, sweep),
+    }
+
+    results = {}
+    for name in BENCHMARKS:
+        setup, run = cases[name]
+        timings, counts = [], []
+        for index in range(rounds):
+            args = setup(index)
+            statements[0] = 0
+            started = time.perf_counter()
+            run(args)
+            timings.append(time.perf_counter() - started)
+            counts.append(statements[0])
+        timings.sort()
+        results[name] = {
+            'rounds': rounds,
+            'mean_ms': round(sum(timings) / rounds * 1000, 3),
+            'p50_ms': round(timings[rounds // 2] * 1000, 3),
+            'min_ms': round(timings[0] * 1000, 3),
+            'max_ms': round(timings[-1] * 1000, 3),
+            'queries': round(sum(counts) / rounds, 1)
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('sizes', nargs='*', default=['1k', '100k', '1M'], help='Bookings per database')
+    parser.add_argument('--rounds', type=int, default=20, help='Calls per benchmark')
+    parser.add_argument('--json', help='Write the results to this file')
+    parser.add_argument('--measure', help=argparse.SUPPRESS)
+    options = parser.parse_args()
+
+    if options.measure:
+        print(json.dumps(measure(options.measure, options.rounds)))
+        return
+
+    results = {}
+    for size in options.sizes:
+        bookings = parse_count(size)
+        db_file = os.path.join(tempfile.mkdtemp(), f'bench_{bookings}.db')
+
+        started = time.perf_counter()
+        seed(db_file, bookings)
+        print(f"Seeded {bookings:,} bookings in {time.perf_counter() - started:.1f}s")
+
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--measure', db_file, '--rounds', str(options.rounds)],
+            cwd=BACKEND_DIR, capture_output=True, text=True
+        )
+        if output.returncode:
+            print(output.stderr)
+            sys.exit(1)
+        results[size] = json.loads(output.stdout.strip().splitlines()[-1])
+
+    print(f"\n=== Hot paths: p50 ms (SQL statements per call), {options.rounds} rounds ===")
+    print(f"{'benchmark':<22}" + ''.join(f"{size:>20}" for size in results))
+    for name in BENCHMARKS:
+        print(f"{name:<22}" + ''.join(
+            f"{results[size][name]['p50_ms']:>12.2f} ({results[size][name]['queries']:>4g})" for size in results
+        ))
+
+    if options.json:
+        with open(options.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {options.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Slot generation benchmark: per-slot existence checks vs bulk diff + insert
+For each horizon it generates every slot on an empty database, then runs
+the same generation again (nothing left to create) and reports wall time
+and the number of SQL statements each approach needed
+
+Usage: python benchmarks/bench_slot_generation.py [days ...]   (default 15 90 365)
+"""
+
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import event
+from database import db, init_db
+from models import TimeSlot
+from services.slot_generator import plan_daily_slots, generate_slot_horizon
+
+# Same opening hours as app.OPERATIONAL_HOURS
+HOURS = {weekday: {'start': '08:00', 'end': '20:00'} for weekday in range(5)}
+HOURS[5] = {'start': '12:00', 'end': '16:00'}
+HOURS[6] = None
+
+
+def legacy_generate(start_date, days):
+    """Previous approach: COUNT per day, then one SELECT per slot before adding it"""
+    created = 0
+    for offset in range(days):
+        target_date = start_date + timedelta(days=offset)
+        hours = HOURS.get(target_date.weekday())
+        if hours is None:
+            continue
+        if TimeSlot.query.filter_by(date=target_date).count():
+            continue
+        for slot in plan_daily_slots(target_date, hours):
+            exists = TimeSlot.query.filter_by(
+                pair_id=slot['pair_id'],
+                start_time=slot['start_time']
+            ).first()
+            if not exists:
+                db.session.add(TimeSlot(**slot))
+                created += 1
+        db.session.commit()
+    return created
+
+
+def bulk_generate(start_date, days):
+    return generate_slot_horizon(start_date, days, HOURS)
+
+
+def measure(app, generate, start_date, days):
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', count)
+        started = time.perf_counter()
+        created = generate(start_date, days)
+        elapsed = time.perf_counter() - started
+        event.remove(db.engine, 'before_cursor_execute', count)
+    return created, elapsed, len(statements)
+
+
+def run(name, generate, days):
+    db_file = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    app = Flask(__name__)
+    init_db(app, db_path=db_file)
+    start_date = datetime.now().date()
+
+    first = measure(app, generate, start_date, days)
+    again = measure(app, generate, start_date, days)
+
+    with app.app_context():
+        db.engine.dispose()
+
+    for label, (created, elapsed, statements) in (('fresh', first), ('rerun', again)):
+        print(f"  {name:<7} {label:<5} {created:6d} slots  {elapsed * 1000:9.1f} ms  {statements:6d} statements")
+
+
+if __name__ == '__main__':
+    horizons = [int(arg) for arg in sys.argv[1:]] or [15, 90, 365]
+
+    print("=== Slot generation benchmark ===")
+    for days in horizons:
+        print(f"\n[{days} days]")
+        run('legacy', legacy_generate, days)
+        run('bulk', bulk_generate, days)
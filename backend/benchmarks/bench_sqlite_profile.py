@@ -0,0 +1,124 @@
+"""
+Mixed read/write benchmark for the SQLite storage profiles in database.py
+Reader threads load a day of slot availability while writer threads book
+and cancel, the way request threads and the scheduler share the database
+
+Usage: python benchmarks/bench_sqlite_profile.py [seconds] [readers] [writers]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy.exc import OperationalError
+from database import db, init_db, SQLITE_PROFILES
+from models import User, TimeSlot, Booking, UserRole, BookingStatus, LoadType
+from services.slot_generator import initialize_machines, generate_daily_slots
+from services.availability import get_slot_availability
+from services.admission import admit_booking
+from services.occupancy import set_booking_status
+
+BENCH_DAYS = 7
+BENCH_USERS = 200
+
+
+def percentile(samples, fraction):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def run_profile(profile, seconds, readers, writers):
+    db_file = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    app = Flask(__name__)
+    init_db(app, db_path=db_file, profile=profile)
+
+    start_day = datetime.now().date() + timedelta(days=1)
+    with app.app_context():
+        initialize_machines()
+        for offset in range(BENCH_DAYS):
+            generate_daily_slots(start_day + timedelta(days=offset))
+        db.session.add_all([
+            User(email=f'bench{i}@aui.ma', password='x', student_id=f'BN{i:05d}', role=UserRole.STUDENT)
+            for i in range(BENCH_USERS)
+        ])
+        db.session.commit()
+        slot_ids = [slot_id for (slot_id,) in db.session.query(TimeSlot.id).all()]
+        user_ids = [user_id for (user_id,) in db.session.query(User.id).all()]
+
+    latencies = {'read': [], 'write': []}
+    errors = {'read': 0, 'write': 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def record(kind, started, failed=False):
+        with lock:
+            latencies[kind].append(time.perf_counter() - started)
+            if failed:
+                errors[kind] += 1
+
+    def reader():
+        with app.app_context():
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    get_slot_availability(date=start_day + timedelta(days=random.randrange(BENCH_DAYS)))
+                    db.session.rollback()
+                    record('read', started)
+                except OperationalError:
+                    db.session.rollback()
+                    record('read', started, failed=True)
+
+    def writer():
+        with app.app_context():
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    outcome, record_ = admit_booking(
+                        random.choice(user_ids), random.choice(slot_ids), LoadType.COMBINED, 1
+                    )
+                    if outcome == 'booked':
+                        booking = db.session.get(Booking, record_.id)
+                        set_booking_status(booking, BookingStatus.CANCELLED)
+                        db.session.commit()
+                    record('write', started, failed=(outcome == 'conflict'))
+                except OperationalError:
+                    db.session.rollback()
+                    record('write', started, failed=True)
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)]
+    threads += [threading.Thread(target=writer) for _ in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with app.app_context():
+        db.engine.dispose()
+
+    print(f"\n[{profile}]")
+    for kind in ('read', 'write'):
+        samples = latencies[kind]
+        print(f"  {kind:<5} {len(samples) / seconds:8.1f} ops/s  "
+              f"p50 {percentile(samples, 0.50) * 1000:7.2f} ms  "
+              f"p95 {percentile(samples, 0.95) * 1000:7.2f} ms  "
+              f"p99 {percentile(samples, 0.99) * 1000:7.2f} ms  "
+              f"errors {errors[kind]}")
+
+
+if __name__ == '__main__':
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 10
+    readers = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    writers = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+
+    print(f"=== SQLite profile benchmark: {seconds:.0f}s, {readers} readers, {writers} writers ===")
+    for profile in SQLITE_PROFILES:
+        run_profile(profile, seconds, readers, writers)
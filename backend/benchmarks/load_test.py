@@ -0,0 +1,383 @@
+"""
+End-to-end load test of a booking-window rush
+Drives the HTTP API the way students do when the next days' slots open:
+register and log in, list /api/timeslots, book (mostly the same few peak
+slots), cancel some bookings, and leave some waitlists. Reports p50/p95/p99
+latency and error rates per endpoint, then checks the database for
+overbooking, counter drift and duplicate bookings.
+
+Without --url a local instance is started on a fresh SQLite database in a
+temporary directory (threaded development server, email workers off).
+With --url, pass --database-url to run the invariant checks against the
+instance's database.
+
+--save-baseline stores the results in benchmarks/baselines/load_test.json;
+later runs compare p95 latency and error rate against it and exit with
+status 1 on a regression or an invariant violation.
+
+Usage: python benchmarks/load_test.py [--users 200] [--concurrency 50] [--rounds 3]
+"""
+
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+BASELINE_FILE = os.path.join(BACKEND_DIR, 'benchmarks', 'baselines', 'load_test.json')
+
+# Endpoints hit fewer times than this have too noisy a p95 to compare
+MIN_BASELINE_SAMPLES = 100
+
+# Status codes the API returns by design during a rush (already booked,
+# waitlist full, slot too close...); anything else is an error
+EXPECTED_STATUSES = {
+    'register': {201},
+    'login': {200},
+    'timeslots': {200},
+    'book': {201, 202, 400},
+    'cancel': {200, 400},
+    'waitlist': {200},
+    'leave_waitlist': {200, 404},
+}
+
+
+class Recorder:
+    """Latency samples and status counts per endpoint, shared by all client threads"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.errors = defaultdict(int)
+
+    def record(self, name, status, seconds):
+        with self._lock:
+            self.latencies[name].append(seconds)
+            self.statuses[name][status] += 1
+            if status not in EXPECTED_STATUSES[name]:
+                self.errors[name] += 1
+
+    def summary(self, elapsed):
+        endpoints = {}
+        for name in sorted(self.latencies):
+            samples = sorted(self.latencies[name])
+            endpoints[name] = {
+                'requests': len(samples),
+                'errors': self.errors[name],
+                'error_rate': round(self.errors[name] / len(samples), 4),
+                'p50_ms': _percentile_ms(samples, 50),
+                'p95_ms': _percentile_ms(samples, 95),
+                'p99_ms': _percentile_ms(samples, 99),
+                'max_ms': round(samples[-1] * 1000, 2),
+                'statuses': {str(status): count for status, count in sorted(self.statuses[name].items(), key=str)}
+            }
+        requests = sum(endpoint['requests'] for endpoint in endpoints.values())
+        errors = sum(endpoint['errors'] for endpoint in endpoints.values())
+        return {
+            'elapsed_seconds': round(elapsed, 3),
+            'requests': requests,
+            'throughput_rps': round(requests / elapsed, 1) if elapsed else 0.0,
+            'error_rate': round(errors / requests, 4) if requests else 0.0,
+            'endpoints': endpoints
+        }
+
+
+def _percentile_ms(samples, percentile):
+    """Nearest-rank percentile of sorted samples, in milliseconds"""
+    index = max(0, min(len(samples) - 1, -(-len(samples) * percentile // 100) - 1))
+    return round(samples[index] * 1000, 2)
+
+
+class Client:
+    """One student session against the API"""
+
+    def __init__(self, base_url, recorder):
+        self.base_url = base_url.rstrip('/')
+        self.recorder = recorder
+        self.token = None
+
+    def call(self, name, method, path, body=None):
+        headers = {'Content-Type': 'application/json'}
+        if self.token:
+            headers['Authorization'] = f'Bearer {self.token}'
+        data = json.dumps(body).encode() if body is not None else None
+        request = urllib.request.Request(self.base_url + path, data=data, headers=headers, method=method)
+
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=60) as response:
+                status, payload = response.status, response.read()
+        except urllib.error.HTTPError as e:
+            status, payload = e.code, e.read()
+        except (urllib.error.URLError, OSError):
+            status, payload = 'connection_error', b''
+        self.recorder.record(name, status, time.perf_counter() - started)
+
+        try:
+            return status, json.loads(payload) if payload else None
+        except ValueError:
+            return status, None
+
+
+def run_student(client, index, run_id, options, rng, booking_dates):
+    email = f'load-{run_id}-{index}@aui.ma'
+    client.call('register', 'POST', '/api/auth/register', {
+        'email': email, 'password': 'load', 'student_id': f'L{run_id}{index:05d}', 'full_name': f'Load Student {index}'
+    })
+    status, body = client.call('login', 'POST', '/api/auth/login', {'email': email, 'password': 'load'})
+    if status != 200:
+        return
+    client.token = body['token']
+
+    for _ in range(options.rounds):
+        hot = rng.random() < options.hot_ratio
+        day = booking_dates[0] if hot else rng.choice(booking_dates)
+        status, slots = client.call('timeslots', 'GET', f'/api/timeslots?date={day}')
+        slots = [slot for slot in slots or [] if not slot['is_disabled']]
+        if status != 200 or not slots:
+            continue
+
+        slots.sort(key=lambda slot: (slot['start_time'], slot['pair_id']))
+        slot = rng.choice(slots[:options.hot_slots] if hot else slots)
+        load_type = 'combined' if rng.random() < 0.6 else rng.choice(['separate_whites', 'separate_colors'])
+
+        status, body = client.call('book', 'POST', '/api/bookings', {'slot_id': slot['id'], 'load_type': load_type})
+        if status == 201 and rng.random() < options.cancel_ratio:
+            client.call('cancel', 'DELETE', f"/api/bookings/{body['booking']['id']}")
+        elif status == 202 and rng.random() < options.leave_ratio:
+            client.call('waitlist', 'GET', '/api/waitlist')
+            client.call('leave_waitlist', 'DELETE', f"/api/waitlist/{body['waitlist_id']}")
+
+
+def open_booking_dates(base_url, run_id, days):
+    """Dates from tomorrow on that have bookable slots (closed days have none), seen by a probe student"""
+    probe = Client(base_url, Recorder())
+    status, body = probe.call('register', 'POST', '/api/auth/register', {
+        'email': f'load-{run_id}-probe@aui.ma', 'password': 'load', 'student_id': f'L{run_id}P', 'full_name': 'Load Probe'
+    })
+    if status != 201:
+        raise RuntimeError(f"Could not register the probe student: {status} {body}")
+    probe.token = body['token']
+
+    # Slots open from tomorrow: no same-day 2-hour cutoff in the way
+    tomorrow = datetime.now().date() + timedelta(days=1)
+    dates = []
+    for offset in range(days):
+        day = (tomorrow + timedelta(days=offset)).isoformat()
+        status, slots = probe.call('timeslots', 'GET', f'/api/timeslots?date={day}')
+        if status == 200 and any(not slot['is_disabled'] for slot in slots):
+            dates.append(day)
+    if not dates:
+        raise RuntimeError(f"No bookable slots in the next {days} days")
+    return dates
+
+
+def check_invariants(database_url):
+    """Overbooked slots, counter drift and duplicate active bookings, read from the database"""
+    from flask import Flask
+    from sqlalchemy import func
+    from database import db, init_db
+    from models import Booking, TimeSlot, Waitlist, WaitlistStatus, ACTIVE_BOOKING_STATUSES
+    from services.admission import WAITLIST_CAP
+    from services.occupancy import find_occupancy_drift
+
+    app = Flask(__name__)
+    init_db(app, database_url=database_url)
+    violations = []
+
+    with app.app_context():
+        used = db.session.query(
+            Booking.slot_id, func.sum(Booking.machines_used)
+        ).filter(Booking.status.in_(ACTIVE_BOOKING_STATUSES)).group_by(Booking.slot_id).subquery()
+        for slot_id, capacity, machines in db.session.query(
+            TimeSlot.id, TimeSlot.available_machines, used.c[1]
+        ).join(used, used.c.slot_id == TimeSlot.id).filter(used.c[1] > TimeSlot.available_machines):
+            violations.append(f"slot {slot_id} overbooked: {machines} machines used of {capacity}")
+
+        for slot_id, stored, actual in find_occupancy_drift():
+            violations.append(f"slot {slot_id} counter drift: stored {stored}, actual {actual}")
+
+        for user_id, slot_id, count in db.session.query(
+            Booking.user_id, Booking.slot_id, func.count(Booking.id)
+        ).filter(Booking.status.in_(ACTIVE_BOOKING_STATUSES)).group_by(
+            Booking.user_id, Booking.slot_id
+        ).having(func.count(Booking.id) > 1):
+            violations.append(f"user {user_id} has {count} active bookings for slot {slot_id}")
+
+        for slot_id, waiting in db.session.query(
+            Waitlist.slot_id, func.count(Waitlist.id)
+        ).filter(Waitlist.status == WaitlistStatus.WAITING).group_by(Waitlist.slot_id).having(
+            func.count(Waitlist.id) > WAITLIST_CAP
+        ):
+            violations.append(f"slot {slot_id} has {waiting} people waiting (cap {WAITLIST_CAP})")
+
+        db.session.remove()
+    return violations
+
+
+def start_local_instance(workdir):
+    """Start app.py on a free port with a fresh SQLite database; returns (process, url, database_url)"""
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+
+    database_url = f"sqlite:///{os.path.join(workdir, 'load.db')}"
+    env = dict(os.environ, DATABASE_URL=database_url, EMAIL_WORKERS='0', LOG_LEVEL='WARNING')
+    log = open(os.path.join(workdir, 'server.log'), 'w')
+    process = subprocess.Popen(
+        [sys.executable, '-c',
+         "from app import create_app, initialize_app_data\n"
+         "app = create_app()\n"
+         "with app.app_context(): initialize_app_data()\n"
+         f"app.run(host='127.0.0.1', port={port}, threaded=True, use_reloader=False)"],
+        cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT
+    )
+
+    url = f'http://127.0.0.1:{port}'
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Local instance exited, see {log.name}")
+        try:
+            urllib.request.urlopen(url + '/api/timeslots', timeout=1)
+        except urllib.error.HTTPError:
+            return process, url, database_url  # 401: up and answering
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("Local instance did not start within 60 seconds")
+
+
+def compare_to_baseline(results, baseline, tolerance):
+    """Regression messages for endpoints slower or more error-prone than the baseline"""
+    regressions = []
+    for name, current in results['endpoints'].items():
+        before = baseline['endpoints'].get(name)
+        if not before or min(current['requests'], before['requests']) < MIN_BASELINE_SAMPLES:
+            continue
+        if current['p95_ms'] > before['p95_ms'] * tolerance and current['p95_ms'] - before['p95_ms'] > 5:
+            regressions.append(f"{name}: p95 {current['p95_ms']} ms vs baseline {before['p95_ms']} ms")
+        if current['error_rate'] > before['error_rate'] + 0.01:
+            regressions.append(f"{name}: error rate {current['error_rate']:.2%} vs baseline {before['error_rate']:.2%}")
+    return regressions
+
+
+def print_results(results):
+    print(f"\n{'endpoint':<16}{'requests':>9}{'errors':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}  statuses")
+    for name, endpoint in results['endpoints'].items():
+        print(f"{name:<16}{endpoint['requests']:>9}{endpoint['errors']:>8}{endpoint['p50_ms']:>9}"
+              f"{endpoint['p95_ms']:>9}{endpoint['p99_ms']:>9}{endpoint['max_ms']:>9}  {endpoint['statuses']}")
+    print(f"\n{results['requests']} requests in {results['elapsed_seconds']}s "
+          f"({results['throughput_rps']} req/s), error rate {results['error_rate']:.2%}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', help='Base URL of a running instance (default: start a local one)')
+    parser.add_argument('--database-url', help="Database of the --url instance, for the invariant checks")
+    parser.add_argument('--users', type=int, default=200, help='Students in the rush')
+    parser.add_argument('--concurrency', type=int, default=50, help='Students active at once')
+    parser.add_argument('--rounds', type=int, default=3, help='Booking attempts per student')
+    parser.add_argument('--days', type=int, default=7, help='Days ahead students book into (the first open one is the rush day)')
+    parser.add_argument('--hot-slots', type=int, default=4, help='Peak slots of the first day most students want')
+    parser.add_argument('--hot-ratio', type=float, default=0.7, help='Share of attempts aimed at the peak slots')
+    parser.add_argument('--cancel-ratio', type=float, default=0.2, help='Share of bookings cancelled again')
+    parser.add_argument('--leave-ratio', type=float, default=0.3, help='Share of waitlist entries left again')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--tolerance', type=float, default=1.5, help='Allowed p95 growth over the baseline')
+    parser.add_argument('--save-baseline', action='store_true', help=f'Store the results in {BASELINE_FILE}')
+    return parser.parse_args()
+
+
+def main():
+    options = parse_args()
+    process = None
+    database_url = options.database_url
+    base_url = options.url
+
+    if not base_url:
+        workdir = tempfile.mkdtemp()
+        process, base_url, database_url = start_local_instance(workdir)
+        print(f"Local instance at {base_url} (logs in {workdir})")
+
+    run_id = f'{int(time.time()) % 100000:05d}'
+    recorder = Recorder()
+
+    try:
+        booking_dates = open_booking_dates(base_url, run_id, options.days)
+    except Exception:
+        if process:
+            process.terminate()
+        raise
+
+    print(f"=== Booking rush: {options.users} students, {options.concurrency} at once, "
+          f"{options.rounds} attempts each, {options.hot_ratio:.0%} at {options.hot_slots} peak slots ===")
+    try:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options.concurrency) as pool:
+            futures = [
+                pool.submit(run_student, Client(base_url, recorder), index, run_id, options,
+                            random.Random(options.seed * 100003 + index), booking_dates)
+                for index in range(options.users)
+            ]
+            for future in futures:
+                future.result()
+        results = recorder.summary(time.perf_counter() - started)
+    finally:
+        if process:
+            process.terminate()
+            process.wait()
+
+    print_results(results)
+
+    failed = False
+    if database_url:
+        violations = check_invariants(database_url)
+        results['invariant_violations'] = violations
+        for violation in violations:
+            print(f"  ❌ {violation}")
+        print("✅ No overbookings, drift or duplicate bookings" if not violations else "❌ Invariant violations detected")
+        failed = bool(violations)
+    else:
+        print("Invariants not checked (pass --database-url)")
+
+    results['config'] = {key: value for key, value in vars(options).items() if key not in ('url', 'database_url', 'save_baseline', 'tolerance')}
+    results['recorded_at'] = datetime.now().isoformat(timespec='seconds')
+
+    if os.path.exists(BASELINE_FILE) and not options.save_baseline:
+        with open(BASELINE_FILE) as f:
+            baseline = json.load(f)
+        if baseline.get('config') != results['config']:
+            print("Baseline was recorded with different options, not compared")
+        else:
+            regressions = compare_to_baseline(results, baseline, options.tolerance)
+            for regression in regressions:
+                print(f"  ❌ {regression}")
+            print("✅ Within baseline" if not regressions else "❌ Regressed against baseline")
+            failed = failed or bool(regressions)
+
+    if options.save_baseline:
+        os.makedirs(os.path.dirname(BASELINE_FILE), exist_ok=True)
+        with open(BASELINE_FILE, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {BASELINE_FILE}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
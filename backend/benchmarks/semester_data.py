@@ -0,0 +1,299 @@
+"""
+Deterministic synthetic semester data for benchmarks and capacity tests
+Loads students, the machines, every slot of the semester so far plus the
+booking horizon, and the bookings and waitlists a semester of demand
+produces. Every slot's demand is simulated against its capacity: peak
+hours draw `peak_contention` times the requests of other hours, overflow
+joins the waitlist up to its cap, cancellations promote from the queue,
+and past bookings end up completed, no-show or cancelled. The same seed
+always yields the same rows.
+
+With a `bookings` target the history extends back past the semester
+until that many bookings exist, keeping the per-slot mix realistic
+rather than piling bookings onto a few slots.
+
+Everything is written with multi-row INSERTs in chunks of days, and slot
+counters are filled in as the slots are inserted.
+
+Usage: python benchmarks/semester_data.py OUTPUT.db [--bookings 1M] [--students 3000] [--seed 42]
+       python benchmarks/semester_data.py --database-url postgresql://... [options]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from enum import Enum
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func, text
+from database import db
+from models import User, Booking, TimeSlot, Waitlist, UserRole, BookingStatus, LoadType, WaitlistStatus
+from services.admission import WAITLIST_CAP
+from services.slot_generator import plan_daily_slots, initialize_machines
+
+# Same opening hours as app.OPERATIONAL_HOURS
+HOURS = {weekday: {'start': '10:00', 'end': '19:00'} for weekday in range(5)}
+HOURS[5] = {'start': '12:00', 'end': '16:00'}
+HOURS[6] = None
+
+SEMESTER_WEEKS = 16
+HORIZON_DAYS = 15
+INSERT_BATCH_ROWS = 5000
+CHUNK_DAYS = 28
+
+
+def _poisson(rng, mean):
+    """Knuth's method, fine for the small means of per-slot demand"""
+    limit, count, product = 2.718281828459045 ** -mean, 0, rng.random()
+    while product > limit:
+        count += 1
+        product *= rng.random()
+    return count
+
+
+class SemesterPlan:
+    """Demand model; simulate_day() is a pure function of (seed, date)"""
+
+    def __init__(self, students=3000, seed=42, base_demand=1.2, peak_contention=3.0, peak_hours=(16, 17, 18),
+                 cancel_rate=0.08, no_show_rate=0.07, now=None):
+        self.students = students
+        self.seed = seed
+        self.base_demand = base_demand
+        self.peak_contention = peak_contention
+        self.peak_hours = set(peak_hours)
+        self.cancel_rate = cancel_rate
+        self.no_show_rate = no_show_rate
+        self.now = now or datetime.now()
+
+    def simulate_day(self, day):
+        """(slots, bookings, waitlist) for one date; bookings and entries reference slots by index"""
+        hours = HOURS.get(day.weekday())
+        if hours is None:
+            return [], [], []
+        rng = random.Random(f'{self.seed}-{day.isoformat()}')
+        slots = plan_daily_slots(day, hours)
+        bookings, waitlist = [], []
+
+        for index, slot in enumerate(slots):
+            demand = self.base_demand * (self.peak_contention if slot['start_time'].hour in self.peak_hours else 1)
+            requests = min(_poisson(rng, demand), self.students)
+            started = slot['start_time'] <= self.now
+            in_progress = started and self.now < slot['end_time']
+
+            booked, admitted, queue = 0, [], []
+            for user_index in rng.sample(range(self.students), requests):
+                machines = 1 if rng.random() < 0.6 else 2
+                request = (user_index, machines, rng.randint(1, 14 * 24 * 60))
+                if booked + machines <= slot['available_machines']:
+                    booked += machines
+                    admitted.append(request)
+                elif len(queue) < WAITLIST_CAP:
+                    queue.append(request)
+
+            # Cancellations free machines for the first waiting entries that fit
+            outcomes = []
+            for request in admitted:
+                if rng.random() < self.cancel_rate:
+                    outcomes.append((request, BookingStatus.CANCELLED))
+                    booked -= request[1]
+                    for waiting in list(queue):
+                        if booked + waiting[1] <= slot['available_machines']:
+                            booked += waiting[1]
+                            queue.remove(waiting)
+                            outcomes.append((waiting, None))
+                            waitlist.append((index, waiting, WaitlistStatus.PROMOTED))
+                else:
+                    outcomes.append((request, None))
+
+            for request, status in outcomes:
+                if status is None:
+                    if in_progress:
+                        status = BookingStatus.WASHING
+                    elif not started:
+                        status = BookingStatus.CONFIRMED
+                    else:
+                        status = BookingStatus.NO_SHOW if rng.random() < self.no_show_rate else BookingStatus.COMPLETED
+                bookings.append((index, request, status))
+
+            for waiting in queue:
+                waitlist.append((index, waiting, WaitlistStatus.EXPIRED if started else WaitlistStatus.WAITING))
+
+            slot['booked_machines'] = booked if not started or in_progress else 0
+        return slots, bookings, waitlist
+
+
+def _stored(value):
+    """A value in the form SQLAlchemy stores it in SQLite (enum names, fixed-width timestamps)"""
+    if isinstance(value, Enum):
+        return value.name
+    if isinstance(value, datetime):
+        return value.isoformat(' ', 'microseconds')
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+def _insert_batches(model, rows):
+    """Multi-row INSERTs of dicts keyed by column name"""
+    if not rows:
+        return
+    if db.engine.dialect.name != 'sqlite':
+        for offset in range(0, len(rows), INSERT_BATCH_ROWS):
+            db.session.execute(model.__table__.insert(), rows[offset:offset + INSERT_BATCH_ROWS])
+        return
+
+    # Straight to sqlite3's executemany: SQLAlchemy's per-value processing
+    # would otherwise take most of the load time at a million rows
+    columns = list(rows[0])
+    statement = f"INSERT INTO {model.__tablename__} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+    db.session.connection().exec_driver_sql(
+        statement, [tuple(_stored(row[column]) for column in columns) for row in rows]
+    )
+
+
+def _plan_dates(plan, bookings, weeks, horizon_days):
+    """Dates to generate, oldest first, and how many bookings to drop from the oldest one"""
+    today = plan.now.date()
+    dates = [today + timedelta(days=offset) for offset in range(horizon_days)]
+    if bookings is None:
+        return [today - timedelta(days=offset) for offset in range(weeks * 7, 0, -1)] + dates, 0
+
+    total = sum(len(plan.simulate_day(day)[1]) for day in dates)
+    day = today
+    while total < bookings:
+        day -= timedelta(days=1)
+        dates.insert(0, day)
+        total += len(plan.simulate_day(day)[1])
+    return dates, total - bookings
+
+
+def generate_semester(bookings=None, weeks=SEMESTER_WEEKS, horizon_days=HORIZON_DAYS, **plan_options):
+    """
+    Bulk-load a semester into the current app's database (tables must exist)
+    bookings: exact number of bookings to create, extending the history as
+    needed; without it the history is `weeks` weeks. Returns row counts
+    """
+    plan = SemesterPlan(**plan_options)
+    dates, surplus = _plan_dates(plan, bookings, weeks, horizon_days)
+    rng = random.Random(plan.seed)
+    counts = {'students': plan.students, 'slots': 0, 'bookings': 0, 'waitlist': 0}
+
+    initialize_machines()
+    first_user = (db.session.query(func.max(User.id)).scalar() or 0) + 1
+    _insert_batches(User, [{
+        'id': first_user + index,
+        'email': f'student{index:06d}@aui.ma',
+        'password': 'x',
+        'student_id': f'S{plan.seed:03d}{index:06d}',
+        'full_name': f'Student {index}',
+        'phone': f'+2126{rng.randrange(10 ** 8):08d}',
+        'role': UserRole.STUDENT,
+        'created_at': datetime.combine(dates[0], datetime.min.time()) - timedelta(days=rng.randint(1, 60))
+    } for index in range(plan.students)])
+
+    next_slot = (db.session.query(func.max(TimeSlot.id)).scalar() or 0) + 1
+    for offset in range(0, len(dates), CHUNK_DAYS):
+        slot_rows, booking_rows, waitlist_rows = [], [], []
+        for day in dates[offset:offset + CHUNK_DAYS]:
+            slots, day_bookings, day_waitlist = plan.simulate_day(day)
+            if surplus and day == dates[0]:
+                day_bookings = day_bookings[surplus:]
+
+            for slot in slots:
+                slot['id'] = next_slot + len(slot_rows)
+                slot['created_at'] = datetime.combine(day, datetime.min.time()) - timedelta(days=horizon_days)
+                slot_rows.append(slot)
+
+            for index, (user_index, machines, lead_minutes), status in day_bookings:
+                slot = slots[index]
+                created = slot['start_time'] - timedelta(minutes=lead_minutes)
+                booking_rows.append({
+                    'ticket_id': str(uuid.UUID(int=rng.getrandbits(128))),
+                    'user_id': first_user + user_index,
+                    'slot_id': slot['id'],
+                    'load_type': LoadType.COMBINED if machines == 1 else LoadType.SEPARATE_WHITES,
+                    'machines_used': machines,
+                    'status': status,
+                    'drop_off_time': slot['start_time'] if status in (BookingStatus.COMPLETED, BookingStatus.WASHING) else None,
+                    'created_at': created,
+                    'updated_at': slot['end_time'] if status != BookingStatus.CONFIRMED else created
+                })
+
+            sequences = {}
+            for index, (user_index, machines, lead_minutes), status in day_waitlist:
+                sequences[index] = sequences.get(index, 0) + 1
+                waitlist_rows.append({
+                    'user_id': first_user + user_index,
+                    'slot_id': slots[index]['id'],
+                    'position': sequences[index],
+                    'status': status,
+                    'load_type': LoadType.COMBINED if machines == 1 else LoadType.SEPARATE_WHITES,
+                    'created_at': slots[index]['start_time'] - timedelta(minutes=lead_minutes)
+                })
+
+        next_slot += len(slot_rows)
+        _insert_batches(TimeSlot, slot_rows)
+        _insert_batches(Booking, booking_rows)
+        _insert_batches(Waitlist, waitlist_rows)
+        counts['slots'] += len(slot_rows)
+        counts['bookings'] += len(booking_rows)
+        counts['waitlist'] += len(waitlist_rows)
+
+    if db.engine.dialect.name == 'postgresql':
+        # Ids were assigned here, move the sequences past them
+        for table in ('users', 'time_slots'):
+            db.session.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT MAX(id) FROM {table}))"
+            ))
+    db.session.execute(text('ANALYZE'))
+    db.session.commit()
+    return counts
+
+
+def parse_count(value):
+    value = value.lower()
+    for suffix, factor in (('m', 1000000), ('k', 1000)):
+        if value.endswith(suffix):
+            return int(float(value[:-len(suffix)]) * factor)
+    return int(value)
+
+
+def main():
+    from flask import Flask
+    from database import init_db
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('output', nargs='?', help='SQLite file to create')
+    parser.add_argument('--database-url', help='Load into this (empty) database instead')
+    parser.add_argument('--bookings', type=parse_count, help='Exact number of bookings, e.g. 100k or 1M')
+    parser.add_argument('--weeks', type=int, default=SEMESTER_WEEKS, help='Weeks of history without --bookings')
+    parser.add_argument('--students', type=parse_count, default=3000)
+    parser.add_argument('--peak-contention', type=float, default=3.0, help='Demand multiplier at peak hours')
+    parser.add_argument('--seed', type=int, default=42)
+    options = parser.parse_args()
+    if not options.output and not options.database_url:
+        parser.error('give an output file or --database-url')
+
+    app = Flask(__name__)
+    if options.database_url:
+        init_db(app, database_url=options.database_url)
+    else:
+        init_db(app, db_path=os.path.abspath(options.output))
+
+    started = time.perf_counter()
+    with app.app_context():
+        counts = generate_semester(
+            bookings=options.bookings, weeks=options.weeks, students=options.students,
+            peak_contention=options.peak_contention, seed=options.seed
+        )
+    print(f"Generated {counts['students']:,} students, {counts['slots']:,} slots, {counts['bookings']:,} bookings "
+          f"and {counts['waitlist']:,} waitlist entries in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
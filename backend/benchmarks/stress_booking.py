@@ -0,0 +1,156 @@
+"""
+Concurrent booking admission stress test
+Fires N simultaneous clients at the same few slots and checks that no slot
+is ever overbooked and that waitlist entries follow arrival order
+
+Usage: python benchmarks/stress_booking.py [clients ...]
+(defaults to 50 100 250 500 clients)
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import func
+from database import db
+from models import User, Booking, TimeSlot, Waitlist, UserRole, BookingStatus, LoadType, WaitlistStatus, ACTIVE_BOOKING_STATUSES
+from services.slot_generator import initialize_machines
+from services.admission import admit_booking
+from services.waitlist_service import waiting_entries_with_position
+
+SLOTS_UNDER_TEST = 3
+
+
+def create_app(db_file):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_file}'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        'pool_size': 32,
+        'max_overflow': 0,
+        'pool_timeout': 120,
+        'connect_args': {'timeout': 30}
+    }
+    db.init_app(app)
+    return app
+
+
+def seed(clients):
+    """Create machines, a few slots for tomorrow and one student per client"""
+    db.create_all()
+    initialize_machines()
+
+    start = datetime.combine(datetime.now().date() + timedelta(days=1), datetime.min.time()) + timedelta(hours=10)
+    slots = []
+    for pair_id in range(1, SLOTS_UNDER_TEST + 1):
+        slot = TimeSlot(
+            pair_id=pair_id,
+            date=start.date(),
+            start_time=start,
+            end_time=start + timedelta(hours=1),
+            available_machines=2
+        )
+        db.session.add(slot)
+        slots.append(slot)
+
+    db.session.add_all([
+        User(email=f'stress{i}@aui.ma', password='x', student_id=f'ST{i:05d}', role=UserRole.STUDENT)
+        for i in range(clients)
+    ])
+    db.session.commit()
+
+    return [slot.id for slot in slots], [user.id for user in User.query.order_by(User.id).all()]
+
+
+def run(clients):
+    db_file = os.path.join(tempfile.mkdtemp(), 'stress.db')
+    app = create_app(db_file)
+
+    with app.app_context():
+        slot_ids, user_ids = seed(clients)
+
+    outcomes = {}
+    arrivals = []
+    arrivals_lock = threading.Lock()
+    barrier = threading.Barrier(clients)
+
+    def client(index):
+        user_id = user_ids[index]
+        slot_id = slot_ids[index % len(slot_ids)]
+        load_type = LoadType.COMBINED if index % 3 else LoadType.SEPARATE_WHITES
+        machines_needed = 2 if load_type != LoadType.COMBINED else 1
+
+        with app.app_context():
+            barrier.wait()
+            outcome, record = admit_booking(user_id, slot_id, load_type, machines_needed)
+            if outcome == 'waitlisted':
+                with arrivals_lock:
+                    arrivals.append((slot_id, record.id))
+            outcomes[index] = outcome
+            db.session.remove()
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    errors = []
+    with app.app_context():
+        for slot in TimeSlot.query.filter(TimeSlot.id.in_(slot_ids)).all():
+            used = db.session.query(func.coalesce(func.sum(Booking.machines_used), 0)).filter(
+                Booking.slot_id == slot.id,
+                Booking.status.in_(ACTIVE_BOOKING_STATUSES)
+            ).scalar()
+
+            if used > slot.available_machines:
+                errors.append(f"slot {slot.id} overbooked: {used} machines used of {slot.available_machines}")
+            if used != slot.booked_machines:
+                errors.append(f"slot {slot.id} counter drift: stored {slot.booked_machines}, actual {used}")
+
+            sequences = [entry.sequence for entry in Waitlist.query.filter_by(
+                slot_id=slot.id,
+                status=WaitlistStatus.WAITING
+            ).order_by(Waitlist.id).all()]
+
+            if sequences != sorted(set(sequences)):
+                errors.append(f"slot {slot.id} waitlist out of arrival order: {sequences}")
+
+            positions = [position for _, position in waiting_entries_with_position(
+                Waitlist.slot_id == slot.id
+            ).order_by(Waitlist.id).all()]
+
+            if positions != list(range(1, len(positions) + 1)):
+                errors.append(f"slot {slot.id} waitlist positions not gap-free: {positions}")
+
+    counts = {}
+    for outcome in outcomes.values():
+        counts[outcome] = counts.get(outcome, 0) + 1
+
+    print(f"{clients:>4} clients  {elapsed:7.3f}s  {clients / elapsed:8.1f} req/s  {counts}")
+    for error in errors:
+        print(f"  ❌ {error}")
+
+    return not errors
+
+
+if __name__ == '__main__':
+    client_counts = [int(arg) for arg in sys.argv[1:]] or [50, 100, 250, 500]
+
+    print(f"=== Booking admission stress test ({SLOTS_UNDER_TEST} slots) ===")
+    results = [run(clients) for clients in client_counts]
+
+    if all(results):
+        print("\n✅ No overbookings detected")
+    else:
+        print("\n❌ Invariant violations detected")
+        sys.exit(1)
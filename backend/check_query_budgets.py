@@ -0,0 +1,214 @@
+"""
+SQL query budget check (N+1 detector) for the API routes
+Seeds a scratch SQLite database with enough rows that a lazy load in a
+loop shows up (several bookings per student, a waitlist of four, a
+no-show slot with a queue), calls every route through the test client
+and fails if one runs more statements than its @query_budget or repeats
+a statement more often than the budget allows. The no-show sweep is
+checked the same way. Every /api route must declare a budget.
+
+Run: python check_query_budgets.py [-v]
+(pytest runs it too, through test_query_budgets.py)
+"""
+
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'budgets.db')
+os.environ.setdefault('EMAIL_WORKERS', '0')
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+import jwt
+from app import create_app, initialize_app_data
+from database import db
+from models import User, Booking, TimeSlot, Waitlist, UserRole, BookingStatus, LoadType
+from services.auth_cache import auth_cache
+from services.occupancy import add_booking
+from services.query_budget import QueryRecorder, budget_for
+from services.scheduler import check_no_shows
+
+STUDENTS = 12
+WAITLIST_LENGTH = 4
+
+
+def seed():
+    """Users, bookings and waitlists; returns the ids the scenarios need"""
+    now = datetime.now().replace(second=0, microsecond=0)
+    today = datetime.now().date()
+
+    users = {'admin': User(email='admin@budget', password='x', student_id='A0', full_name='Admin', role=UserRole.ADMIN),
+             'attendant': User(email='attendant@budget', password='x', student_id='T0', full_name='Attendant',
+                               role=UserRole.ATTENDANT)}
+    students = [User(email=f's{i}@budget', password='x', student_id=f'S{i}', full_name=f'Student {i}',
+                     role=UserRole.STUDENT) for i in range(STUDENTS)]
+    db.session.add_all([*users.values(), *students])
+    db.session.flush()
+
+    # The first open day after today, as generated at startup
+    day = db.session.query(TimeSlot.date).filter(TimeSlot.date > today).order_by(TimeSlot.date).first()[0]
+    slots = TimeSlot.query.filter_by(date=day).order_by(TimeSlot.start_time, TimeSlot.pair_id).all()
+
+    # Two bookings each for the first six students, in different hours
+    for index, student in enumerate(students[:6]):
+        for slot in (slots[index], slots[-1 - index]):
+            add_booking(Booking(user_id=student.id, slot_id=slot.id, load_type=LoadType.COMBINED, machines_used=1))
+
+    # A full slot with a queue behind it
+    full_slot = slots[len(slots) // 2]
+    add_booking(Booking(user_id=students[6].id, slot_id=full_slot.id,
+                        load_type=LoadType.SEPARATE_WHITES, machines_used=2))
+    for sequence, student in enumerate(students[7:7 + WAITLIST_LENGTH], start=1):
+        db.session.add(Waitlist(user_id=student.id, slot_id=full_slot.id, sequence=sequence))
+
+    # Today's board: checked-in bookings, which the no-show sweep leaves alone
+    for index, student in enumerate(students[:6]):
+        start = datetime.combine(today, datetime.min.time()) + timedelta(minutes=index)
+        slot = TimeSlot(pair_id=index % 5 + 1, date=today, start_time=start, end_time=start + timedelta(hours=1))
+        db.session.add(slot)
+        db.session.flush()
+        add_booking(Booking(user_id=student.id, slot_id=slot.id, status=BookingStatus.RECEIVED, machines_used=1))
+
+    # A slot whose bookings became no-shows, with students waiting for it
+    overdue = TimeSlot(pair_id=1, date=now.date(), start_time=now - timedelta(minutes=30),
+                       end_time=now + timedelta(minutes=30))
+    db.session.add(overdue)
+    db.session.flush()
+    for student in students[:2]:
+        add_booking(Booking(user_id=student.id, slot_id=overdue.id, machines_used=1))
+    for sequence, student in enumerate(students[2:5], start=1):
+        db.session.add(Waitlist(user_id=student.id, slot_id=overdue.id, sequence=sequence))
+
+    db.session.commit()
+    first_bookings = {student.id: Booking.query.filter_by(user_id=student.id).order_by(Booking.id).first()
+                      for student in students[:2]}
+    free_slot = next(slot for slot in slots if slot.booked_machines == 0 and abs(
+        (slot.start_time - full_slot.start_time).total_seconds()) > 3 * 3600)
+    return {
+        'day': day.isoformat(),
+        'users': {name: user.id for name, user in users.items()},
+        'students': [student.id for student in students],
+        'full_slot': full_slot.id,
+        'free_slot': free_slot.id,
+        'own_booking': first_bookings[students[0].id].id,
+        'other_booking': first_bookings[students[1].id].id,
+        'waitlist_entry': Waitlist.query.filter_by(user_id=students[7].id).first().id,
+        'full_booking': Booking.query.filter_by(user_id=students[6].id, slot_id=full_slot.id).one().id,
+    }
+
+
+def scenarios(ids):
+    """(role, method, path, json) for every route, in an order that keeps each one meaningful"""
+    day = ids['day']
+    return [
+        (None, 'POST', '/api/auth/register', {'email': 'new@budget', 'password': 'p', 'student_id': 'N1'}),
+        (None, 'POST', '/api/auth/login', {'email': 'new@budget', 'password': 'p'}),
+        ('student', 'GET', f'/api/timeslots?date={day}', None),
+        ('admin', 'GET', f'/api/timeslots?date={day}', None),
+        ('admin', 'GET', '/api/timeslots', None),
+        ('student', 'GET', '/api/machines', None),
+        ('student', 'GET', '/api/bookings', None),
+        ('admin', 'GET', '/api/bookings', None),
+        ('admin', 'GET', '/api/bookings?limit=5&count=true', None),
+        ('admin', 'GET', '/api/bookings?limit=5&sort=created', None),
+        ('student', 'GET', '/api/waitlist', None),
+        ('admin', 'GET', '/api/waitlist', None),
+        ('admin', 'GET', '/api/admin/waitlist', None),
+        ('attendant', 'GET', '/api/admin/waitlist', None),
+        ('admin', 'GET', '/api/admin/stats', None),
+        ('admin', 'GET', '/api/admin/metrics', None),
+        ('student', 'GET', '/api/user/profile', None),
+        ('student', 'PUT', '/api/user/profile', {'full_name': 'Renamed'}),
+        ('student:6', 'POST', '/api/bookings', {'slot_id': ids['free_slot'], 'load_type': 'combined'}),
+        ('student:11', 'POST', '/api/bookings', {'slot_id': ids['full_slot'], 'load_type': 'combined'}),
+        ('admin', 'PUT', f"/api/bookings/{ids['other_booking']}", {'status': 'received'}),
+        ('student', 'DELETE', f"/api/bookings/{ids['own_booking']}", None),
+        ('student:7', 'DELETE', f"/api/waitlist/{ids['waitlist_entry']}", None),
+        ('student:6', 'DELETE', f"/api/bookings/{ids['full_booking']}", None),
+        ('admin', 'PUT', '/api/machines/1', {'status': 'available'}),
+        ('admin', 'PUT', f"/api/timeslots/{ids['free_slot']}/disable", None),
+        ('admin', 'PUT', f"/api/timeslots/{ids['free_slot']}/enable", None),
+        ('admin', 'DELETE', f"/api/timeslots/{ids['full_slot']}", None),
+        ('student', 'POST', '/api/live/token', None),
+        ('student', 'GET', '/api/live/availability', None),
+        ('admin', 'POST', '/api/admin/regenerate-slots', None),
+    ]
+
+
+def token_for(app, ids, role):
+    if role.startswith('student'):
+        user_id = ids['students'][int(role.partition(':')[2] or 0)]
+    else:
+        user_id = ids['users'][role]
+    return jwt.encode({'user_id': user_id, 'exp': datetime.utcnow() + timedelta(hours=1)},
+                      app.config['SECRET_KEY'], algorithm='HS256')
+
+
+def main():
+    verbose = '-v' in sys.argv[1:]
+    app = create_app()
+    client = app.test_client()
+    adapter = app.url_map.bind('localhost')
+
+    with app.app_context():
+        initialize_app_data()
+        ids = seed()
+        db.session.remove()
+
+    failures = []
+    exercised = set()
+
+    def check(label, budget, recorder):
+        _, repeats = recorder.repeats()
+        if budget is None:
+            problems = ['no @query_budget declared']
+            print(f"✗ {label:<60} {len(recorder.statements):>3} statements, max repeat {repeats}")
+        else:
+            problems = budget.violations(recorder.statements)
+            print(f"{'✗' if problems else '✓'} {label:<60} {len(recorder.statements):>3} / {budget.max_queries:<3} "
+                  f"max repeat {repeats} / {budget.max_repeats}")
+        for problem in problems:
+            failures.append(f'{label}: {problem}')
+            print(f"    {problem}")
+        if verbose or problems:
+            for sql in recorder.statements:
+                print(f"      {' '.join(sql.split())[:140]}")
+
+    for role, method, path, body in scenarios(ids):
+        rule, _ = adapter.match(path.partition('?')[0], method=method, return_rule=True)
+        exercised.add(rule.endpoint)
+        headers = {'Authorization': f'Bearer {token_for(app, ids, role)}'} if role else {}
+        # Each call pays for its own authentication, as a request after the cache expired would
+        auth_cache.clear()
+
+        with QueryRecorder() as recorder:
+            response = client.open(path, method=method, json=body, headers=headers, buffered=False)
+        response.close()
+        if response.status_code >= 500:
+            failures.append(f'{method} {path}: status {response.status_code}')
+
+        label = f'{method} {rule.rule} ({role or "anonymous"}) {response.status_code}'
+        check(label, budget_for(app.view_functions[rule.endpoint]), recorder)
+
+    with app.app_context():
+        with QueryRecorder() as recorder:
+            run = check_no_shows()
+        db.session.remove()
+    check(f"check_no_shows ({run['marked']} marked, {run['promoted']} promoted)", budget_for(check_no_shows), recorder)
+
+    for rule in app.url_map.iter_rules():
+        if rule.rule.startswith('/api') and rule.endpoint not in exercised:
+            declared = budget_for(app.view_functions[rule.endpoint])
+            print(f"- {rule.rule:<60} not exercised" + ('' if declared else ', no budget'))
+            if declared is None:
+                failures.append(f'{rule.rule}: no @query_budget declared')
+
+    if failures:
+        print(f"\n❌ {len(failures)} query budget violation(s)")
+        sys.exit(1)
+    print("\n✅ Every route is within its query budget")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""
+EXPLAIN QUERY PLAN regression check for the hot endpoint queries
+Copies data/masbana.db, applies pending migrations to the copy, then runs
+each endpoint's query and fails if SQLite plans a full scan of a table
+that should be reached through an index
+
+Run: python check_query_plans.py
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+from flask import Flask
+from sqlalchemy import event
+from database import db
+from models import Booking, TimeSlot, Waitlist, WaitlistStatus, ACTIVE_BOOKING_STATUSES
+from migrations import run_migrations
+from services.availability import get_slot_availability
+from services.booking_queries import attendant_board_rows, booking_rows, encode_cursor, get_booking_page
+from services.waitlist_service import slots_waited_by, waiting_entries_with_position
+
+# Tables small enough that a scan is expected (10 machines)
+SCAN_ALLOWED = {'machines'}
+
+
+def hot_queries():
+    """(endpoint, callable) pairs mirroring the filters used by the routes"""
+    day = datetime.now().date() + timedelta(days=1)
+    user_id, slot_id = 1, 1
+
+    return [
+        ('GET /api/timeslots?date', lambda: get_slot_availability(date=day)),
+        ('GET /api/timeslots?date&pair_id', lambda: get_slot_availability(date=day, pair_id=1)),
+        ('GET /api/bookings (student)', lambda: booking_rows({'user_id': user_id}).all()),
+        # The unfiltered first page needs planner statistics (PRAGMA optimize) to walk
+        # ix_time_slots_date_start; later pages and date filters use it regardless
+        ('GET /api/bookings?cursor (admin)', lambda: get_booking_page(
+            {}, cursor=encode_cursor(TimeSlot(date=day, start_time=datetime.now()), Booking(id=10 ** 9)), limit=50
+        )),
+        ('GET /api/bookings?date_from&date_to (admin)', lambda: get_booking_page(
+            {'date_from': day, 'date_to': day + timedelta(days=6)}, limit=50
+        )),
+        ('GET /api/bookings?sort=created&cursor (admin)', lambda: get_booking_page(
+            {}, cursor=encode_cursor(None, Booking(id=10 ** 9, created_at=datetime.now()), sort='created'),
+            limit=5, sort='created'
+        )),
+        ('GET /api/attendant/today', lambda: attendant_board_rows(day)),
+        ('POST /api/bookings existing booking', lambda: Booking.query.filter_by(
+            user_id=user_id, slot_id=slot_id
+        ).filter(Booking.status.in_(ACTIVE_BOOKING_STATUSES)).first()),
+        ('POST /api/bookings existing waitlist', lambda: Waitlist.query.filter_by(
+            user_id=user_id, slot_id=slot_id, status=WaitlistStatus.WAITING
+        ).first()),
+        ('POST /api/bookings same-day bookings', lambda: db.session.query(Booking).join(TimeSlot).filter(
+            Booking.user_id == user_id,
+            TimeSlot.date == day,
+            Booking.status.in_(ACTIVE_BOOKING_STATUSES)
+        ).all()),
+        ('POST /api/bookings waitlist depth', lambda: Waitlist.query.filter_by(
+            slot_id=slot_id, status=WaitlistStatus.WAITING
+        ).count()),
+        ('DELETE /api/bookings promotion queue', lambda: Waitlist.query.filter_by(
+            slot_id=slot_id, status=WaitlistStatus.WAITING
+        ).order_by(Waitlist.sequence, Waitlist.id).all()),
+        ('DELETE /api/timeslots active bookings', lambda: Booking.query.filter_by(slot_id=slot_id).filter(
+            Booking.status.in_(ACTIVE_BOOKING_STATUSES)
+        ).all()),
+        ('GET /api/waitlist (student)', lambda: waiting_entries_with_position(slots_waited_by(user_id)).filter(
+            Waitlist.user_id == user_id
+        ).order_by(Waitlist.created_at).all()),
+    ]
+
+
+def full_scans(connection, statement, parameters):
+    """Return the tables SQLite would scan end to end for this statement"""
+    plan = connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters).fetchall()
+    scanned = []
+    for row in plan:
+        detail = row[-1]
+        if not detail.startswith('SCAN '):
+            continue
+        words = detail.split()
+        table = words[2] if words[1] == 'TABLE' else words[1]
+        # Materialised subqueries and tiny tables are fine
+        if table in SCAN_ALLOWED or table.startswith(('anon_', '(subquery')):
+            continue
+        scanned.append(detail)
+    return scanned
+
+
+def check_query_plans(db_file):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_file}'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+
+    failures = []
+    with app.app_context():
+        run_migrations()
+
+        captured = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith('SELECT'):
+                captured.append((statement, parameters))
+
+        event.listen(db.engine, 'before_cursor_execute', capture)
+
+        for endpoint, run_query in hot_queries():
+            captured.clear()
+            run_query()
+            statements = list(captured)
+
+            with db.engine.connect() as connection:
+                for statement, parameters in statements:
+                    scans = full_scans(connection, statement, parameters)
+                    status = '❌' if scans else '✓'
+                    print(f"{status} {endpoint}")
+                    for detail in scans:
+                        print(f"    {detail}")
+                        failures.append((endpoint, detail))
+
+        event.remove(db.engine, 'before_cursor_execute', capture)
+
+    return failures
+
+
+if __name__ == '__main__':
+    source = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'masbana.db')
+    work_dir = tempfile.mkdtemp()
+    db_file = os.path.join(work_dir, 'masbana.db')
+    if os.path.exists(source):
+        shutil.copyfile(source, db_file)
+
+    print("=== EXPLAIN QUERY PLAN check ===")
+    failures = check_query_plans(db_file.replace('\\', '/'))
+    shutil.rmtree(work_dir, ignore_errors=True)
+
+    if failures:
+        print(f"\n❌ {len(failures)} query plan(s) fall back to a full table scan")
+        sys.exit(1)
+
+    print("\n✅ All hot queries use indexes")
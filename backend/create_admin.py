@@ -1,7 +1,14 @@
-from app import app, db
+from app import create_app
+from database import db
+from migrations import run_migrations
 from models import User, UserRole
 
+app = create_app()
+
 with app.app_context():
+    # create_app() leaves the schema alone; bring it up to date (as init-data does)
+    run_migrations()
+
     # Check if admin already exists
     admin = User.query.filter_by(email='admin@laundry.com').first()
 
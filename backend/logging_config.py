@@ -0,0 +1,157 @@
+"""
+Structured logging for the backend
+
+Every module logs through logging.getLogger(__name__). configure_logging()
+sends all records through a QueueHandler so request threads only enqueue;
+a single QueueListener thread formats and writes them.
+
+Environment:
+- LOG_LEVEL: root level (default INFO)
+- LOG_LEVELS: per-module levels, e.g. "services.scheduler=DEBUG,app=WARNING"
+- LOG_FORMAT: text (default) or json
+- LOG_SAMPLE_PER_SECOND / LOG_SAMPLE_BURST: rate limit for sampled records
+
+Per-row debug output is logged with extra=SAMPLED. Each call site (logger
+and message template) gets a token bucket, and the next record that gets
+through reports how many similar records were dropped.
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import time
+import uuid
+from logging.handlers import QueueHandler, QueueListener
+from threading import Lock
+
+from flask import g, has_request_context, request
+
+SAMPLED = {'sampled': True}
+
+LOG_SAMPLE_PER_SECOND = float(os.environ.get('LOG_SAMPLE_PER_SECOND', 5))
+LOG_SAMPLE_BURST = int(os.environ.get('LOG_SAMPLE_BURST', 20))
+
+TEXT_FORMAT = '%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s'
+
+_listener = None
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamp records with the current request id ('-' outside a request)"""
+
+    def filter(self, record):
+        record.request_id = g.get('request_id', '-') if has_request_context() else '-'
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Token bucket per call site for records logged with extra=SAMPLED"""
+
+    def __init__(self, per_second=LOG_SAMPLE_PER_SECOND, burst=LOG_SAMPLE_BURST):
+        super().__init__()
+        self.per_second = per_second
+        self.burst = burst
+        self._buckets = {}
+        self._lock = Lock()
+
+    def filter(self, record):
+        if not getattr(record, 'sampled', False):
+            return True
+
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            tokens, last, suppressed = self._buckets.get(key, (self.burst, now, 0))
+            tokens = min(self.burst, tokens + (now - last) * self.per_second)
+            if tokens < 1:
+                self._buckets[key] = (tokens, now, suppressed + 1)
+                return False
+            self._buckets[key] = (tokens - 1, now, 0)
+
+        record.suppressed = suppressed
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line"""
+
+    def format(self, record):
+        entry = {
+            'ts': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'request_id': getattr(record, 'request_id', '-'),
+            'message': record.getMessage(),
+        }
+        if getattr(record, 'suppressed', 0):
+            entry['suppressed'] = record.suppressed
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record):
+        line = super().format(record)
+        if getattr(record, 'suppressed', 0):
+            line += f' ({record.suppressed} similar suppressed)'
+        return line
+
+
+def _parse_levels(spec):
+    """'services.scheduler=DEBUG,app=WARNING' -> {'services.scheduler': 'DEBUG', 'app': 'WARNING'}"""
+    levels = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        name, _, level = item.partition('=')
+        levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def _assign_request_id():
+    g.request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex[:12]
+
+
+def _echo_request_id(response):
+    if 'request_id' in g:
+        response.headers['X-Request-ID'] = g.request_id
+    return response
+
+
+def configure_logging(app=None):
+    """
+    Install the queue-based handler on the root logger (once per process)
+    With an app, also tag every request with an X-Request-ID
+    """
+    global _listener
+
+    if _listener is None:
+        if os.environ.get('LOG_FORMAT', 'text').lower() == 'json':
+            formatter = JsonFormatter()
+        else:
+            formatter = TextFormatter(TEXT_FORMAT)
+
+        stream_handler = logging.StreamHandler()
+        stream_handler.setFormatter(formatter)
+
+        # Filters run on the calling thread, before the record is queued
+        log_queue = queue.SimpleQueue()
+        queue_handler = QueueHandler(log_queue)
+        queue_handler.addFilter(RequestIdFilter())
+        queue_handler.addFilter(SamplingFilter())
+
+        root = logging.getLogger()
+        root.handlers[:] = [queue_handler]
+        root.setLevel(os.environ.get('LOG_LEVEL', 'INFO').upper())
+
+        for name, level in _parse_levels(os.environ.get('LOG_LEVELS', '')).items():
+            logging.getLogger(name).setLevel(level)
+
+        _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+
+    if app is not None:
+        app.before_request(_assign_request_id)
+        app.after_request(_echo_request_id)
@@ -0,0 +1,109 @@
+"""
+Versioned schema migrations
+
+db.create_all() only creates missing tables, so columns and indexes added
+after a database was first created (e.g. data/masbana.db) are applied here.
+Each migration runs in its own transaction together with the row that
+records it in schema_migrations, so a failed step leaves nothing half-done
+and is simply retried on the next start.
+
+To add a migration, append a (version, description, function) tuple to
+MIGRATIONS. Versions must be increasing and never reused.
+"""
+
+from database import db
+from models import TimeSlot, Booking, Waitlist
+from services.occupancy import rebuild_occupancy_counters
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _add_booked_machines():
+    """Add the per-slot occupancy counter and fill it from active bookings"""
+    columns = [column['name'] for column in inspect(db.session.connection()).get_columns('time_slots')]
+    if 'booked_machines' not in columns:
+        db.session.execute(text(
+            'ALTER TABLE time_slots ADD COLUMN booked_machines INTEGER NOT NULL DEFAULT 0'
+        ))
+
+    rebuild_occupancy_counters()
+
+
+def _add_hot_path_indexes():
+    """Create the composite and partial indexes declared on the models"""
+    connection = db.session.connection()
+    for model in (TimeSlot, Booking, Waitlist):
+        for index in model.__table__.indexes:
+            index.create(bind=connection, checkfirst=True)
+
+
+def _add_outbox_template_columns():
+    """Let outbox rows carry a template name and context instead of rendered bodies"""
+    columns = [column['name'] for column in inspect(db.session.connection()).get_columns('email_outbox')]
+    if 'template' not in columns:
+        db.session.execute(text('ALTER TABLE email_outbox ADD COLUMN template VARCHAR(50)'))
+    if 'context' not in columns:
+        db.session.execute(text('ALTER TABLE email_outbox ADD COLUMN context TEXT'))
+
+
+MIGRATIONS = [
+    (1, 'Add time_slots.booked_machines occupancy counter', _add_booked_machines),
+    (2, 'Add indexes for booking, waitlist and time slot lookups', _add_hot_path_indexes),
+    (3, 'Add email_outbox.template and context', _add_outbox_template_columns),
+    (4, 'Add time_slots (date, start_time) index for booking lists', _add_hot_path_indexes),
+    (5, 'Add bookings.created_at index for recent bookings', _add_hot_path_indexes),
+]
+
+
+def _applied_versions():
+    db.session.execute(text(
+        'CREATE TABLE IF NOT EXISTS schema_migrations ('
+        'version INTEGER PRIMARY KEY, '
+        'description VARCHAR(255) NOT NULL, '
+        'applied_at TIMESTAMP NOT NULL)'
+    ))
+    db.session.commit()
+
+    return {row[0] for row in db.session.execute(text('SELECT version FROM schema_migrations'))}
+
+
+def run_migrations():
+    """
+    Apply every pending migration in version order
+    Safe to call on every start and from several processes at once
+    Returns the list of versions applied by this call
+    """
+    # Tables that do not exist yet are created straight from the models
+    db.create_all()
+
+    applied = _applied_versions()
+    newly_applied = []
+
+    for version, description, migrate in MIGRATIONS:
+        if version in applied:
+            continue
+
+        try:
+            migrate()
+            db.session.execute(
+                text('INSERT INTO schema_migrations (version, description, applied_at) '
+                     'VALUES (:version, :description, :applied_at)'),
+                {'version': version, 'description': description, 'applied_at': datetime.utcnow()}
+            )
+            db.session.commit()
+        except IntegrityError:
+            # Another process recorded this version first
+            db.session.rollback()
+            continue
+        except Exception:
+            db.session.rollback()
+            raise
+
+        newly_applied.append(version)
+        logger.info("Applied migration %s: %s", version, description)
+
+    return newly_applied
@@ -16,6 +16,9 @@ class BookingStatus(str, Enum):
     NO_SHOW = 'no_show'
     CANCELLED = 'cancelled'
 
+# Statuses that occupy machines in a slot
+ACTIVE_BOOKING_STATUSES = (BookingStatus.CONFIRMED, BookingStatus.RECEIVED, BookingStatus.WASHING)
+
 class LoadType(str, Enum):
     COMBINED = 'combined'
     SEPARATE_WHITES = 'separate_whites'
@@ -26,6 +29,12 @@ class WaitlistStatus(str, Enum):
     PROMOTED = 'promoted'
     EXPIRED = 'expired'
 
+class EmailStatus(str, Enum):
+    PENDING = 'pending'
+    SENDING = 'sending'
+    SENT = 'sent'
+    DEAD = 'dead'
+
 class User(db.Model):
     __tablename__ = 'users'
     
@@ -59,7 +68,8 @@ class TimeSlot(db.Model):
     date = db.Column(db.Date, nullable=False)
     start_time = db.Column(db.DateTime, nullable=False)
     end_time = db.Column(db.DateTime, nullable=False)
-    available_machines = db.Column(db.Integer, default=2)  # 0, 1, or 2
+    available_machines = db.Column(db.Integer, default=2)  # 0 when disabled by admin
+    booked_machines = db.Column(db.Integer, default=0, server_default='0', nullable=False)  # Machines held by active bookings
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Relationships
@@ -67,7 +77,11 @@ class TimeSlot(db.Model):
     waitlist_entries = db.relationship('Waitlist', back_populates='time_slot', lazy=True)
     
     # Unique constraint: one slot per pair per time
-    __table_args__ = (db.UniqueConstraint('pair_id', 'start_time', name='unique_pair_time'),)
+    __table_args__ = (
+        db.UniqueConstraint('pair_id', 'start_time', name='unique_pair_time'),
+        db.Index('ix_time_slots_date_pair', 'date', 'pair_id'),
+        db.Index('ix_time_slots_date_start', 'date', 'start_time'),  # Booking list sort order
+    )
 
 class Booking(db.Model):
     __tablename__ = 'bookings'
@@ -87,13 +101,21 @@ class Booking(db.Model):
     user = db.relationship('User', back_populates='bookings')
     time_slot = db.relationship('TimeSlot', back_populates='bookings')
 
+    __table_args__ = (
+        db.Index('ix_bookings_slot_status', 'slot_id', 'status'),
+        db.Index('ix_bookings_user_status', 'user_id', 'status'),
+        db.Index('ix_bookings_created_at', 'created_at'),  # Recent bookings (sort=created)
+    )
+
 class Waitlist(db.Model):
     __tablename__ = 'waitlist'
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     slot_id = db.Column(db.Integer, db.ForeignKey('time_slots.id'), nullable=False)
-    position = db.Column(db.Integer, nullable=False)
+    # Immutable enqueue order within the slot, stored in the legacy 'position'
+    # column; the place in the queue is derived on read (services/waitlist_service.py)
+    sequence = db.Column('position', db.Integer, nullable=False)
     status = db.Column(db.Enum(WaitlistStatus), default=WaitlistStatus.WAITING, nullable=False)
     load_type = db.Column(db.Enum(LoadType), default=LoadType.COMBINED, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -101,3 +123,43 @@ class Waitlist(db.Model):
     # Relationships
     user = db.relationship('User', back_populates='waitlist_entries')
     time_slot = db.relationship('TimeSlot', back_populates='waitlist_entries')
+
+    __table_args__ = (
+        db.Index('ix_waitlist_slot_status_position', 'slot_id', 'status', 'position'),
+        db.Index('ix_waitlist_user_status', 'user_id', 'status'),
+        # Partial index over the queue itself; Postgres picks it for WAITING lookups
+        db.Index('ix_waitlist_waiting_slot', 'slot_id', 'position',
+                 sqlite_where=db.text("status = 'WAITING'"),
+                 postgresql_where=db.text("status = 'WAITING'")),
+    )
+
+class EmailOutbox(db.Model):
+    __tablename__ = 'email_outbox'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    recipients = db.Column(db.Text, nullable=False)  # Comma-separated addresses
+    subject = db.Column(db.String(255), nullable=False)
+    text_body = db.Column(db.Text)
+    html_body = db.Column(db.Text)
+    template = db.Column(db.String(50))  # Rendered by the worker when set
+    context = db.Column(db.Text)  # JSON values for the template
+    status = db.Column(db.Enum(EmailStatus), default=EmailStatus.PENDING, nullable=False)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    claim_token = db.Column(db.String(36))  # Worker batch currently sending it
+    claimed_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('ix_email_outbox_status_next_attempt', 'status', 'next_attempt_at'),
+        db.Index('ix_email_outbox_claim_token', 'claim_token'),
+    )
+
+class DataVersion(db.Model):
+    __tablename__ = 'data_versions'
+
+    # Bumped by every commit that changes the resource (services/data_versions.py)
+    resource = db.Column(db.String(50), primary_key=True)  # 'slots:<date>', 'slots:*' or 'machines'
+    version = db.Column(db.Integer, default=0, nullable=False)
@@ -0,0 +1,19 @@
+from app import create_app
+from migrations import run_migrations
+from services.occupancy import reconcile_occupancy
+
+app = create_app()
+
+with app.app_context():
+    # create_app() leaves the schema alone; bring it up to date (as init-data does)
+    run_migrations()
+
+    # Rebuild every slot's booked_machines counter from its active bookings
+    drift = reconcile_occupancy()
+
+    if drift:
+        print(f"Fixed {len(drift)} slot counter(s) that had drifted:")
+        for slot_id, stored, actual in drift:
+            print(f"  Slot {slot_id}: stored={stored}, actual={actual}")
+    else:
+        print("All slot occupancy counters are consistent!")
@@ -1,9 +1,11 @@
 from flask import Blueprint, request, jsonify
 from database import db
 from models import Machine
-from services.slot_generator import generate_daily_slots, initialize_machines
+from services.slot_generator import generate_daily_slots, generate_slot_horizon, initialize_machines
 from datetime import datetime, timedelta
+import logging
 
+logger = logging.getLogger(__name__)
 admin_bp = Blueprint('admin', __name__)
 
 @admin_bp.route('/api/admin/generate-slots', methods=['POST'])
@@ -30,6 +32,7 @@ def generate_slots():
         }), 201
     
     except Exception as e:
+        logger.exception("Error in generate_slots")
         return jsonify({'success': False, 'message': str(e)}), 500
 
 @admin_bp.route('/api/admin/generate-week-slots', methods=['POST'])
@@ -42,13 +45,12 @@ def generate_week_slots():
             'end': '20:00'
         })
         
-        total_slots = 0
-        start_date = datetime.now().date()
-        
-        for i in range(7):
-            date = start_date + timedelta(days=i)
-            slots_created = generate_daily_slots(date, operational_hours)
-            total_slots += slots_created
+        total_slots = generate_slot_horizon(
+            start_date=datetime.now().date(),
+            days=7,
+            hours_by_weekday={weekday: operational_hours for weekday in range(7)},
+            skip_existing_dates=False
+        )
         
         return jsonify({
             'success': True,
@@ -57,6 +59,7 @@ def generate_week_slots():
         }), 201
     
     except Exception as e:
+        logger.exception("Error in generate_week_slots")
         return jsonify({'success': False, 'message': str(e)}), 500
 
 @admin_bp.route('/api/admin/initialize-machines', methods=['POST'])
@@ -82,6 +85,7 @@ def init_machines():
         }), 201
     
     except Exception as e:
+        logger.exception("Error in init_machines")
         return jsonify({'success': False, 'message': str(e)}), 500
 
 @admin_bp.route('/api/admin/machines', methods=['GET'])
@@ -102,6 +106,7 @@ def get_machines():
         return jsonify({'success': True, 'machines': result}), 200
     
     except Exception as e:
+        logger.exception("Error in get_machines")
         return jsonify({'success': False, 'message': str(e)}), 500
 
 @admin_bp.route('/api/admin/machines/<int:machine_id>/status', methods=['PUT'])
@@ -132,5 +137,6 @@ def update_machine_status(machine_id):
         }), 200
     
     except Exception as e:
+        logger.exception("Error in update_machine_status")
         db.session.rollback()
         return jsonify({'success': False, 'message': str(e)}), 500
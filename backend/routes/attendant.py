@@ -1,50 +1,51 @@
 from flask import Blueprint, request, jsonify
 from database import db
-from models import Booking, TimeSlot, User, BookingStatus
+from models import Booking, BookingStatus
 from datetime import datetime, timedelta
 from services.waitlist_service import promote_from_waitlist
+from services.occupancy import set_booking_status
+from services.booking_queries import attendant_board_rows
+import logging
 
+logger = logging.getLogger(__name__)
+# Not registered by create_app(); these routes do not authenticate their callers
 attendant_bp = Blueprint('attendant', __name__)
 
 @attendant_bp.route('/api/attendant/today', methods=['GET'])
 def get_today_bookings():
-    """Get all bookings for today, ordered by time slot"""
+    """Get all active bookings for today, ordered by time slot (one joined query)"""
     try:
         today = datetime.now().date()
         
-        bookings = Booking.query.join(TimeSlot).join(User).filter(
-            TimeSlot.date == today,
-            Booking.status.in_([BookingStatus.CONFIRMED, BookingStatus.RECEIVED, BookingStatus.WASHING])
-        ).order_by(TimeSlot.start_time).all()
-        
         result = []
-        for booking in bookings:
+        for row in attendant_board_rows(today):
             result.append({
-                'id': booking.id,
-                'ticket_id': booking.ticket_id,
-                'status': booking.status.value,
-                'load_type': booking.load_type.value,
-                'machines_used': booking.machines_used,
+                'id': row.id,
+                'ticket_id': row.ticket_id,
+                'status': row.status.value,
+                'load_type': row.load_type.value,
+                'machines_used': row.machines_used,
                 'student': {
-                    'id': booking.user.id,
-                    'name': booking.user.full_name,
-                    'student_id': booking.user.student_id,
-                    'email': booking.user.email,
-                    'phone': booking.user.phone
+                    'id': row.user_id,
+                    'name': row.full_name,
+                    'student_id': row.student_id,
+                    'email': row.email,
+                    'phone': row.phone
                 },
                 'slot': {
-                    'id': booking.time_slot.id,
-                    'pair_id': booking.time_slot.pair_id,
-                    'start_time': booking.time_slot.start_time.isoformat(),
-                    'end_time': booking.time_slot.end_time.isoformat()
+                    'id': row.slot_id,
+                    'pair_id': row.pair_id,
+                    'start_time': row.start_time.isoformat(),
+                    'end_time': row.end_time.isoformat()
                 },
-                'drop_off_time': booking.drop_off_time.isoformat() if booking.drop_off_time else None,
-                'created_at': booking.created_at.isoformat()
+                'drop_off_time': row.drop_off_time.isoformat() if row.drop_off_time else None,
+                'created_at': row.created_at.isoformat()
             })
         
         return jsonify({'success': True, 'bookings': result}), 200
     
     except Exception as e:
+        logger.exception("Error in get_today_bookings")
         return jsonify({'success': False, 'message': str(e)}), 500
 
 @attendant_bp.route('/api/attendant/checkin/<ticket_id>', methods=['POST'])
@@ -63,7 +64,9 @@ def checkin_booking(ticket_id):
             return jsonify({'success': False, 'message': 'Booking was marked as no-show'}), 400
         
         # Update status to received
-        booking.status = BookingStatus.RECEIVED
+        if not set_booking_status(booking, BookingStatus.RECEIVED):
+            db.session.rollback()
+            return jsonify({'success': False, 'message': 'The time slot no longer has room for this booking'}), 409
         booking.updated_at = datetime.utcnow()
         
         db.session.commit()
@@ -81,6 +84,7 @@ def checkin_booking(ticket_id):
         }), 200
     
     except Exception as e:
+        logger.exception("Error in checkin_booking")
         db.session.rollback()
         return jsonify({'success': False, 'message': str(e)}), 500
 
@@ -93,25 +97,26 @@ def mark_no_show(booking_id):
         if not booking:
             return jsonify({'success': False, 'message': 'Booking not found'}), 404
         
-        # Free up the machines
-        booking.time_slot.available_machines += booking.machines_used
-        
-        # Update booking status
-        booking.status = BookingStatus.NO_SHOW
+        # Update booking status and free up the machines
+        if not set_booking_status(booking, BookingStatus.NO_SHOW):
+            db.session.rollback()
+            return jsonify({'success': False, 'message': 'The time slot no longer has room for this booking'}), 409
         booking.updated_at = datetime.utcnow()
+        slot_id = booking.slot_id
         
         db.session.commit()
         
         # Trigger waitlist promotion
-        promote_from_waitlist(booking.slot_id)
+        promote_from_waitlist(slot_id)
         
         return jsonify({
             'success': True,
             'message': 'Booking marked as no-show',
-            'booking_id': booking.id
+            'booking_id': booking_id
         }), 200
     
     except Exception as e:
+        logger.exception("Error in mark_no_show")
         db.session.rollback()
         return jsonify({'success': False, 'message': str(e)}), 500
 
@@ -135,7 +140,9 @@ def update_booking_status(booking_id):
         except KeyError:
             return jsonify({'success': False, 'message': f'Invalid status: {new_status}'}), 400
         
-        booking.status = status_enum
+        if not set_booking_status(booking, status_enum):
+            db.session.rollback()
+            return jsonify({'success': False, 'message': 'The time slot no longer has room for this booking'}), 409
         booking.updated_at = datetime.utcnow()
         
         db.session.commit()
@@ -150,5 +157,6 @@ def update_booking_status(booking_id):
         }), 200
     
     except Exception as e:
+        logger.exception("Error in update_booking_status")
         db.session.rollback()
         return jsonify({'success': False, 'message': str(e)}), 500
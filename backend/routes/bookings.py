@@ -2,9 +2,16 @@ from flask import Blueprint, request, jsonify
 from database import db
 from models import TimeSlot, Booking, User, BookingStatus, LoadType
 from datetime import datetime, timedelta
+from sqlalchemy.orm import contains_eager
 from services.waitlist_service import promote_from_waitlist
+from services.notifications import send_cancellation
+from services.admission import try_reserve_machines
+from services.availability import get_slot_availability
+from services.occupancy import free_machines, set_booking_status
 import uuid
+import logging
 
+logger = logging.getLogger(__name__)
 bookings_bp = Blueprint('bookings', __name__)
 
 @bookings_bp.route('/api/slots', methods=['GET'])
@@ -15,28 +22,29 @@ def get_available_slots():
         date_str = request.args.get('date', datetime.now().strftime('%Y-%m-%d'))
         date = datetime.strptime(date_str, '%Y-%m-%d').date()
         
-        # Query available slots
-        slots = TimeSlot.query.filter(
-            TimeSlot.date == date,
-            TimeSlot.available_machines > 0
-        ).order_by(TimeSlot.start_time).all()
+        # Slots with room, counted the way admission counts them
+        slots = sorted(get_slot_availability(date=date), key=lambda slot: (slot.start_time, slot.pair_id))
         
         result = []
         for slot in slots:
+            free = free_machines(slot.available_machines, slot.machines_used, slot.working_machines)
+            if not free:
+                continue
             result.append({
                 'id': slot.id,
                 'pair_id': slot.pair_id,
                 'date': slot.date.isoformat(),
                 'start_time': slot.start_time.isoformat(),
                 'end_time': slot.end_time.isoformat(),
-                'available_machines': slot.available_machines,
-                'can_book_combined': slot.available_machines >= 1,
-                'can_book_separate': slot.available_machines >= 2
+                'available_machines': free,
+                'can_book_combined': free >= 1,
+                'can_book_separate': free >= 2
             })
         
         return jsonify({'success': True, 'slots': result}), 200
     
     except Exception as e:
+        logger.exception("Error in get_available_slots")
         return jsonify({'success': False, 'message': str(e)}), 500
 
 @bookings_bp.route('/api/bookings', methods=['POST'])
@@ -62,10 +70,12 @@ def create_booking():
         # Check availability based on load type
         machines_needed = 2 if load_type in ['separate_whites', 'separate_colors'] else 1
         
-        if slot.available_machines < machines_needed:
+        # Reserve with the conditional UPDATE, so two requests can never both take the last machine
+        if not try_reserve_machines(slot_id, machines_needed):
+            db.session.rollback()
             return jsonify({
                 'success': False, 
-                'message': f'Not enough machines available. Need {machines_needed}, available: {slot.available_machines}'
+                'message': f'Not enough machines available. Need {machines_needed}'
             }), 400
         
         # Create booking with unique ticket ID
@@ -79,10 +89,6 @@ def create_booking():
             machines_used=machines_needed,
             drop_off_time=datetime.fromisoformat(drop_off_time) if drop_off_time else None
         )
-        
-        # Decrement available machines
-        slot.available_machines -= machines_needed
-        
         db.session.add(booking)
         db.session.commit()
         
@@ -101,6 +107,7 @@ def create_booking():
         }), 201
     
     except Exception as e:
+        logger.exception("Error in create_booking")
         db.session.rollback()
         return jsonify({'success': False, 'message': str(e)}), 500
 
@@ -108,7 +115,9 @@ def create_booking():
 def get_user_bookings(user_id):
     """Get all bookings for a specific user"""
     try:
-        bookings = Booking.query.filter_by(user_id=user_id).join(TimeSlot).order_by(TimeSlot.start_time.desc()).all()
+        bookings = Booking.query.filter_by(user_id=user_id).join(TimeSlot).options(
+            contains_eager(Booking.time_slot)
+        ).order_by(TimeSlot.start_time.desc()).all()
         
         result = []
         for booking in bookings:
@@ -132,6 +141,7 @@ def get_user_bookings(user_id):
         return jsonify({'success': True, 'bookings': result}), 200
     
     except Exception as e:
+        logger.exception("Error in get_user_bookings")
         return jsonify({'success': False, 'message': str(e)}), 500
 
 @bookings_bp.route('/api/bookings/<int:booking_id>', methods=['DELETE'])
@@ -143,18 +153,16 @@ def cancel_booking(booking_id):
             return jsonify({'success': False, 'message': 'Booking not found'}), 404
         
         # Check if cancellation is allowed (>1 hour before slot)
-        time_until_slot = booking.time_slot.start_time - datetime.utcnow()
+        time_until_slot = booking.time_slot.start_time - datetime.now()
         if time_until_slot < timedelta(hours=1):
             return jsonify({
                 'success': False,
                 'message': 'Cannot cancel booking less than 1 hour before scheduled time'
             }), 400
         
-        # Free up the machines
-        booking.time_slot.available_machines += booking.machines_used
-        
-        # Update booking status
-        booking.status = BookingStatus.CANCELLED
+        # Update booking status and free up the machines
+        set_booking_status(booking, BookingStatus.CANCELLED)
+        send_cancellation(booking.user, booking)
         
         db.session.commit()
         
@@ -167,5 +175,6 @@ def cancel_booking(booking_id):
         }), 200
     
     except Exception as e:
+        logger.exception("Error in cancel_booking")
         db.session.rollback()
         return jsonify({'success': False, 'message': str(e)}), 500
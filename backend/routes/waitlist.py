@@ -1,8 +1,12 @@
 from flask import Blueprint, request, jsonify
 from database import db
 from models import Waitlist, TimeSlot, User, WaitlistStatus, LoadType
+from services.waitlist_service import get_waitlist_position, slots_waited_by, waiting_entries_with_position
 from datetime import datetime
+from sqlalchemy.orm import contains_eager
+import logging
 
+logger = logging.getLogger(__name__)
 waitlist_bp = Blueprint('waitlist', __name__)
 
 @waitlist_bp.route('/api/waitlist', methods=['POST'])
@@ -24,7 +28,7 @@ def join_waitlist():
             return jsonify({'success': False, 'message': 'Time slot not found'}), 404
         
         # Check if slot is in the past
-        if slot.start_time < datetime.utcnow():
+        if slot.start_time < datetime.now():
             return jsonify({'success': False, 'message': 'Cannot join waitlist for past slots'}), 400
         
         # Check waitlist cap (max 10 people)
@@ -46,19 +50,16 @@ def join_waitlist():
         if existing_entry:
             return jsonify({'success': False, 'message': 'Already on waitlist for this slot'}), 400
         
-        # Calculate position (next available position)
-        max_position = db.session.query(db.func.max(Waitlist.position)).filter_by(
-            slot_id=slot_id,
-            status=WaitlistStatus.WAITING
+        # Next enqueue sequence for the slot (never reused)
+        last_sequence = db.session.query(db.func.max(Waitlist.sequence)).filter_by(
+            slot_id=slot_id
         ).scalar() or 0
         
-        position = max_position + 1
-        
         # Create waitlist entry
         waitlist_entry = Waitlist(
             user_id=user_id,
             slot_id=slot_id,
-            position=position,
+            sequence=last_sequence + 1,
             status=WaitlistStatus.WAITING,
             load_type=LoadType[load_type.upper()] if isinstance(load_type, str) else load_type
         )
@@ -71,13 +72,14 @@ def join_waitlist():
             'message': 'Successfully joined waitlist',
             'waitlist_entry': {
                 'id': waitlist_entry.id,
-                'position': waitlist_entry.position,
+                'position': get_waitlist_position(waitlist_entry),
                 'slot_id': waitlist_entry.slot_id,
                 'status': waitlist_entry.status.value
             }
         }), 201
     
     except Exception as e:
+        logger.exception("Error in join_waitlist")
         db.session.rollback()
         return jsonify({'success': False, 'message': str(e)}), 500
 
@@ -85,16 +87,15 @@ def join_waitlist():
 def get_user_waitlist(user_id):
     """Get all waitlist entries for a user"""
     try:
-        waitlist_entries = Waitlist.query.filter_by(
-            user_id=user_id,
-            status=WaitlistStatus.WAITING
-        ).join(TimeSlot).order_by(TimeSlot.start_time).all()
+        waitlist_entries = waiting_entries_with_position(slots_waited_by(user_id)).filter(
+            Waitlist.user_id == user_id
+        ).join(TimeSlot).options(contains_eager(Waitlist.time_slot)).order_by(TimeSlot.start_time).all()
         
         result = []
-        for entry in waitlist_entries:
+        for entry, position in waitlist_entries:
             result.append({
                 'id': entry.id,
-                'position': entry.position,
+                'position': position,
                 'load_type': entry.load_type.value,
                 'status': entry.status.value,
                 'created_at': entry.created_at.isoformat(),
@@ -110,6 +111,7 @@ def get_user_waitlist(user_id):
         return jsonify({'success': True, 'waitlist': result}), 200
     
     except Exception as e:
+        logger.exception("Error in get_user_waitlist")
         return jsonify({'success': False, 'message': str(e)}), 500
 
 @waitlist_bp.route('/api/waitlist/<int:waitlist_id>', methods=['DELETE'])
@@ -120,23 +122,13 @@ def leave_waitlist(waitlist_id):
         if not entry:
             return jsonify({'success': False, 'message': 'Waitlist entry not found'}), 404
         
-        slot_id = entry.slot_id
-        position = entry.position
-        
-        # Remove entry
+        # Remove entry; the positions of the others are derived on read
         db.session.delete(entry)
-        
-        # Update positions of entries after this one
-        Waitlist.query.filter(
-            Waitlist.slot_id == slot_id,
-            Waitlist.position > position,
-            Waitlist.status == WaitlistStatus.WAITING
-        ).update({Waitlist.position: Waitlist.position - 1})
-        
         db.session.commit()
         
         return jsonify({'success': True, 'message': 'Left waitlist successfully'}), 200
     
     except Exception as e:
+        logger.exception("Error in leave_waitlist")
         db.session.rollback()
         return jsonify({'success': False, 'message': str(e)}), 500
@@ -0,0 +1,248 @@
+"""
+Aggregated figures for the admin dashboard (GET /api/admin/stats)
+
+Every figure comes from a GROUP BY or conditional-sum query, so the
+response stays a few hundred bytes however many bookings exist. Results
+are cached per window set for ADMIN_STATS_TTL_SECONDS and dropped when a
+transaction that changed a booking, waiting entry or slot (through a
+flush or an ORM-enabled bulk statement such as the no-show sweep)
+commits. Invalidating at flush time instead would let a concurrent
+request recompute from the not yet committed state and cache that
+stale result for the whole TTL.
+"""
+
+from database import db
+from models import Booking, TimeSlot, Waitlist, BookingStatus, WaitlistStatus, ACTIVE_BOOKING_STATUSES
+from sqlalchemy import case, event, func
+from sqlalchemy.orm import Session
+from datetime import datetime, timedelta
+from threading import Lock
+import os
+import time
+
+ADMIN_STATS_TTL_SECONDS = float(os.environ.get('ADMIN_STATS_TTL_SECONDS', 15))
+
+# No-show rate windows in days, overridable per request with ?windows=7,30
+DEFAULT_NO_SHOW_WINDOWS = (7, 30)
+MAX_WINDOW_DAYS = 365
+MAX_WINDOWS = 5
+
+
+class StatsCache:
+    """Small TTL cache of computed stats, shared between request threads"""
+
+    def __init__(self, ttl_seconds=ADMIN_STATS_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._lock = Lock()
+        self._entries = {}
+        self._generation = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                return None, self._generation
+            return entry[1], self._generation
+
+    def put(self, key, value, generation):
+        with self._lock:
+            # Skip results computed before an invalidation that happened meanwhile
+            if generation == self._generation:
+                self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+
+stats_cache = StatsCache()
+
+
+def invalidate_admin_stats():
+    stats_cache.invalidate()
+
+
+def parse_windows(value):
+    """Window sizes in days from a comma-separated argument; raises ValueError"""
+    if not value:
+        return DEFAULT_NO_SHOW_WINDOWS
+    try:
+        windows = tuple(sorted({int(part) for part in value.split(',')}))
+    except ValueError:
+        raise ValueError('windows must be comma-separated numbers of days')
+    if not windows or len(windows) > MAX_WINDOWS or windows[0] < 1 or windows[-1] > MAX_WINDOW_DAYS:
+        raise ValueError(f'windows must be 1 to {MAX_WINDOWS} values between 1 and {MAX_WINDOW_DAYS} days')
+    return windows
+
+
+def _bookings_by_status():
+    rows = db.session.query(
+        Booking.status,
+        func.count(Booking.id),
+        func.coalesce(func.sum(Booking.machines_used), 0)
+    ).group_by(Booking.status).all()
+
+    counts = {status.value: 0 for status in BookingStatus}
+    machines = {status.value: 0 for status in BookingStatus}
+    for status, count, machines_used in rows:
+        counts[status.value] = count
+        machines[status.value] = int(machines_used)
+    return counts, machines
+
+
+def _today_by_pair(today):
+    """Capacity and occupancy of today's slots per pair, read from the slot counters"""
+    rows = db.session.query(
+        TimeSlot.pair_id,
+        func.count(TimeSlot.id),
+        func.coalesce(func.sum(TimeSlot.available_machines), 0),
+        func.coalesce(func.sum(TimeSlot.booked_machines), 0)
+    ).filter(TimeSlot.date == today).group_by(TimeSlot.pair_id).order_by(TimeSlot.pair_id).all()
+
+    pairs = []
+    for pair_id, slots, capacity, booked in rows:
+        pairs.append({
+            'pair_id': pair_id,
+            'slots': slots,
+            'capacity': int(capacity),
+            'booked': int(booked),
+            'utilization': round(booked / capacity, 3) if capacity else 0.0
+        })
+    return pairs
+
+
+def _completed_today(today):
+    return db.session.query(func.count(Booking.id)).join(
+        TimeSlot, Booking.slot_id == TimeSlot.id
+    ).filter(
+        TimeSlot.date == today,
+        Booking.status == BookingStatus.COMPLETED
+    ).scalar()
+
+
+def _open_upcoming_slots(now):
+    """Enabled slots that have not started and still have a free machine"""
+    return db.session.query(func.count(TimeSlot.id)).filter(
+        TimeSlot.date >= now.date(),
+        TimeSlot.start_time > now,
+        TimeSlot.available_machines > TimeSlot.booked_machines
+    ).scalar()
+
+
+def _waitlist_depth():
+    per_slot = db.session.query(
+        Waitlist.slot_id,
+        func.count(Waitlist.id).label('waiting')
+    ).filter(Waitlist.status == WaitlistStatus.WAITING).group_by(Waitlist.slot_id).subquery()
+
+    waiting, slots, deepest = db.session.query(
+        func.coalesce(func.sum(per_slot.c.waiting), 0),
+        func.count(per_slot.c.slot_id),
+        func.coalesce(func.max(per_slot.c.waiting), 0)
+    ).one()
+    return {'waiting': int(waiting), 'slots_with_waitlist': slots, 'max_per_slot': int(deepest)}
+
+
+def _no_show_rates(today, windows):
+    """
+    No-shows among the bookings whose slot fell in each of the last N days
+    Cancelled bookings are not counted; all windows come from one query
+    """
+    columns = []
+    for days in windows:
+        in_window = TimeSlot.date >= today - timedelta(days=days)
+        columns.append(func.sum(case((in_window, 1), else_=0)))
+        columns.append(func.sum(case((in_window & (Booking.status == BookingStatus.NO_SHOW), 1), else_=0)))
+
+    row = db.session.query(*columns).select_from(Booking).join(
+        TimeSlot, Booking.slot_id == TimeSlot.id
+    ).filter(
+        TimeSlot.date >= today - timedelta(days=max(windows)),
+        TimeSlot.date < today,
+        Booking.status != BookingStatus.CANCELLED
+    ).one()
+
+    rates = {}
+    for index, days in enumerate(windows):
+        bookings, no_shows = int(row[2 * index] or 0), int(row[2 * index + 1] or 0)
+        rates[f'{days}d'] = {
+            'bookings': bookings,
+            'no_shows': no_shows,
+            'rate': round(no_shows / bookings, 3) if bookings else 0.0
+        }
+    return rates
+
+
+def compute_admin_stats(windows=DEFAULT_NO_SHOW_WINDOWS):
+    now = datetime.now()
+    today = now.date()
+
+    by_status, machines_by_status = _bookings_by_status()
+    today_pairs = _today_by_pair(today)
+    capacity = sum(pair['capacity'] for pair in today_pairs)
+    booked = sum(pair['booked'] for pair in today_pairs)
+
+    return {
+        'generated_at': now.isoformat(),
+        'bookings': {
+            'total': sum(by_status.values()),
+            'by_status': by_status,
+            'active': sum(by_status[status.value] for status in ACTIVE_BOOKING_STATUSES),
+            'machines_in_use': sum(machines_by_status[status.value] for status in ACTIVE_BOOKING_STATUSES),
+            'completed_today': _completed_today(today)
+        },
+        'today': {
+            'date': today.isoformat(),
+            'capacity': capacity,
+            'booked': booked,
+            'utilization': round(booked / capacity, 3) if capacity else 0.0,
+            'pairs': today_pairs
+        },
+        'open_upcoming_slots': _open_upcoming_slots(now),
+        'waitlist': _waitlist_depth(),
+        'no_show_rate': _no_show_rates(today, windows)
+    }
+
+
+def get_admin_stats(windows=DEFAULT_NO_SHOW_WINDOWS):
+    """compute_admin_stats() through the TTL cache; returns (stats, cache_hit)"""
+    stats, generation = stats_cache.get(windows)
+    if stats is not None:
+        return stats, True
+
+    stats = compute_admin_stats(windows)
+    stats_cache.put(windows, stats, generation)
+    return stats, False
+
+
+# Set on a session whose transaction changed something the stats count
+_CHANGED_KEY = 'admin_stats_changed'
+_COUNTED_MODELS = (Booking, Waitlist, TimeSlot)
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_flushed_changes(session, flush_context):
+    # Booking transitions, waitlist joins/leaves and slot changes made through the ORM
+    if any(isinstance(instance, _COUNTED_MODELS) for instance in (*session.new, *session.dirty, *session.deleted)):
+        session.info[_CHANGED_KEY] = True
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _collect_bulk_changes(orm_execute_state):
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None and mapper.class_ in _COUNTED_MODELS:
+        orm_execute_state.session.info[_CHANGED_KEY] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_committed_changes(session):
+    if session.info.pop(_CHANGED_KEY, False):
+        stats_cache.invalidate()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_rolled_back_changes(session):
+    session.info.pop(_CHANGED_KEY, None)
@@ -0,0 +1,120 @@
+from database import db
+from models import TimeSlot, Machine, Booking, Waitlist, BookingStatus, WaitlistStatus
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import OperationalError
+import random
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Bounded retry when the database reports a write conflict
+MAX_ADMISSION_ATTEMPTS = 5
+RETRY_BACKOFF_SECONDS = 0.02
+
+# Max people waiting per slot
+WAITLIST_CAP = 10
+
+
+def working_machines_in_pair():
+    """Correlated subquery: machines in the slot's pair that are not out of order"""
+    return select(func.count(Machine.id)).where(
+        Machine.pair_id == TimeSlot.pair_id,
+        Machine.status == 'available'
+    ).scalar_subquery()
+
+
+def try_reserve_machines(slot_id, machines_needed):
+    """
+    Reserve machines with one conditional UPDATE (compare-and-swap on booked_machines)
+    The row only changes if the slot is enabled and still has room, so two
+    concurrent requests can never both take the last machine
+    """
+    result = db.session.execute(
+        update(TimeSlot).where(
+            TimeSlot.id == slot_id,
+            TimeSlot.available_machines > 0,
+            TimeSlot.booked_machines + machines_needed <= TimeSlot.available_machines,
+            TimeSlot.booked_machines + machines_needed <= working_machines_in_pair()
+        ).values(
+            booked_machines=TimeSlot.booked_machines + machines_needed
+        ).execution_options(synchronize_session=False, changed_slot_ids=(slot_id,))
+    )
+    return result.rowcount == 1
+
+
+def _enqueue_waitlist(user_id, slot_id, load_type):
+    """
+    Append the user to the slot's waitlist while holding the slot row lock
+    The lock serialises concurrent joins, so enqueue sequences follow arrival order
+    """
+    db.session.query(TimeSlot).filter(TimeSlot.id == slot_id).with_for_update().one()
+
+    waiting = Waitlist.query.filter_by(
+        slot_id=slot_id,
+        status=WaitlistStatus.WAITING
+    ).count()
+
+    if waiting >= WAITLIST_CAP:
+        return None
+
+    # Never reused, so the order of the remaining entries survives leaves and promotions
+    last_sequence = db.session.query(func.max(Waitlist.sequence)).filter(
+        Waitlist.slot_id == slot_id
+    ).scalar() or 0
+
+    entry = Waitlist(
+        user_id=user_id,
+        slot_id=slot_id,
+        sequence=last_sequence + 1,
+        load_type=load_type
+    )
+    db.session.add(entry)
+    return entry
+
+
+def admit_booking(user_id, slot_id, load_type, machines_needed, on_booked=None):
+    """
+    Atomically admit a booking for a slot, or queue the user on its waitlist
+    on_booked(booking) runs inside the admission transaction once the new
+    booking is flushed (e.g. to queue its confirmation email), so whatever
+    it adds commits or rolls back together with the booking
+
+    Returns (outcome, record) where outcome is one of:
+    - 'booked': record is the new Booking
+    - 'waitlisted': record is the new Waitlist entry
+    - 'waitlist_full': the slot and its waitlist are full
+    - 'conflict': the database stayed locked after every retry
+    """
+    for attempt in range(MAX_ADMISSION_ATTEMPTS):
+        try:
+            if try_reserve_machines(slot_id, machines_needed):
+                booking = Booking(
+                    user_id=user_id,
+                    slot_id=slot_id,
+                    load_type=load_type,
+                    status=BookingStatus.CONFIRMED,
+                    machines_used=machines_needed
+                )
+                db.session.add(booking)
+                if on_booked is not None:
+                    db.session.flush()
+                    on_booked(booking)
+                db.session.commit()
+                return 'booked', booking
+
+            entry = _enqueue_waitlist(user_id, slot_id, load_type)
+            if entry is None:
+                db.session.rollback()
+                return 'waitlist_full', None
+
+            db.session.commit()
+            return 'waitlisted', entry
+
+        except OperationalError as e:
+            # SQLite "database is locked" / Postgres serialization failure
+            db.session.rollback()
+            logger.warning("Admission conflict on slot %s (attempt %d): %s", slot_id, attempt + 1, e)
+            time.sleep(RETRY_BACKOFF_SECONDS * (2 ** attempt) * (1 + random.random()))
+
+    return 'conflict', None
@@ -0,0 +1,175 @@
+from database import db
+from models import User
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from collections import OrderedDict
+from threading import Lock
+import os
+import time
+
+# How long an authenticated user is trusted without re-reading the users table.
+# Changes committed in this process drop the entry at commit; a role change or
+# profile edit made by another worker process is seen after at most this long
+AUTH_CACHE_TTL_SECONDS = float(os.environ.get('AUTH_CACHE_TTL_SECONDS', 10))
+AUTH_CACHE_MAX_ENTRIES = int(os.environ.get('AUTH_CACHE_MAX_ENTRIES', 1024))
+
+_CHANGED_KEY = 'auth_changed_users'
+# Marks a bulk statement that did not say which users it changed
+_ALL_USERS = None
+
+
+class AuthenticatedUser:
+    """
+    Read-only snapshot of the User fields that role_required and the handlers read
+    Not bound to a session - load the User row before changing it
+    """
+
+    __slots__ = ('id', 'email', 'full_name', 'student_id', 'phone', 'role', 'created_at')
+
+    def __init__(self, user):
+        self.id = user.id
+        self.email = user.email
+        self.full_name = user.full_name
+        self.student_id = user.student_id
+        self.phone = user.phone
+        self.role = user.role
+        self.created_at = user.created_at
+
+
+class AuthCache:
+    """
+    Bounded TTL + LRU cache of authenticated users, keyed by (user id, token)
+    Safe to share between request threads
+    """
+
+    def __init__(self, ttl_seconds=AUTH_CACHE_TTL_SECONDS, max_entries=AUTH_CACHE_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        # Bumped by every invalidation, so a row read before one is never cached after it
+        self.epoch = 0
+
+    def get(self, user_id, token):
+        key = (user_id, token)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                principal, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return principal
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, user_id, token, principal, epoch=None):
+        """Cache principal, unless an invalidation happened since epoch was read"""
+        key = (user_id, token)
+        with self._lock:
+            if epoch is not None and epoch != self.epoch:
+                return
+            self._entries[key] = (principal, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate_user(self, user_id):
+        """Drop every cached token for this user"""
+        with self._lock:
+            self.epoch += 1
+            stale = [key for key in self._entries if key[0] == user_id]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+
+    def clear(self):
+        with self._lock:
+            self.epoch += 1
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+auth_cache = AuthCache()
+
+
+def get_authenticated_user(user_id, token):
+    """
+    Return the cached user for this token, loading it from the database on a miss
+    Returns None if the user no longer exists
+    """
+    principal = auth_cache.get(user_id, token)
+    if principal is not None:
+        return principal
+
+    # Read before the row: a change committed while it loads keeps it out of the cache
+    epoch = auth_cache.epoch
+    user = db.session.get(User, user_id)
+    if user is None:
+        return None
+
+    principal = AuthenticatedUser(user)
+    auth_cache.put(user_id, token, principal, epoch)
+    return principal
+
+
+def _mark_changed(session, user_ids):
+    session.info.setdefault(_CHANGED_KEY, set()).update(user_ids)
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_flushed_users(session, flush_context):
+    # Profile edits, role changes and deletes made through the ORM
+    changed = [instance.id for instance in (*session.dirty, *session.deleted) if isinstance(instance, User)]
+    if changed:
+        _mark_changed(session, changed)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _collect_bulk_user_changes(orm_execute_state):
+    # Bulk statements skip the flush; changed_user_ids names the users they touch
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is None or mapper.class_ is not User:
+        return
+    user_ids = orm_execute_state.execution_options.get('changed_user_ids')
+    _mark_changed(orm_execute_state.session, (_ALL_USERS,) if user_ids is None else user_ids)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_committed_users(session):
+    # Only once committed: dropping them earlier lets a concurrent miss cache the old row again
+    changed = session.info.pop(_CHANGED_KEY, None)
+    if not changed:
+        return
+    if _ALL_USERS in changed:
+        auth_cache.clear()
+        return
+    for user_id in changed:
+        auth_cache.invalidate_user(user_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_rolled_back_users(session):
+    session.info.pop(_CHANGED_KEY, None)
@@ -0,0 +1,43 @@
+from database import db
+from models import TimeSlot, Machine
+from sqlalchemy import func, case
+
+
+def get_slot_availability(date=None, pair_id=None):
+    """
+    Load time slots together with their machine and booking figures
+
+    Runs one aggregated query regardless of how many slots match:
+    - per-pair machine counts (total and working) are grouped once
+    - and LEFT JOINed onto the filtered time slots
+    - machines_used is read from the slot's booked_machines counter
+
+    Returns a list of rows with the slot columns plus
+    working_machines, total_machines and machines_used.
+    """
+    pair_machines = db.session.query(
+        Machine.pair_id.label('pair_id'),
+        func.count(Machine.id).label('total_machines'),
+        func.sum(case((Machine.status == 'available', 1), else_=0)).label('working_machines')
+    ).group_by(Machine.pair_id).subquery()
+
+    query = db.session.query(
+        TimeSlot.id,
+        TimeSlot.pair_id,
+        TimeSlot.date,
+        TimeSlot.start_time,
+        TimeSlot.end_time,
+        TimeSlot.available_machines,
+        func.coalesce(pair_machines.c.working_machines, 0).label('working_machines'),
+        func.coalesce(pair_machines.c.total_machines, 0).label('total_machines'),
+        func.coalesce(TimeSlot.booked_machines, 0).label('machines_used')
+    ).outerjoin(
+        pair_machines, pair_machines.c.pair_id == TimeSlot.pair_id
+    )
+
+    if date is not None:
+        query = query.filter(TimeSlot.date == date)
+    if pair_id is not None:
+        query = query.filter(TimeSlot.pair_id == pair_id)
+
+    return query.all()
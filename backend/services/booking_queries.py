@@ -0,0 +1,184 @@
+"""
+Filtered, keyset-paginated booking listings for GET /api/bookings
+
+Bookings are listed newest slot first, ordered by (date, start_time, id),
+or with sort=created newest booking first, ordered by (created_at, id).
+A page ends with an opaque cursor holding the last row's sort key; the
+next page continues strictly after it with a row-value comparison, so
+every page is an index walk of `limit` rows however much history the
+bookings table has, and rows inserted meanwhile never shift a page.
+"""
+
+from database import db
+from models import Booking, TimeSlot, User, BookingStatus, ACTIVE_BOOKING_STATUSES
+from sqlalchemy import func, tuple_
+from datetime import date, datetime
+import base64
+import json
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Listing orders: newest slot first (default) or newest booking first
+SORT_ORDERS = ('slot', 'created')
+
+
+def _sort_columns(sort):
+    if sort == 'created':
+        return (Booking.created_at, Booking.id)
+    return (TimeSlot.date, TimeSlot.start_time, Booking.id)
+
+
+def encode_cursor(slot, booking, sort='slot'):
+    """
+    Opaque cursor pointing just after (slot.date, slot.start_time, booking.id),
+    or after (booking.created_at, booking.id) for sort=created
+    """
+    if sort == 'created':
+        key = [booking.created_at.isoformat(), booking.id]
+    else:
+        key = [slot.date.isoformat(), slot.start_time.isoformat(), booking.id]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, sort='slot'):
+    """Inverse of encode_cursor; raises ValueError for anything it did not produce"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded))
+        if sort == 'created':
+            created_at, booking_id = key
+            return datetime.fromisoformat(created_at), int(booking_id)
+        slot_date, start_time, booking_id = key
+        return date.fromisoformat(slot_date), datetime.fromisoformat(start_time), int(booking_id)
+    except (TypeError, ValueError):
+        raise ValueError('Invalid cursor')
+
+
+def _parse_date(value, name):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f'{name} must be a YYYY-MM-DD date')
+
+
+def _parse_int(value, name):
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f'{name} must be an integer')
+
+
+def parse_booking_filters(args):
+    """
+    Read the listing filters from request arguments
+    date_from/date_to are inclusive slot dates, status is a comma-separated
+    list of booking statuses; raises ValueError with a client-facing message
+    """
+    filters = {}
+
+    if args.get('date_from'):
+        filters['date_from'] = _parse_date(args['date_from'], 'date_from')
+    if args.get('date_to'):
+        filters['date_to'] = _parse_date(args['date_to'], 'date_to')
+    if args.get('pair_id'):
+        filters['pair_id'] = _parse_int(args['pair_id'], 'pair_id')
+    if args.get('user_id'):
+        filters['user_id'] = _parse_int(args['user_id'], 'user_id')
+    if args.get('status'):
+        try:
+            filters['statuses'] = [BookingStatus(value.strip()) for value in args['status'].split(',')]
+        except ValueError:
+            valid = ', '.join(status.value for status in BookingStatus)
+            raise ValueError(f'status must be one or more of: {valid}')
+
+    return filters
+
+
+def parse_sort(value):
+    """Listing order from the sort argument; raises ValueError"""
+    if not value:
+        return SORT_ORDERS[0]
+    if value not in SORT_ORDERS:
+        raise ValueError(f"sort must be one of: {', '.join(SORT_ORDERS)}")
+    return value
+
+
+def parse_page_size(value):
+    """Page size from the limit argument, clamped to MAX_PAGE_SIZE"""
+    if not value:
+        return DEFAULT_PAGE_SIZE
+    limit = _parse_int(value, 'limit')
+    if limit < 1:
+        raise ValueError('limit must be positive')
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def _filtered(query, filters):
+    if 'user_id' in filters:
+        query = query.filter(Booking.user_id == filters['user_id'])
+    if 'statuses' in filters:
+        query = query.filter(Booking.status.in_(filters['statuses']))
+    if 'pair_id' in filters:
+        query = query.filter(TimeSlot.pair_id == filters['pair_id'])
+    if 'date_from' in filters:
+        query = query.filter(TimeSlot.date >= filters['date_from'])
+    if 'date_to' in filters:
+        query = query.filter(TimeSlot.date <= filters['date_to'])
+    return query
+
+
+def booking_rows(filters, sort='slot'):
+    """(Booking, TimeSlot) rows matching filters, newest slot (or booking) first"""
+    return _filtered(
+        db.session.query(Booking, TimeSlot).join(TimeSlot, Booking.slot_id == TimeSlot.id),
+        filters
+    ).order_by(*(column.desc() for column in _sort_columns(sort)))
+
+
+def count_bookings(filters):
+    """Number of bookings matching filters (ignores any cursor)"""
+    return _filtered(
+        db.session.query(func.count(Booking.id)).join(TimeSlot, Booking.slot_id == TimeSlot.id),
+        filters
+    ).scalar()
+
+
+def get_booking_page(filters, cursor=None, limit=DEFAULT_PAGE_SIZE, sort='slot'):
+    """
+    One page of booking_rows(filters, sort) starting after cursor
+    Returns (rows, next_cursor); next_cursor is None on the last page
+    """
+    query = booking_rows(filters, sort)
+    if cursor:
+        query = query.filter(tuple_(*_sort_columns(sort)) < tuple_(*decode_cursor(cursor, sort)))
+
+    # One extra row tells whether another page follows
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    booking, slot = rows[-1]
+    return rows, encode_cursor(slot, booking, sort)
+
+
+def attendant_board_rows(day):
+    """
+    Active bookings of one day for the attendant board, in slot order
+    A single joined projection of just the columns the board shows, so no
+    Booking, User or TimeSlot objects are loaded or lazily completed
+    """
+    return db.session.query(
+        Booking.id, Booking.ticket_id, Booking.status, Booking.load_type, Booking.machines_used,
+        Booking.drop_off_time, Booking.created_at,
+        User.id.label('user_id'), User.full_name, User.student_id, User.email, User.phone,
+        TimeSlot.id.label('slot_id'), TimeSlot.pair_id, TimeSlot.start_time, TimeSlot.end_time
+    ).join(
+        TimeSlot, Booking.slot_id == TimeSlot.id
+    ).join(
+        User, Booking.user_id == User.id
+    ).filter(
+        TimeSlot.date == day,
+        Booking.status.in_(ACTIVE_BOOKING_STATUSES)
+    ).order_by(TimeSlot.start_time, TimeSlot.pair_id, Booking.id).all()
@@ -0,0 +1,216 @@
+"""
+Data versions for conditional GETs
+
+Each cacheable resource has a version counter in the data_versions
+table, so every worker process agrees on the current version. Slots
+are versioned per date ('slots:2026-01-31'): a commit that touched a
+booking or time slot bumps the dates of the slots involved, any commit
+that touched a machine bumps 'machines'. Bookings on different dates
+therefore never wait on the same version row.
+
+Changes are noticed through the ORM (flushes) and through ORM-enabled
+bulk statements run on the session. Bulk statements name the slots they
+touch with the changed_slot_ids / changed_slot_dates execution options
+(the occupancy CAS, the no-show sweep, bulk slot inserts); one that does
+not bumps 'slots:*', which every date's version includes. The bump is
+the last statement of the committing transaction, so the data and its
+version commit (or fail) together and the version row locks are only
+held for the commit itself. Readers take the version before running
+their queries, so an ETag is never newer than the data sent with it.
+
+local_bump_counts() tells how many bumps this process made, which lets
+the live stream tell changes from other processes (the run-scheduler
+process, other workers) from its own.
+"""
+
+from database import db
+from models import Booking, DataVersion, Machine, TimeSlot
+from sqlalchemy import event, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from threading import Lock
+
+
+# Every slot date's version also counts changes not tied to a date
+ALL_SLOTS = 'slots:*'
+
+# Models whose changes bump the version of their slots' dates
+SLOT_MODELS = (Booking, TimeSlot)
+# Which resource a change to each other model invalidates
+RESOURCE_FOR_MODEL = {
+    Machine: 'machines',
+}
+
+_PENDING_KEY = 'changed_resources'
+_PENDING_SLOTS_KEY = 'changed_slot_ids'
+_BUMPED_KEY = 'bumped_resources'
+
+# Bumps made by this process, counted before they commit and taken back on rollback
+_local_bumps = {}
+_local_bumps_lock = Lock()
+
+
+def slot_resource(date):
+    """Version resource of the slots on date"""
+    return f'slots:{date.isoformat()}'
+
+
+def _count_local_bumps(resources, step):
+    with _local_bumps_lock:
+        for resource in resources:
+            # Per-date bumps all count towards 'slots'
+            resource = resource.split(':')[0]
+            _local_bumps[resource] = _local_bumps.get(resource, 0) + step
+
+
+def local_bump_counts():
+    """Version bumps committed (or about to be) by this process, per resource ('slots' for every date)"""
+    with _local_bumps_lock:
+        return dict(_local_bumps)
+
+
+def mark_changed(session, *resources):
+    """Record resources to bump when session commits"""
+    session.info.setdefault(_PENDING_KEY, set()).update(resources)
+
+
+def mark_slots_changed(session, slot_ids):
+    """Record slots whose dates to bump when session commits"""
+    session.info.setdefault(_PENDING_SLOTS_KEY, set()).update(slot_ids)
+
+
+def _slot_date_resources(session, slot_ids):
+    """Version resources of the slots' dates, reading only the slots not loaded in session"""
+    resources, missing = set(), []
+    for slot_id in slot_ids:
+        slot = session.identity_map.get(session.identity_key(TimeSlot, slot_id))
+        date = slot.__dict__.get('date') if slot is not None else None
+        if date is None:
+            missing.append(slot_id)
+        else:
+            resources.add(slot_resource(date))
+    if missing:
+        resources.update(slot_resource(date) for date in session.scalars(
+            select(TimeSlot.date).where(TimeSlot.id.in_(missing)).distinct()
+        ))
+    return resources
+
+
+def _increment(session, resource):
+    """Add one to a resource's version; returns False if its row does not exist yet"""
+    return session.execute(
+        update(DataVersion).where(DataVersion.resource == resource).values(version=DataVersion.version + 1)
+        .execution_options(synchronize_session=False)
+    ).rowcount == 1
+
+
+def bump_versions(resources, session=None):
+    """
+    Increment the version of each resource in the session's current transaction
+    Rows are locked in sorted order, so two commits never deadlock on them
+    """
+    session = session or db.session
+    for resource in sorted(resources):
+        if _increment(session, resource):
+            continue
+        try:
+            with session.begin_nested():
+                session.execute(insert(DataVersion).values(resource=resource, version=1))
+        except IntegrityError:
+            # Another process created the row first
+            _increment(session, resource)
+
+
+def get_versions(*resources):
+    """
+    Current version of each resource (0 if it never changed)
+    'slots' stands for every date: the sum of all slots versions, which
+    grows with each bump. A 'slots:<date>' version includes 'slots:*'
+    """
+    names = {resource for resource in resources if resource != 'slots'}
+    if any(resource.startswith('slots:') for resource in names):
+        names.add(ALL_SLOTS)
+    condition = DataVersion.resource.in_(names)
+    if 'slots' in resources:
+        # The legacy 'slots' row keeps the sum from going backwards after upgrading
+        condition = or_(condition, DataVersion.resource == 'slots', DataVersion.resource.like('slots:%'))
+    rows = dict(db.session.execute(select(DataVersion.resource, DataVersion.version).where(condition)).all())
+
+    versions = {}
+    for resource in resources:
+        if resource == 'slots':
+            versions[resource] = sum(version for name, version in rows.items()
+                                     if name == 'slots' or name.startswith('slots:'))
+        elif resource.startswith('slots:') and resource != ALL_SLOTS:
+            versions[resource] = rows.get(resource, 0) + rows.get(ALL_SLOTS, 0)
+        else:
+            versions[resource] = rows.get(resource, 0)
+    return versions
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_flushed_changes(session, flush_context):
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(instance, TimeSlot):
+            mark_changed(session, slot_resource(instance.date))
+        elif isinstance(instance, Booking):
+            mark_slots_changed(session, [instance.slot_id])
+        else:
+            resource = RESOURCE_FOR_MODEL.get(type(instance))
+            if resource:
+                mark_changed(session, resource)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _collect_bulk_changes(orm_execute_state):
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is None:
+        return
+    session = orm_execute_state.session
+    if issubclass(mapper.class_, SLOT_MODELS):
+        options = orm_execute_state.execution_options
+        slot_ids = options.get('changed_slot_ids')
+        dates = options.get('changed_slot_dates')
+        if slot_ids is None and dates is None:
+            # No telling which dates the statement touched
+            mark_changed(session, ALL_SLOTS)
+            return
+        mark_slots_changed(session, slot_ids or ())
+        mark_changed(session, *(slot_resource(date) for date in dates or ()))
+        return
+    resource = RESOURCE_FOR_MODEL.get(mapper.class_)
+    if resource:
+        mark_changed(session, resource)
+
+
+@event.listens_for(Session, 'before_commit')
+def _bump_changed_versions(session):
+    if session.in_nested_transaction():
+        # A savepoint; the bump belongs to the outermost commit
+        return
+    # Flush first, so changes still pending in the session are collected too
+    session.flush()
+    resources = session.info.pop(_PENDING_KEY, set())
+    slot_ids = session.info.pop(_PENDING_SLOTS_KEY, None)
+    if slot_ids:
+        resources |= _slot_date_resources(session, slot_ids)
+    if resources:
+        bump_versions(resources, session)
+        session.info[_BUMPED_KEY] = resources
+        _count_local_bumps(resources, 1)
+
+
+@event.listens_for(Session, 'after_commit')
+def _forget_committed_bumps(session):
+    session.info.pop(_BUMPED_KEY, None)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_rolled_back_changes(session):
+    session.info.pop(_PENDING_KEY, None)
+    session.info.pop(_PENDING_SLOTS_KEY, None)
+    bumped = session.info.pop(_BUMPED_KEY, None)
+    if bumped:
+        _count_local_bumps(bumped, -1)
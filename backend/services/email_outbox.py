@@ -0,0 +1,349 @@
+"""
+Durable email outbox
+
+send_email() only adds a row to email_outbox in the caller's transaction,
+so an email is stored if and only if the change it announces commits
+(templated emails store the template name and its context and are
+rendered by the worker). A fixed pool of worker
+threads claims pending rows in batches and sends them over an SMTP
+connection each worker keeps open between batches, so a burst of
+bookings costs neither a thread nor a TLS handshake per message, and
+mail that was not sent yet survives a restart.
+
+Failed sends are retried with exponential backoff; after
+EMAIL_MAX_ATTEMPTS (or a permanent 5xx rejection) the row is moved to
+the DEAD state and left for an admin to inspect.
+"""
+
+from database import db
+from models import EmailOutbox, EmailStatus
+from services.email_templates import render_email, render_subject
+from sqlalchemy import event, func, or_, update
+from sqlalchemy.orm import Session
+from collections import deque
+from datetime import datetime, timedelta
+from threading import Event, Lock, Thread, local
+import json
+import logging
+import os
+import random
+import smtplib
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+EMAIL_WORKERS = int(os.environ.get('EMAIL_WORKERS', 2))
+EMAIL_BATCH_SIZE = int(os.environ.get('EMAIL_BATCH_SIZE', 20))
+EMAIL_MAX_ATTEMPTS = int(os.environ.get('EMAIL_MAX_ATTEMPTS', 5))
+EMAIL_RETRY_BASE_SECONDS = float(os.environ.get('EMAIL_RETRY_BASE_SECONDS', 30))
+EMAIL_RETRY_MAX_SECONDS = 3600
+
+# Workers wake up at least this often to pick up retries that became due
+POLL_INTERVAL_SECONDS = 5
+# Close a worker's SMTP connection after this long without mail
+SMTP_IDLE_SECONDS = 30
+# A SENDING row older than this was claimed by a worker that died
+CLAIM_TIMEOUT_SECONDS = 300
+
+# Window used for the throughput figure
+THROUGHPUT_WINDOW_SECONDS = 60
+
+
+class OutboxMetrics:
+    """Counters shared by all workers in this process"""
+
+    def __init__(self):
+        self._lock = Lock()
+        self._sent_times = deque()
+        self.sent = 0
+        self.failed = 0
+        self.dead = 0
+        self.connections_opened = 0
+
+    def record_sent(self):
+        now = time.monotonic()
+        with self._lock:
+            self.sent += 1
+            self._sent_times.append(now)
+            while self._sent_times and self._sent_times[0] < now - THROUGHPUT_WINDOW_SECONDS:
+                self._sent_times.popleft()
+
+    def record_failure(self, dead):
+        with self._lock:
+            self.failed += 1
+            if dead:
+                self.dead += 1
+
+    def record_connection(self):
+        with self._lock:
+            self.connections_opened += 1
+
+    def snapshot(self):
+        now = time.monotonic()
+        with self._lock:
+            recent = sum(1 for sent_at in self._sent_times if sent_at >= now - THROUGHPUT_WINDOW_SECONDS)
+            return {
+                'sent': self.sent,
+                'failed': self.failed,
+                'dead': self.dead,
+                'smtp_connections_opened': self.connections_opened,
+                'sent_per_minute': recent * 60 / THROUGHPUT_WINDOW_SECONDS,
+            }
+
+
+metrics = OutboxMetrics()
+_wakeup = Event()
+
+
+# Set on a session that queued mail; the workers are woken when it commits
+_WAKE_KEY = 'outbox_queued'
+
+
+def _queue(entries):
+    """Add outbox rows to the current transaction; the caller commits"""
+    db.session.add_all(entries)
+    db.session.info[_WAKE_KEY] = True
+    return entries
+
+
+def enqueue_email(subject, recipients, text_body, html_body):
+    """Add an email to the outbox in the caller's transaction; returns the outbox row"""
+    return _queue([EmailOutbox(
+        recipients=','.join(recipients),
+        subject=subject,
+        text_body=text_body,
+        html_body=html_body
+    )])[0]
+
+
+def enqueue_template_email(template, recipients, context):
+    """
+    Add a templated email in the caller's transaction; only the subject is
+    rendered here, the bodies are rendered by the worker that sends it
+    """
+    return enqueue_template_emails([(template, recipients, context)])[0]
+
+
+def enqueue_template_emails(emails):
+    """
+    Add several templated emails in the caller's transaction
+    emails is an iterable of (template, recipients, context) tuples
+    """
+    return _queue([
+        EmailOutbox(
+            recipients=','.join(recipients),
+            subject=render_subject(template, context),
+            template=template,
+            context=json.dumps(context)
+        )
+        for template, recipients, context in emails
+    ])
+
+
+@event.listens_for(Session, 'after_commit')
+def _wake_workers(session):
+    if session.info.pop(_WAKE_KEY, False):
+        _wakeup.set()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_wakeup(session):
+    session.info.pop(_WAKE_KEY, None)
+
+
+def queue_depth():
+    """Number of outbox rows per status"""
+    counts = dict(
+        db.session.query(EmailOutbox.status, func.count(EmailOutbox.id)).group_by(EmailOutbox.status).all()
+    )
+    return {status.value: counts.get(status, 0) for status in EmailStatus}
+
+
+def outbox_stats():
+    """Throughput counters for this process plus the queue depth"""
+    stats = metrics.snapshot()
+    stats['queue_depth'] = queue_depth()
+    return stats
+
+
+def retry_delay(attempts):
+    """Exponential backoff with jitter: base, 2*base, 4*base ... capped at an hour"""
+    delay = min(EMAIL_RETRY_MAX_SECONDS, EMAIL_RETRY_BASE_SECONDS * (2 ** (attempts - 1)))
+    return delay * (0.5 + random.random() / 2)
+
+
+def is_permanent_failure(error):
+    """5xx replies (unknown mailbox, rejected content) will not succeed on retry"""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return error.smtp_code >= 500
+    return False
+
+
+def claim_batch(batch_size=EMAIL_BATCH_SIZE):
+    """
+    Mark up to batch_size due emails as SENDING for this worker and return them
+    The conditional UPDATE only takes rows still pending, so two workers
+    never claim the same email
+    """
+    now = datetime.utcnow()
+    token = str(uuid.uuid4())
+
+    due = db.session.query(EmailOutbox.id).filter(or_(
+        (EmailOutbox.status == EmailStatus.PENDING) & (EmailOutbox.next_attempt_at <= now),
+        (EmailOutbox.status == EmailStatus.SENDING)
+        & (EmailOutbox.claimed_at < now - timedelta(seconds=CLAIM_TIMEOUT_SECONDS))
+    )).order_by(EmailOutbox.next_attempt_at, EmailOutbox.id).limit(batch_size).with_for_update(skip_locked=True)
+    ids = [email_id for (email_id,) in due.all()]
+
+    if not ids:
+        db.session.rollback()
+        return []
+
+    db.session.execute(
+        update(EmailOutbox).where(
+            EmailOutbox.id.in_(ids),
+            or_(EmailOutbox.status == EmailStatus.PENDING,
+                EmailOutbox.claimed_at < now - timedelta(seconds=CLAIM_TIMEOUT_SECONDS))
+        ).values(
+            status=EmailStatus.SENDING,
+            claim_token=token,
+            claimed_at=now
+        ).execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+
+    return EmailOutbox.query.filter_by(claim_token=token).order_by(EmailOutbox.id).all()
+
+
+def _record_result(entry, error=None):
+    """Update a claimed email after one send attempt"""
+    entry.attempts += 1
+    entry.claim_token = None
+
+    if error is None:
+        entry.status = EmailStatus.SENT
+        entry.sent_at = datetime.utcnow()
+        entry.last_error = None
+        metrics.record_sent()
+        return
+
+    entry.last_error = f'{type(error).__name__}: {error}'[:1000]
+    dead = is_permanent_failure(error) or entry.attempts >= EMAIL_MAX_ATTEMPTS
+    if dead:
+        entry.status = EmailStatus.DEAD
+        logger.error("Email %s to %s moved to dead letter after %d attempt(s): %s",
+                     entry.id, entry.recipients, entry.attempts, entry.last_error)
+    else:
+        entry.status = EmailStatus.PENDING
+        entry.next_attempt_at = datetime.utcnow() + timedelta(seconds=retry_delay(entry.attempts))
+        logger.warning("Email %s to %s failed (attempt %d), retrying at %s: %s",
+                       entry.id, entry.recipients, entry.attempts, entry.next_attempt_at, entry.last_error)
+    metrics.record_failure(dead)
+
+
+class EmailWorkerPool:
+    """Fixed number of threads draining the outbox"""
+
+    def __init__(self, app, mail, workers=EMAIL_WORKERS, batch_size=EMAIL_BATCH_SIZE):
+        self.app = app
+        self.mail = mail
+        self.workers = workers
+        self.batch_size = batch_size
+        self._stopping = Event()
+        self._threads = []
+        self._local = local()  # Each worker's SMTP connection
+
+    def start(self):
+        for number in range(self.workers):
+            thread = Thread(target=self._run, name=f'email-worker-{number + 1}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info("Email outbox started with %d worker(s)", self.workers)
+
+    def stop(self, timeout=10):
+        self._stopping.set()
+        _wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _run(self):
+        self._local.connection = None
+        last_used = time.monotonic()
+
+        with self.app.app_context():
+            while not self._stopping.is_set():
+                try:
+                    batch = claim_batch(self.batch_size)
+                except Exception:
+                    db.session.rollback()
+                    logger.exception("Could not claim outbox batch")
+                    batch = []
+
+                if not batch:
+                    if time.monotonic() - last_used > SMTP_IDLE_SECONDS:
+                        self._close()
+                    _wakeup.wait(POLL_INTERVAL_SECONDS)
+                    _wakeup.clear()
+                    continue
+
+                for entry in batch:
+                    error = None
+                    try:
+                        self._send(self._message(entry))
+                    except Exception as e:
+                        error = e
+                        # Keep the connection for per-message rejections only
+                        if not isinstance(e, (smtplib.SMTPRecipientsRefused, smtplib.SMTPDataError)):
+                            self._close()
+                    _record_result(entry, error)
+
+                last_used = time.monotonic()
+                try:
+                    db.session.commit()
+                except Exception:
+                    db.session.rollback()
+                    logger.exception("Could not record outbox results")
+
+            self._close()
+            db.session.remove()
+
+    def _send(self, msg):
+        """Send over this worker's connection, reconnecting once if the server dropped it"""
+        if self._local.connection is not None:
+            try:
+                self._local.connection.send(msg)
+                return
+            except smtplib.SMTPServerDisconnected:
+                self._close()
+
+        connection = self.mail.connect()
+        connection.__enter__()
+        self._local.connection = connection
+        metrics.record_connection()
+        connection.send(msg)
+
+    def _close(self):
+        connection, self._local.connection = self._local.connection, None
+        if connection is not None:
+            try:
+                connection.__exit__(None, None, None)
+            except Exception:
+                pass
+
+    def _message(self, entry):
+        # Only worker processes send mail, the web processes never load flask_mail
+        from flask_mail import Message
+
+        if entry.template:
+            subject, text_body, html_body = render_email(entry.template, json.loads(entry.context))
+        else:
+            subject, text_body, html_body = entry.subject, entry.text_body, entry.html_body
+
+        msg = Message(subject, recipients=entry.recipients.split(','))
+        msg.body = text_body
+        msg.html = html_body
+        return msg
@@ -0,0 +1,413 @@
+"""
+Email templates, compiled once when the module is imported
+
+Each template is split into its static chunks and $placeholders up front;
+rendering is a single ''.join over the cached chunks and the context
+values, each formatted (and escaped for HTML) once. The HTML layout (styles, header, footer) is shared by every
+template and only built once.
+
+Render with render_email(name, context), where context is the small dict
+returned by booking_email_context(). The context is plain JSON so it can
+be stored in the email outbox and rendered by the worker pool instead of
+the request thread.
+"""
+
+from datetime import date, datetime
+from html import escape
+import re
+
+PLACEHOLDER = re.compile(r'\$(\w+)')
+
+
+_MONTHS = ('January', 'February', 'March', 'April', 'May', 'June', 'July',
+           'August', 'September', 'October', 'November', 'December')
+
+
+def _format_date(value):
+    """'2025-03-10' -> 'March 10, 2025' (same as strftime('%B %d, %Y'), without the locale lookup)"""
+    day = date.fromisoformat(value)
+    return f'{_MONTHS[day.month - 1]} {day.day:02d}, {day.year}'
+
+
+def _format_time(value):
+    """'2025-03-10T09:10:00' -> '09:10 AM' (same as strftime('%I:%M %p'))"""
+    moment = datetime.fromisoformat(value)
+    return f"{moment.hour % 12 or 12:02d}:{moment.minute:02d} {'AM' if moment.hour < 12 else 'PM'}"
+
+
+def _format_load_type(value):
+    return value.replace('_', ' ').title()
+
+
+# Display formatting applied at render time, so the request thread only
+# copies raw values into the context
+FIELD_FORMATTERS = {
+    'date': _format_date,
+    'start_time': _format_time,
+    'end_time': _format_time,
+    'load_type': _format_load_type,
+}
+
+
+def display_values(context):
+    """Format every context value for display, once per email"""
+    values = {}
+    for field, value in context.items():
+        formatter = FIELD_FORMATTERS.get(field)
+        values[field] = formatter(value) if formatter else str(value)
+    return values
+
+
+class CompiledTemplate:
+    """Template source pre-split into static text and placeholder names"""
+
+    __slots__ = ('chunks', 'names', 'fields', 'escape_html')
+
+    def __init__(self, source, escape_html=False):
+        parts = PLACEHOLDER.split(source)
+        self.chunks = parts[0::2]   # Static text around the placeholders
+        self.names = parts[1::2]    # Placeholder names, in order
+        self.fields = tuple(dict.fromkeys(self.names))  # Each name once
+        self.escape_html = escape_html
+
+    def render(self, values):
+        """Fill the placeholders from display_values() output"""
+        if self.escape_html:
+            values = {field: escape(values[field]) for field in self.fields}
+
+        chunks = self.chunks
+        out = [chunks[0]]
+        for index, name in enumerate(self.names, start=1):
+            out.append(values[name])
+            out.append(chunks[index])
+        return ''.join(out)
+
+
+def booking_email_context(user, booking, slot):
+    """Raw values the booking templates need (JSON-serialisable)"""
+    return {
+        'full_name': user.full_name or user.email,
+        'ticket_id': booking.ticket_id,
+        'date': slot.date.isoformat(),
+        'start_time': slot.start_time.isoformat(),
+        'end_time': slot.end_time.isoformat(),
+        'pair_id': slot.pair_id,
+        'load_type': booking.load_type.value,
+        'machines_used': booking.machines_used,
+    }
+
+
+# Shared HTML layout, ACCENT/TINT are filled in per template
+_STYLES = """
+        body {
+            font-family: Arial, sans-serif;
+            line-height: 1.6;
+            color: #333;
+        }
+        .container {
+            max-width: 600px;
+            margin: 0 auto;
+            padding: 20px;
+            background-color: #f9f9f9;
+        }
+        .header {
+            background-color: ACCENT;
+            color: white;
+            padding: 20px;
+            text-align: center;
+            border-radius: 8px 8px 0 0;
+        }
+        .content {
+            background-color: white;
+            padding: 30px;
+            border-radius: 0 0 8px 8px;
+        }
+        .highlight-box {
+            background-color: TINT;
+            border-left: 4px solid ACCENT;
+            padding: 20px;
+            margin: 20px 0;
+        }
+        .detail-row {
+            display: flex;
+            justify-content: space-between;
+            padding: 10px 0;
+            border-bottom: 1px solid #eee;
+        }
+        .detail-label {
+            font-weight: bold;
+            color: #666;
+        }
+        .detail-value {
+            color: #333;
+        }
+        .reminder-box {
+            background-color: #fff3cd;
+            border-left: 4px solid #ffc107;
+            padding: 15px;
+            margin: 20px 0;
+        }
+        .footer {
+            text-align: center;
+            margin-top: 20px;
+            color: #666;
+            font-size: 12px;
+        }"""
+
+
+def _layout(accent, tint, heading, body):
+    """Wrap a template body in the shared email layout"""
+    styles = _STYLES.replace('ACCENT', accent).replace('TINT', tint)
+    return f"""
+<!DOCTYPE html>
+<html>
+<head>
+    <style>{styles}
+    </style>
+</head>
+<body>
+    <div class="container">
+        <div class="header">
+            <h1>{heading}</h1>
+        </div>
+        <div class="content">
+            <p>Hello <strong>$full_name</strong>,</p>
+{body}
+            <p>Thank you for using our laundry service!</p>
+            <p><strong>Best regards,</strong><br>Laundry Management Team</p>
+        </div>
+        <div class="footer">
+            <p>This is an automated message, please do not reply to this email.</p>
+        </div>
+    </div>
+</body>
+</html>
+"""
+
+
+def _detail_rows(*rows):
+    return ''.join(f"""
+                <div class="detail-row">
+                    <span class="detail-label">{label}:</span>
+                    <span class="detail-value">{value}</span>
+                </div>""" for label, value in rows)
+
+
+_TICKET = ('🎫 Ticket ID', '<strong>$ticket_id</strong>')
+_DATE = ('📅 Date', '$date')
+_TIME = ('🕐 Time', '$start_time - $end_time')
+_PAIR = ('🔧 Machine Pair', 'Pair #$pair_id')
+_LOAD = ('🧺 Load Type', '$load_type')
+_MACHINES = ('🔢 Machines Used', '$machines_used')
+
+_TEXT_SIGNATURE = """
+Thank you for using our laundry service!
+
+Best regards,
+Laundry Management Team
+"""
+
+
+TEMPLATE_SOURCES = {
+    'booking_confirmation': {
+        'subject': "Booking Confirmed - Ticket #$ticket_id",
+        'text': """
+Hello $full_name,
+
+Your laundry booking has been confirmed!
+
+Booking Details:
+- Ticket ID: $ticket_id
+- Date: $date
+- Time: $start_time - $end_time
+- Machine Pair: $pair_id
+- Load Type: $load_type
+- Machines Used: $machines_used
+
+Please arrive on time and present your ticket ID at the laundry facility.
+
+Important Reminders:
+- Arrive at least 5 minutes before your scheduled time
+- Bring your laundry detergent and fabric softener
+- Maximum load capacity per machine: 10kg
+- Don't forget to collect your laundry after the cycle
+""" + _TEXT_SIGNATURE,
+        'html': _layout('#4CAF50', '#e8f5e9', '🧺 Booking Confirmed!', f"""            <p>Your laundry booking has been confirmed successfully!</p>
+
+            <div class="highlight-box">
+                <h2 style="margin-top: 0; color: #4CAF50;">Booking Details</h2>{_detail_rows(_TICKET, _DATE, _TIME, _PAIR, _LOAD, _MACHINES)}
+            </div>
+
+            <div class="reminder-box">
+                <h3 style="margin-top: 0;">⚠️ Important Reminders:</h3>
+                <ul>
+                    <li>Arrive at least <strong>5 minutes before</strong> your scheduled time</li>
+                    <li>Bring your <strong>laundry detergent</strong> and fabric softener</li>
+                    <li>Maximum load capacity per machine: <strong>10kg</strong></li>
+                    <li>Present your <strong>Ticket ID</strong> at the facility</li>
+                    <li>Don't forget to <strong>collect your laundry</strong> after the cycle</li>
+                </ul>
+            </div>
+"""),
+    },
+    'booking_completed': {
+        'subject': "Laundry Completed - Ticket #$ticket_id",
+        'text': """
+Hello $full_name,
+
+Good news! Your laundry has been completed and is ready for pickup.
+
+Booking Details:
+- Ticket ID: $ticket_id
+- Date: $date
+- Time Slot: $start_time - $end_time
+- Machine Pair: $pair_id
+- Load Type: $load_type
+
+Please collect your laundry as soon as possible.
+
+⏰ Reminder: Laundry left uncollected for more than 2 hours may be removed to free up space.
+""" + _TEXT_SIGNATURE,
+        'html': _layout('#2196F3', '#e3f2fd', '✅ Laundry Completed!', f"""
+            <div class="highlight-box" style="text-align: center;">
+                <h2 style="margin: 0; color: #2196F3;">🎉 Your laundry is ready for pickup!</h2>
+            </div>
+
+            <h3>Booking Details:</h3>{_detail_rows(_TICKET, _DATE, ('🕐 Time Slot', '$start_time - $end_time'), _PAIR, _LOAD)}
+
+            <div class="reminder-box">
+                <h3 style="margin-top: 0;">⏰ Important Reminder:</h3>
+                <p style="margin: 0;">Please collect your laundry as soon as possible. Laundry left uncollected for more than <strong>2 hours</strong> may be removed to free up space for other users.</p>
+            </div>
+"""),
+    },
+    'waitlist_promotion': {
+        'subject': "You're In! Waitlist Spot Confirmed - Ticket #$ticket_id",
+        'text': """
+Hello $full_name,
+
+A machine freed up and you have been moved from the waitlist to a confirmed booking.
+
+Booking Details:
+- Ticket ID: $ticket_id
+- Date: $date
+- Time: $start_time - $end_time
+- Machine Pair: $pair_id
+- Load Type: $load_type
+
+Please arrive at least 5 minutes before your slot and present your ticket ID.
+If you can no longer make it, cancel the booking so the next person can take it.
+""" + _TEXT_SIGNATURE,
+        'html': _layout('#4CAF50', '#e8f5e9', '🎉 Promoted from the Waitlist!', f"""            <p>A machine freed up and you have been moved from the waitlist to a confirmed booking.</p>
+
+            <div class="highlight-box">
+                <h2 style="margin-top: 0; color: #4CAF50;">Booking Details</h2>{_detail_rows(_TICKET, _DATE, _TIME, _PAIR, _LOAD)}
+            </div>
+
+            <div class="reminder-box">
+                <p style="margin: 0;">Please arrive at least <strong>5 minutes before</strong> your slot. If you can no longer make it, cancel the booking so the next person can take it.</p>
+            </div>
+"""),
+    },
+    'booking_reminder': {
+        'subject': "Reminder: Laundry Slot at $start_time - Ticket #$ticket_id",
+        'text': """
+Hello $full_name,
+
+Your laundry slot starts in 1 hour.
+
+Booking Details:
+- Ticket ID: $ticket_id
+- Date: $date
+- Time: $start_time - $end_time
+- Machine Pair: $pair_id
+
+Check in at least 5 minutes before the start time, or the booking is released as a no-show.
+""" + _TEXT_SIGNATURE,
+        'html': _layout('#FF9800', '#fff3e0', '⏰ Your Slot Starts Soon', f"""            <p>Your laundry slot starts in <strong>1 hour</strong>.</p>
+
+            <div class="highlight-box">{_detail_rows(_TICKET, _DATE, _TIME, _PAIR)}
+            </div>
+
+            <div class="reminder-box">
+                <p style="margin: 0;">Check in at least <strong>5 minutes before</strong> the start time, or the booking is released as a no-show.</p>
+            </div>
+"""),
+    },
+    'booking_cancelled': {
+        'subject': "Booking Cancelled - Ticket #$ticket_id",
+        'text': """
+Hello $full_name,
+
+Your laundry booking has been cancelled and its machines were released.
+
+Booking Details:
+- Ticket ID: $ticket_id
+- Date: $date
+- Time: $start_time - $end_time
+- Machine Pair: $pair_id
+
+You can book a new slot at any time.
+""" + _TEXT_SIGNATURE,
+        'html': _layout('#607D8B', '#eceff1', '🗓️ Booking Cancelled', f"""            <p>Your laundry booking has been cancelled and its machines were released.</p>
+
+            <div class="highlight-box">{_detail_rows(_TICKET, _DATE, _TIME, _PAIR)}
+            </div>
+
+            <p>You can book a new slot at any time.</p>
+"""),
+    },
+    'no_show': {
+        'subject': "Booking Marked as No-Show - Ticket #$ticket_id",
+        'text': """
+Hello $full_name,
+
+You did not check in for your laundry slot, so the booking was marked as a no-show
+and the machines were released to the next person on the waitlist.
+
+Booking Details:
+- Ticket ID: $ticket_id
+- Date: $date
+- Time: $start_time - $end_time
+- Machine Pair: $pair_id
+
+You can book a new slot at any time.
+""" + _TEXT_SIGNATURE,
+        'html': _layout('#f44336', '#ffebee', '❌ Booking Marked as No-Show', f"""            <p>You did not check in for your laundry slot, so the booking was marked as a no-show and the machines were released to the next person on the waitlist.</p>
+
+            <div class="highlight-box">{_detail_rows(_TICKET, _DATE, _TIME, _PAIR)}
+            </div>
+
+            <p>You can book a new slot at any time.</p>
+"""),
+    },
+}
+
+
+def _compile_all():
+    return {
+        name: {
+            'subject': CompiledTemplate(source['subject']),
+            'text': CompiledTemplate(source['text']),
+            'html': CompiledTemplate(source['html'], escape_html=True),
+        }
+        for name, source in TEMPLATE_SOURCES.items()
+    }
+
+
+TEMPLATES = _compile_all()
+
+
+def render_subject(name, context):
+    return TEMPLATES[name]['subject'].render(display_values(context))
+
+
+def render_email(name, context):
+    """Return (subject, text_body, html_body) for a template and its context"""
+    template = TEMPLATES[name]
+    values = display_values(context)
+    return (
+        template['subject'].render(values),
+        template['text'].render(values),
+        template['html'].render(values),
+    )
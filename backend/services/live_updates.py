@@ -0,0 +1,346 @@
+"""
+Live availability over Server-Sent Events (GET /api/live/availability)
+
+Committed changes are pushed to subscribers as compact deltas:
+- 'slot': a slot's capacity after a booking, cancellation, no-show,
+  promotion or admin change
+- 'booking': a booking's new status (admins and attendants only)
+- 'machine': a machine's new status
+
+Changes are collected from each session's flushes (and from the no-show
+sweep, which updates bookings in bulk) and published after the commit,
+so a rolled back transaction never reaches a client. Slot deltas carry
+the counters read back after the commit, not the values the transaction
+thought it wrote.
+
+The broker lives in the process: deltas only reach the streams of the
+process that committed the change. Changes committed elsewhere (the
+run-scheduler process's no-show sweep and promotions, other workers)
+are picked up by VersionWatcher, which polls the data versions every
+LIVE_VERSION_POLL_SECONDS while streams are open and sends a 'refresh'
+event naming the resources another process changed; clients refetch
+them (a 304 when nothing they show changed).
+
+Serve the streams from gevent workers
+(`gunicorn -k gevent --worker-connections 1000 "app:create_app()"`),
+where each idle stream is a greenlet parked on its queue rather than a
+WSGI thread. Under the threaded development server every stream holds
+a thread.
+"""
+
+from database import db
+from models import Booking, Machine, TimeSlot
+from services.admission import working_machines_in_pair
+from services.data_versions import get_versions, local_bump_counts
+from services.occupancy import free_machines
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+from threading import Lock, Thread
+import json
+import logging
+import os
+import queue
+import time
+
+logger = logging.getLogger(__name__)
+
+LIVE_MAX_SUBSCRIBERS = int(os.environ.get('LIVE_MAX_SUBSCRIBERS', 500))
+LIVE_QUEUE_SIZE = int(os.environ.get('LIVE_QUEUE_SIZE', 100))
+LIVE_KEEPALIVE_SECONDS = float(os.environ.get('LIVE_KEEPALIVE_SECONDS', 15))
+# Lifetime of the stream tokens handed out by POST /api/live/token; they only
+# open a stream, so one leaked from an access log is short-lived and useless
+# against the rest of the API
+LIVE_TOKEN_SECONDS = int(os.environ.get('LIVE_TOKEN_SECONDS', 60))
+LIVE_TOKEN_SCOPE = 'live'
+# How often a process with open streams checks for changes made by other processes
+LIVE_VERSION_POLL_SECONDS = float(os.environ.get('LIVE_VERSION_POLL_SECONDS', 2))
+
+# Resources whose versions the watcher follows (services/data_versions.py)
+WATCHED_RESOURCES = ('slots', 'machines')
+
+# Client reconnect delay sent with the stream
+LIVE_RETRY_MILLISECONDS = 3000
+
+_PENDING_KEY = 'live_updates'
+_CLOSED = object()
+
+
+class Subscription:
+    """One connected stream: the dates it watches and its pending events"""
+
+    def __init__(self, dates, staff):
+        self.dates = dates  # set of ISO dates, or None for every date
+        self.staff = staff  # admins and attendants also get booking events
+        self.events = queue.Queue(maxsize=LIVE_QUEUE_SIZE)
+
+    def wants(self, kind, payload):
+        if kind == 'booking' and not self.staff:
+            return False
+        if self.dates is not None and 'date' in payload:
+            return payload['date'] in self.dates
+        return True
+
+    def next_event(self, timeout):
+        """(kind, payload), None after timeout, or _CLOSED once the broker dropped it"""
+        try:
+            return self.events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class LiveBroker:
+    """Fans published events out to the subscriptions that want them"""
+
+    def __init__(self, max_subscribers=LIVE_MAX_SUBSCRIBERS):
+        self.max_subscribers = max_subscribers
+        self._lock = Lock()
+        self._subscriptions = set()
+        self._next_id = 0
+        self.published = 0
+        self.dropped = 0
+
+    @property
+    def has_subscribers(self):
+        return bool(self._subscriptions)
+
+    def subscribe(self, dates=None, staff=False):
+        """New Subscription, or None when the broker is full"""
+        with self._lock:
+            if len(self._subscriptions) >= self.max_subscribers:
+                return None
+            subscription = Subscription(dates, staff)
+            self._subscriptions.add(subscription)
+            return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, events):
+        """Queue (kind, payload) events; a subscriber that cannot keep up is disconnected"""
+        with self._lock:
+            for kind, payload in events:
+                self._next_id += 1
+                payload = dict(payload, id=self._next_id)
+                self.published += 1
+                for subscription in list(self._subscriptions):
+                    if not subscription.wants(kind, payload):
+                        continue
+                    try:
+                        subscription.events.put_nowait((kind, payload))
+                    except queue.Full:
+                        # It reconnects and refetches instead of seeing a gap
+                        self._subscriptions.discard(subscription)
+                        self.dropped += 1
+                        _close(subscription)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'subscribers': len(self._subscriptions),
+                'published': self.published,
+                'dropped': self.dropped
+            }
+
+
+def _close(subscription):
+    # Make room so the stream sees the close marker right after its backlog
+    try:
+        subscription.events.get_nowait()
+    except queue.Empty:
+        pass
+    subscription.events.put_nowait(_CLOSED)
+
+
+broker = LiveBroker()
+
+
+class VersionWatcher:
+    """
+    Turns data version bumps made by other processes into 'refresh' events
+    This process's own bumps (local_bump_counts()) already went out as
+    deltas; they are counted before they commit and read after the
+    versions, so a poll never mistakes one of them for a change from
+    elsewhere
+    """
+
+    def __init__(self, interval=LIVE_VERSION_POLL_SECONDS):
+        self.interval = interval
+        self._lock = Lock()
+        self._thread = None
+        self._seen = None   # versions at the last poll, None until a baseline is taken
+        self._own = {}      # local bump counts at the last poll
+        self._unmatched = {}  # own bumps not yet visible in a poll
+
+    def start(self, app):
+        """Start polling in a daemon thread (once per process)"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = Thread(target=self._run, args=(app,), name='live-version-watcher', daemon=True)
+            self._thread.start()
+
+    def changed_elsewhere(self, versions, own):
+        """Resources another process bumped since the last call"""
+        with self._lock:
+            if self._seen is None:
+                self._seen, self._own, self._unmatched = versions, own, {}
+                return []
+            changed = []
+            for resource, version in versions.items():
+                unmatched = self._unmatched.get(resource, 0) + own.get(resource, 0) - self._own.get(resource, 0)
+                delta = version - self._seen.get(resource, 0)
+                matched = max(0, min(delta, unmatched))
+                self._unmatched[resource] = unmatched - matched
+                if delta > matched:
+                    changed.append(resource)
+            self._seen, self._own = versions, own
+            return changed
+
+    def reset(self):
+        """Forget the baseline; the next poll takes a new one"""
+        with self._lock:
+            self._seen = None
+
+    def poll(self):
+        """One check (needs an app context); publishes a 'refresh' event when needed"""
+        try:
+            versions = get_versions(*WATCHED_RESOURCES)
+        finally:
+            db.session.remove()
+        # Read after the versions: every own bump they include is already counted
+        own = local_bump_counts()
+        changed = self.changed_elsewhere(versions, own)
+        if changed:
+            broker.publish([('refresh', {'resources': changed, 'versions': versions})])
+        return changed
+
+    def _run(self, app):
+        while True:
+            time.sleep(self.interval)
+            if not broker.has_subscribers:
+                # Streams opened later fetch fresh data anyway
+                self.reset()
+                continue
+            try:
+                with app.app_context():
+                    self.poll()
+            except Exception:
+                logger.exception("Could not poll data versions for live updates")
+
+
+version_watcher = VersionWatcher()
+
+
+def _pending(session):
+    return session.info.setdefault(_PENDING_KEY, {'slots': set(), 'bookings': {}, 'machines': {}})
+
+
+def record_booking_statuses(session, changes):
+    """Publish (booking_id, slot_id, status) changes made with bulk UPDATEs when session commits"""
+    pending = _pending(session)
+    for booking_id, slot_id, status in changes:
+        pending['bookings'][booking_id] = (slot_id, status.value)
+        pending['slots'].add(slot_id)
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_flushed_changes(session, flush_context):
+    pending = None
+    for instance in (*session.new, *session.dirty):
+        if isinstance(instance, Booking):
+            if instance in session.new or inspect(instance).attrs.status.history.has_changes():
+                pending = pending or _pending(session)
+                pending['bookings'][instance.id] = (instance.slot_id, instance.status.value)
+                pending['slots'].add(instance.slot_id)
+        elif isinstance(instance, TimeSlot):
+            pending = pending or _pending(session)
+            pending['slots'].add(instance.id)
+        elif isinstance(instance, Machine):
+            if inspect(instance).attrs.status.history.has_changes():
+                pending = pending or _pending(session)
+                pending['machines'][instance.id] = (instance.pair_id, instance.status)
+
+
+def _slot_rows(slot_ids):
+    """Capacity of the changed slots, read after the commit in one query"""
+    with db.engine.connect() as connection:
+        return connection.execute(
+            select(
+                TimeSlot.id, TimeSlot.date, TimeSlot.pair_id,
+                TimeSlot.available_machines, TimeSlot.booked_machines,
+                working_machines_in_pair().label('working_machines')
+            ).where(TimeSlot.id.in_(slot_ids))
+        ).all()
+
+
+def _build_events(pending):
+    events = []
+    slot_dates = {}
+    if pending['slots']:
+        for row in _slot_rows(sorted(pending['slots'])):
+            date = row.date.isoformat()
+            slot_dates[row.id] = date
+            events.append(('slot', {
+                'slot_id': row.id,
+                'date': date,
+                'pair_id': row.pair_id,
+                'available_machines': free_machines(row.available_machines, row.booked_machines, row.working_machines),
+                'total_machines': row.working_machines,
+                'is_disabled': row.available_machines == 0
+            }))
+
+    for booking_id, (slot_id, status) in sorted(pending['bookings'].items()):
+        events.append(('booking', {
+            'booking_id': booking_id,
+            'slot_id': slot_id,
+            'date': slot_dates.get(slot_id),
+            'status': status
+        }))
+
+    for machine_id, (pair_id, status) in sorted(pending['machines'].items()):
+        events.append(('machine', {'machine_id': machine_id, 'pair_id': pair_id, 'status': status}))
+    return events
+
+
+@event.listens_for(Session, 'after_commit')
+def _publish_committed_changes(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending or not broker.has_subscribers:
+        return
+    try:
+        broker.publish(_build_events(pending))
+    except Exception:
+        # Subscribers still converge on their next refetch
+        logger.exception("Could not publish live updates")
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_rolled_back_changes(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+def format_event(kind, payload):
+    """One SSE frame"""
+    return f"id: {payload['id']}\nevent: {kind}\ndata: {json.dumps(payload, separators=(',', ':'))}\n\n"
+
+
+def stream_events(subscription, ready):
+    """
+    SSE body for a subscription: a 'ready' frame with the current data
+    versions, then deltas and keepalive comments until the client leaves
+    or falls too far behind
+    """
+    try:
+        yield f"retry: {LIVE_RETRY_MILLISECONDS}\n"
+        yield f"event: ready\ndata: {json.dumps(ready, separators=(',', ':'))}\n\n"
+        while True:
+            item = subscription.next_event(LIVE_KEEPALIVE_SECONDS)
+            if item is _CLOSED:
+                return
+            if item is None:
+                yield ": keepalive\n\n"
+                continue
+            yield format_event(*item)
+    finally:
+        broker.unsubscribe(subscription)
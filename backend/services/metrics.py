@@ -0,0 +1,269 @@
+"""
+Prometheus metrics for the backend (GET /api/admin/metrics)
+
+With METRICS_ENABLED set, init_metrics() installs:
+- before/after request hooks timing every request, labelled by method,
+  route rule (not the raw path, so ids do not multiply the series) and
+  status
+- SQLAlchemy cursor listeners counting the statements each request runs
+  and the time spent in them; statements outside a request (scheduler
+  jobs, email workers) are counted as background
+
+render_metrics() adds the figures other modules already keep: scheduled
+job durations, no-show sweep totals, email outbox counters and queue
+depth (one GROUP BY at scrape time), auth cache and live stream stats.
+
+Without METRICS_ENABLED nothing is installed, so requests and queries
+pay nothing, and the endpoint answers 404.
+"""
+
+from database import db
+from services.auth_cache import auth_cache
+from services.email_outbox import metrics as outbox_metrics, queue_depth
+from services.live_updates import broker
+from services.scheduler import job_stats, sweep_stats
+from flask import g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from threading import Lock
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Upper bounds of the histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+# Statement tally of the request running on this thread (greenlet under gevent)
+_current = threading.local()
+
+
+class Histogram:
+    """Per-bucket counts plus sum; rendered cumulatively"""
+
+    __slots__ = ('bucket_counts', 'count', 'sum')
+
+    def __init__(self, buckets):
+        self.bucket_counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, buckets, value):
+        self.count += 1
+        self.sum += value
+        for index, bound in enumerate(buckets):
+            if value <= bound:
+                self.bucket_counts[index] += 1
+                break
+
+
+class RequestMetrics:
+    """Request, latency and SQL figures per (method, route), shared by all request threads"""
+
+    def __init__(self):
+        self._lock = Lock()
+        self.responses = {}   # (method, route, status) -> count
+        self.latency = {}     # (method, route) -> Histogram of seconds
+        self.queries = {}     # (method, route) -> Histogram of statements per request
+        self.db_seconds = {}  # (method, route) -> seconds spent executing statements
+        self.background_queries = 0
+        self.background_db_seconds = 0.0
+
+    def record_request(self, method, route, status, seconds, queries, db_seconds):
+        key = (method, route)
+        with self._lock:
+            self.responses[(method, route, status)] = self.responses.get((method, route, status), 0) + 1
+            if key not in self.latency:
+                self.latency[key] = Histogram(LATENCY_BUCKETS)
+                self.queries[key] = Histogram(QUERY_COUNT_BUCKETS)
+                self.db_seconds[key] = 0.0
+            self.latency[key].observe(LATENCY_BUCKETS, seconds)
+            self.queries[key].observe(QUERY_COUNT_BUCKETS, queries)
+            self.db_seconds[key] += db_seconds
+
+    def record_background_query(self, seconds):
+        with self._lock:
+            self.background_queries += 1
+            self.background_db_seconds += seconds
+
+    def snapshot(self):
+        def copy(histograms):
+            return {key: (list(h.bucket_counts), h.count, h.sum) for key, h in histograms.items()}
+
+        with self._lock:
+            return {
+                'responses': dict(self.responses),
+                'latency': copy(self.latency),
+                'queries': copy(self.queries),
+                'db_seconds': dict(self.db_seconds),
+                'background_queries': self.background_queries,
+                'background_db_seconds': self.background_db_seconds,
+            }
+
+
+request_metrics = RequestMetrics()
+_installed = False
+
+
+def _start_timer():
+    g.metrics_started = time.perf_counter()
+    _current.tally = [0, 0.0]
+
+
+def _record_request(response):
+    started = g.pop('metrics_started', None)
+    tally = getattr(_current, 'tally', None)
+    _current.tally = None
+    if started is not None and tally is not None:
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        request_metrics.record_request(
+            request.method, route, response.status_code, time.perf_counter() - started, tally[0], tally[1]
+        )
+    return response
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metrics_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stack = conn.info.get('metrics_started')
+    if not stack:
+        return
+    seconds = time.perf_counter() - stack.pop()
+    tally = getattr(_current, 'tally', None)
+    if tally is not None:
+        tally[0] += 1
+        tally[1] += seconds
+    else:
+        request_metrics.record_background_query(seconds)
+
+
+def init_metrics(app):
+    """Install the request hooks and SQL listeners when METRICS_ENABLED is set"""
+    global _installed
+    if not METRICS_ENABLED:
+        return
+    app.before_request(_start_timer)
+    app.after_request(_record_request)
+    if not _installed:
+        # On the Engine class, so every engine the process creates is covered
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        _installed = True
+    logger.info("Metrics enabled at /api/admin/metrics")
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+class _Exposition:
+    """Builds the text format: HELP/TYPE once per family, then its samples"""
+
+    def __init__(self):
+        self.lines = []
+
+    def family(self, name, kind, help_text, samples):
+        """samples: iterable of (labels dict, value)"""
+        self.lines.append(f'# HELP {name} {help_text}')
+        self.lines.append(f'# TYPE {name} {kind}')
+        for labels, value in samples:
+            self.lines.append(f'{name}{_labels(**labels)} {value:g}' if isinstance(value, float)
+                              else f'{name}{_labels(**labels)} {value}')
+
+    def histogram(self, name, help_text, buckets, series):
+        """series: iterable of (labels dict, (bucket_counts, count, sum))"""
+        self.lines.append(f'# HELP {name} {help_text}')
+        self.lines.append(f'# TYPE {name} histogram')
+        for labels, (bucket_counts, count, total) in series:
+            cumulative = 0
+            for bound, bucket_count in zip(buckets, bucket_counts):
+                cumulative += bucket_count
+                self.lines.append(f'{name}_bucket{_labels(**labels, le=f"{bound:g}")} {cumulative}')
+            self.lines.append(f'{name}_bucket{_labels(**labels, le="+Inf")} {count}')
+            self.lines.append(f'{name}_sum{_labels(**labels)} {total:g}')
+            self.lines.append(f'{name}_count{_labels(**labels)} {count}')
+
+    def text(self):
+        return '\n'.join(self.lines) + '\n'
+
+
+def render_metrics():
+    """Every metric of this process in the Prometheus text format"""
+    out = _Exposition()
+    snapshot = request_metrics.snapshot()
+
+    out.family('laundry_http_requests_total', 'counter', 'Requests by method, route and status', [
+        ({'method': method, 'route': route, 'status': status}, count)
+        for (method, route, status), count in sorted(snapshot['responses'].items())
+    ])
+    out.histogram('laundry_http_request_duration_seconds', 'Request latency by method and route', LATENCY_BUCKETS, [
+        ({'method': method, 'route': route}, values) for (method, route), values in sorted(snapshot['latency'].items())
+    ])
+    out.histogram('laundry_http_request_queries', 'SQL statements per request by method and route',
+                  QUERY_COUNT_BUCKETS, [
+        ({'method': method, 'route': route}, values) for (method, route), values in sorted(snapshot['queries'].items())
+    ])
+    out.family('laundry_http_request_db_seconds_total', 'counter', 'Time spent executing SQL by method and route', [
+        ({'method': method, 'route': route}, seconds) for (method, route), seconds in sorted(snapshot['db_seconds'].items())
+    ])
+    out.family('laundry_background_queries_total', 'counter', 'SQL statements run outside requests',
+               [({}, snapshot['background_queries'])])
+    out.family('laundry_background_db_seconds_total', 'counter', 'Time spent executing SQL outside requests',
+               [({}, snapshot['background_db_seconds'])])
+
+    jobs = sorted(job_stats.snapshot().items())
+    out.histogram('laundry_job_duration_seconds', 'Scheduled job run time', job_stats.buckets, [
+        ({'job': job_id}, (job['bucket_counts'], job['runs'], job['duration_seconds_total'])) for job_id, job in jobs
+    ])
+    out.family('laundry_job_failures_total', 'counter', 'Scheduled job runs that raised',
+               [({'job': job_id}, job['failures']) for job_id, job in jobs])
+
+    sweep = sweep_stats.snapshot()
+    out.family('laundry_no_show_sweep_failures_total', 'counter', 'No-show sweeps rolled back', [({}, sweep['failures'])])
+    out.family('laundry_no_shows_marked_total', 'counter', 'Bookings marked as no-shows', [({}, sweep['marked_total'])])
+    out.family('laundry_no_show_promotions_total', 'counter', 'Waitlist promotions after no-shows',
+               [({}, sweep['promoted_total'])])
+
+    outbox = outbox_metrics.snapshot()
+    out.family('laundry_email_sent_total', 'counter', 'Emails sent by this process', [({}, outbox['sent'])])
+    out.family('laundry_email_failures_total', 'counter', 'Failed email attempts', [({}, outbox['failed'])])
+    out.family('laundry_email_dead_total', 'counter', 'Emails given up on', [({}, outbox['dead'])])
+    out.family('laundry_email_smtp_connections_total', 'counter', 'SMTP connections opened',
+               [({}, outbox['smtp_connections_opened'])])
+    try:
+        depth = queue_depth()
+    except Exception:
+        db.session.rollback()
+        logger.exception("Could not read the email queue depth")
+    else:
+        out.family('laundry_email_queue_depth', 'gauge', 'Email outbox rows by status',
+                   [({'status': status}, count) for status, count in sorted(depth.items())])
+
+    cache = auth_cache.stats()
+    out.family('laundry_auth_cache_entries', 'gauge', 'Authenticated users cached', [({}, cache['size'])])
+    out.family('laundry_auth_cache_lookups_total', 'counter', 'Auth cache lookups by result', [
+        ({'result': 'hit'}, cache['hits']), ({'result': 'miss'}, cache['misses'])
+    ])
+    out.family('laundry_auth_cache_evictions_total', 'counter', 'Auth cache evictions', [({}, cache['evictions'])])
+
+    live = broker.stats()
+    out.family('laundry_live_subscribers', 'gauge', 'Open live availability streams', [({}, live['subscribers'])])
+    out.family('laundry_live_events_total', 'counter', 'Live events published', [({}, live['published'])])
+    out.family('laundry_live_dropped_total', 'counter', 'Live streams dropped for falling behind',
+               [({}, live['dropped'])])
+    return out.text()
@@ -1,74 +1,56 @@
 """
 Notification service for sending emails and push notifications
-TODO: Configure email settings and implement actual sending logic
+Emails go through the outbox (services/email_outbox.py) using the
+precompiled templates in services/email_templates.py
 """
 
+from services.email_outbox import enqueue_template_email, enqueue_template_emails
+from services.email_templates import booking_email_context
+import logging
+
+logger = logging.getLogger(__name__)
+
+def _send_booking_email(template, user, booking):
+    """
+    Queue a templated email about a booking in the caller's transaction
+    Failures are logged, never raised; the caller commits
+    """
+    try:
+        context = booking_email_context(user, booking, booking.time_slot)
+        enqueue_template_email(template, [user.email], context)
+        logger.info("[NOTIFICATION] %s queued for %s - ticket %s", template, user.email, booking.ticket_id)
+    except Exception:
+        logger.exception("Failed to queue %s email for %s", template, user.email)
+
 def send_booking_confirmation(user, booking):
     """Send booking confirmation email"""
-    print(f"[NOTIFICATION] Booking confirmation to {user.email}")
-    print(f"  Ticket ID: {booking.ticket_id}")
-    print(f"  Slot: {booking.time_slot.start_time}")
-    # TODO: Implement actual email sending
-    pass
+    _send_booking_email('booking_confirmation', user, booking)
 
 def send_waitlist_promotion(user, booking):
     """Send notification when user is promoted from waitlist"""
-    print(f"[NOTIFICATION] Waitlist promotion to {user.email}")
-    print(f"  You've been promoted! Ticket ID: {booking.ticket_id}")
-    print(f"  Slot: {booking.time_slot.start_time}")
-    # TODO: Implement actual email sending
-    pass
+    _send_booking_email('waitlist_promotion', user, booking)
+
+def send_waitlist_promotions(bookings):
+    """Queue promotion emails for a batch of promoted bookings in the caller's transaction"""
+    try:
+        emails = [(booking.user.email, booking.ticket_id,
+                   booking_email_context(booking.user, booking, booking.time_slot)) for booking in bookings]
+        enqueue_template_emails(
+            ('waitlist_promotion', [email], context) for email, _, context in emails
+        )
+        for email, ticket_id, _ in emails:
+            logger.info("[NOTIFICATION] waitlist_promotion queued for %s - ticket %s", email, ticket_id)
+    except Exception:
+        logger.exception("Failed to queue waitlist promotion emails for %d booking(s)", len(bookings))
 
 def send_reminder(user, booking):
     """Send reminder notification 1 hour before slot"""
-    print(f"[NOTIFICATION] Reminder to {user.email}")
-    print(f"  Your laundry slot starts in 1 hour")
-    print(f"  Ticket ID: {booking.ticket_id}")
-    # TODO: Implement actual email sending
-    pass
+    _send_booking_email('booking_reminder', user, booking)
 
 def send_cancellation(user, booking):
     """Send cancellation confirmation"""
-    print(f"[NOTIFICATION] Cancellation confirmation to {user.email}")
-    print(f"  Booking cancelled: {booking.ticket_id}")
-    # TODO: Implement actual email sending
-    pass
+    _send_booking_email('booking_cancelled', user, booking)
 
 def send_no_show_alert(user, booking):
     """Send alert when booking is marked as no-show"""
-    print(f"[NOTIFICATION] No-show alert to {user.email}")
-    print(f"  Your booking was marked as no-show: {booking.ticket_id}")
-    # TODO: Implement actual email sending
-    pass
-
-"""
-To implement actual email sending, install flask-mail:
-pip install flask-mail
-
-Then configure in app.py:
-from flask_mail import Mail, Message
-
-app.config['MAIL_SERVER'] = 'smtp.gmail.com'
-app.config['MAIL_PORT'] = 587
-app.config['MAIL_USE_TLS'] = True
-app.config['MAIL_USERNAME'] = 'your-email@gmail.com'
-app.config['MAIL_PASSWORD'] = 'your-password'
-
-mail = Mail(app)
-
-def send_booking_confirmation(user, booking):
-    msg = Message('Booking Confirmation - Masbanat AlAkhawayn',
-                  sender='noreply@laundry.com',
-                  recipients=[user.email])
-    msg.body = f'''
-    Your laundry booking has been confirmed!
-    
-    Ticket ID: {booking.ticket_id}
-    Time: {booking.time_slot.start_time}
-    Machine Pair: {booking.time_slot.pair_id}
-    Load Type: {booking.load_type.value}
-    
-    Please arrive 5 minutes before your slot time.
-    '''
-    mail.send(msg)
-"""
+    _send_booking_email('no_show', user, booking)
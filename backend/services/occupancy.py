@@ -0,0 +1,116 @@
+from database import db
+from models import TimeSlot, Booking, BookingStatus, ACTIVE_BOOKING_STATUSES
+from services.admission import try_reserve_machines
+from sqlalchemy import func
+
+
+def occupancy_delta(old_status, new_status, machines_used):
+    """
+    Change in a slot's booked machines when a booking moves between statuses
+    Only CONFIRMED/RECEIVED/WASHING bookings occupy machines
+    """
+    was_active = old_status in ACTIVE_BOOKING_STATUSES
+    is_active = new_status in ACTIVE_BOOKING_STATUSES
+    return (int(is_active) - int(was_active)) * (machines_used or 0)
+
+
+def adjust_slot_occupancy(slot_id, delta):
+    """
+    Add delta to a slot's booked_machines counter with a single UPDATE
+    Runs inside the caller's transaction, so it commits or rolls back
+    together with the booking change that caused it
+    """
+    if not delta:
+        return
+    db.session.query(TimeSlot).filter(TimeSlot.id == slot_id).execution_options(
+        changed_slot_ids=(slot_id,)
+    ).update(
+        {TimeSlot.booked_machines: TimeSlot.booked_machines + delta}
+    )
+
+
+def free_machines(available_machines, booked_machines, working_machines):
+    """
+    Machines a slot can still admit: its capacity, capped by the pair's
+    working machines, minus the machines already booked
+    try_reserve_machines admits bookings on exactly these terms
+    """
+    return max(0, min(available_machines, working_machines) - (booked_machines or 0))
+
+
+def add_booking(booking):
+    """Add a new booking to the session and reserve its machines on the slot"""
+    if booking.status is None:
+        booking.status = BookingStatus.CONFIRMED
+    db.session.add(booking)
+    adjust_slot_occupancy(booking.slot_id, occupancy_delta(None, booking.status, booking.machines_used))
+
+
+def set_booking_status(booking, new_status):
+    """
+    Move a booking to new_status and keep the slot counter in step
+    Reactivating a booking reserves its machines with the same conditional
+    UPDATE as a new booking; returns False (booking unchanged) when the
+    slot no longer has room. The caller is responsible for committing
+    """
+    delta = occupancy_delta(booking.status, new_status, booking.machines_used)
+    if delta > 0 and not try_reserve_machines(booking.slot_id, delta):
+        return False
+    booking.status = new_status
+    if delta < 0:
+        adjust_slot_occupancy(booking.slot_id, delta)
+    return True
+
+
+def _active_usage_subquery():
+    return db.session.query(
+        Booking.slot_id.label('slot_id'),
+        func.sum(Booking.machines_used).label('machines_used')
+    ).filter(
+        Booking.status.in_(ACTIVE_BOOKING_STATUSES)
+    ).group_by(Booking.slot_id).subquery()
+
+
+def find_occupancy_drift():
+    """Return (slot_id, stored, actual) for every slot whose counter disagrees with its bookings"""
+    usage = _active_usage_subquery()
+    actual = func.coalesce(usage.c.machines_used, 0)
+
+    return db.session.query(
+        TimeSlot.id, TimeSlot.booked_machines, actual
+    ).outerjoin(
+        usage, usage.c.slot_id == TimeSlot.id
+    ).filter(
+        func.coalesce(TimeSlot.booked_machines, -1) != actual
+    ).order_by(TimeSlot.id).all()
+
+
+def rebuild_occupancy_counters():
+    """
+    Recompute every slot's booked_machines with one set-based UPDATE
+    The caller is responsible for committing
+    """
+    actual_usage = db.session.query(
+        func.coalesce(func.sum(Booking.machines_used), 0)
+    ).filter(
+        Booking.slot_id == TimeSlot.id,
+        Booking.status.in_(ACTIVE_BOOKING_STATUSES)
+    ).scalar_subquery()
+
+    db.session.query(TimeSlot).update(
+        {TimeSlot.booked_machines: actual_usage},
+        synchronize_session=False
+    )
+
+
+def reconcile_occupancy():
+    """
+    Rebuild every slot's booked_machines from its active bookings
+    Reports drift first, then fixes all counters in one pass
+    Returns the list of drifted (slot_id, stored, actual) rows
+    """
+    drift = find_occupancy_drift()
+    rebuild_occupancy_counters()
+    db.session.commit()
+
+    return drift
@@ -0,0 +1,101 @@
+"""
+Per-route SQL query budgets and an N+1 detector
+
+Views (and scheduled jobs) declare what one call may cost with
+@query_budget(max_queries, max_repeats). QueryRecorder collects the
+statements a block of code issues and QueryBudget.violations() compares
+them with the declaration:
+- more statements than max_queries
+- one statement, parameters aside, run more than max_repeats times:
+  the signature of a lazy relationship loaded inside a loop
+
+check_query_budgets.py calls every budgeted route against seeded data
+and fails on a violation, so an N+1 is caught before deploy.
+"""
+
+from collections import Counter
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+import re
+import threading
+
+# The same statement may legitimately run twice (e.g. a re-read after commit)
+DEFAULT_MAX_REPEATS = 2
+
+_WHITESPACE = re.compile(r'\s+')
+# IN lists expanded at execution time: (?, ?, ?) or (%(p_1)s, %(p_2)s)
+_EXPANDED_LIST = re.compile(r'\(\s*(?:\?|%\(\w+\)s|%s)(?:\s*,\s*(?:\?|%\(\w+\)s|%s))+\s*\)')
+
+
+class QueryBudget:
+    """Most statements one call may run, and how often any one of them may repeat"""
+
+    def __init__(self, max_queries, max_repeats=DEFAULT_MAX_REPEATS):
+        self.max_queries = max_queries
+        self.max_repeats = max_repeats
+
+    def violations(self, statements):
+        """Descriptions of every way statements break the budget (empty when within it)"""
+        problems = []
+        if len(statements) > self.max_queries:
+            problems.append(f'{len(statements)} statements, budget is {self.max_queries}')
+        for statement, count in Counter(normalize_statement(s) for s in statements).most_common():
+            if count <= self.max_repeats:
+                break
+            problems.append(f'{count}x (limit {self.max_repeats}): {statement[:160]}')
+        return problems
+
+    def __repr__(self):
+        return f'QueryBudget({self.max_queries}, max_repeats={self.max_repeats})'
+
+
+def query_budget(max_queries, max_repeats=DEFAULT_MAX_REPEATS):
+    """
+    Declare the SQL budget of a view or job
+    Stored on the function; functools.wraps carries it up through the
+    other decorators, so it can sit anywhere below @app.route
+    """
+    def decorator(func):
+        func.query_budget = QueryBudget(max_queries, max_repeats)
+        return func
+    return decorator
+
+
+def budget_for(func):
+    """The QueryBudget declared on func, or None"""
+    return getattr(func, 'query_budget', None)
+
+
+def normalize_statement(statement):
+    """Statement text with whitespace and expanded IN lists collapsed"""
+    return _EXPANDED_LIST.sub('(...)', _WHITESPACE.sub(' ', statement).strip())
+
+
+class QueryRecorder:
+    """
+    Context manager collecting the SQL statements run on this thread
+    Statements from other threads (email workers, the scheduler) are ignored
+    """
+
+    def __init__(self):
+        self.statements = []
+        self._thread = None
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        if threading.get_ident() == self._thread:
+            self.statements.append(statement)
+
+    def __enter__(self):
+        self.statements = []
+        self._thread = threading.get_ident()
+        event.listen(Engine, 'before_cursor_execute', self._record)
+        return self
+
+    def __exit__(self, *exc_info):
+        event.remove(Engine, 'before_cursor_execute', self._record)
+        return False
+
+    def repeats(self):
+        """Most frequent normalized statement and its count, or (None, 0)"""
+        counts = Counter(normalize_statement(s) for s in self.statements).most_common(1)
+        return counts[0] if counts else (None, 0)
@@ -1,69 +1,254 @@
-from apscheduler.schedulers.background import BackgroundScheduler
 from database import db
 from models import Booking, BookingStatus, TimeSlot
 from services.waitlist_service import promote_from_waitlist
+from services.occupancy import adjust_slot_occupancy
+from services.live_updates import record_booking_statuses
+from services.data_versions import mark_slots_changed
+from services.query_budget import query_budget
+from sqlalchemy import select, update
+from collections import defaultdict
 from datetime import datetime, timedelta
+from functools import wraps
+from threading import Lock
 import atexit
+import logging
+import time
 
-scheduler = BackgroundScheduler()
+logger = logging.getLogger(__name__)
 
+# Bookings not checked in this long before their slot starts are no-shows
+NO_SHOW_GRACE_MINUTES = 5
+
+
+class SweepStats:
+    """Timings and row counts of no-show sweeps run by this process"""
+
+    def __init__(self):
+        self._lock = Lock()
+        self.runs = 0
+        self.failures = 0
+        self.marked_total = 0
+        self.promoted_total = 0
+        self.duration_total = 0.0
+        self.last_run = None
+
+    def record(self, run):
+        with self._lock:
+            self.runs += 1
+            self.marked_total += run['marked']
+            self.promoted_total += run['promoted']
+            self.duration_total += run['total_seconds']
+            self.last_run = run
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'runs': self.runs,
+                'failures': self.failures,
+                'marked_total': self.marked_total,
+                'promoted_total': self.promoted_total,
+                'duration_seconds_total': self.duration_total,
+                'last_run': dict(self.last_run) if self.last_run else None,
+            }
+
+
+sweep_stats = SweepStats()
+
+
+# Upper bounds (seconds) of the job duration histogram buckets
+JOB_DURATION_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300)
+
+
+class JobStats:
+    """Run counts and duration histograms of the scheduled jobs, per job id"""
+
+    def __init__(self, buckets=JOB_DURATION_BUCKETS):
+        self.buckets = buckets
+        self._lock = Lock()
+        self._jobs = {}
+
+    def record(self, job_id, seconds, failed=False):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                job = self._jobs[job_id] = {
+                    'runs': 0, 'failures': 0, 'duration_seconds_total': 0.0,
+                    'bucket_counts': [0] * len(self.buckets), 'last_duration_seconds': None
+                }
+            job['runs'] += 1
+            job['failures'] += int(failed)
+            job['duration_seconds_total'] += seconds
+            job['last_duration_seconds'] = seconds
+            for index, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    job['bucket_counts'][index] += 1
+                    break
+
+    def snapshot(self):
+        with self._lock:
+            return {job_id: dict(job, bucket_counts=list(job['bucket_counts'])) for job_id, job in self._jobs.items()}
+
+
+job_stats = JobStats()
+
+
+def timed_job(job_id):
+    """Record each run of a scheduled job in job_stats; an exception counts as a failure"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            failed = True
+            try:
+                result = func(*args, **kwargs)
+                failed = False
+                return result
+            finally:
+                job_stats.record(job_id, time.perf_counter() - started, failed)
+        return wrapper
+    return decorator
+
+
+def _mark_no_shows(cutoff_time):
+    """
+    Mark every overdue CONFIRMED booking as NO_SHOW with one UPDATE
+    Returns (booking_id, slot_id, machines_used) for each marked booking;
+    runs in the caller's transaction
+    """
+    overdue_slots = select(TimeSlot.id).where(TimeSlot.start_time <= cutoff_time)
+    overdue = (Booking.status == BookingStatus.CONFIRMED) & Booking.slot_id.in_(overdue_slots)
+    values = {'status': BookingStatus.NO_SHOW, 'updated_at': datetime.utcnow()}
+
+    if db.engine.dialect.update_returning:
+        rows = db.session.execute(
+            update(Booking).where(overdue).values(**values)
+            .returning(Booking.id, Booking.slot_id, Booking.machines_used)
+            .execution_options(synchronize_session=False, changed_slot_ids=())
+        ).all()
+        # Only now is it known which slots (and so which dates' data versions) changed
+        mark_slots_changed(db.session, {row.slot_id for row in rows})
+        return [(row.id, row.slot_id, row.machines_used) for row in rows]
+
+    # No UPDATE ... RETURNING: lock the rows first, then update exactly those
+    rows = db.session.execute(
+        select(Booking.id, Booking.slot_id, Booking.machines_used).where(overdue).with_for_update()
+    ).all()
+    if rows:
+        db.session.execute(
+            update(Booking).where(Booking.id.in_([row.id for row in rows])).values(**values)
+            .execution_options(synchronize_session=False, changed_slot_ids={row.slot_id for row in rows})
+        )
+    return [(row.id, row.slot_id, row.machines_used) for row in rows]
+
+
+# One affected slot: the sweep, then a promotion pass that fills both machines
+@query_budget(16)
 def check_no_shows():
     """
     Automated job to check for no-shows
     Runs every minute to check if bookings should be marked as no-show
     5-minute rule: If student hasn't checked in 5 minutes before slot, cancel booking
+
+    All overdue bookings are marked in a single transaction (one UPDATE
+    for the bookings, one counter update per affected slot), then each
+    affected slot gets one promotion pass that fills the freed machines
+    from its waitlist. Returns the run's timings and row counts.
     """
+    started_at = datetime.utcnow()
+    started = time.perf_counter()
     try:
-        print(f"Running no-show check at {datetime.now()}")
-        
-        # Find bookings that are:
-        # 1. Status is CONFIRMED (not yet received)
-        # 2. Start time is within next 5 minutes or already passed
-        cutoff_time = datetime.utcnow() + timedelta(minutes=5)
-        
-        bookings_to_check = Booking.query.join(TimeSlot).filter(
-            Booking.status == BookingStatus.CONFIRMED,
-            TimeSlot.start_time <= cutoff_time
-        ).all()
-        
-        for booking in bookings_to_check:
-            # Mark as no-show
-            booking.status = BookingStatus.NO_SHOW
-            booking.updated_at = datetime.utcnow()
-            
-            # Free up machines
-            booking.time_slot.available_machines += booking.machines_used
-            
-            print(f"Marking booking {booking.id} as no-show (slot starts at {booking.time_slot.start_time})")
-            
-            # Commit this booking
-            db.session.commit()
-            
-            # Try to promote from waitlist
-            promote_from_waitlist(booking.slot_id)
-        
-        if bookings_to_check:
-            print(f"Marked {len(bookings_to_check)} bookings as no-show")
-    
-    except Exception as e:
+        # Slot times are naive local time, as generated by the slot generator
+        cutoff_time = datetime.now() + timedelta(minutes=NO_SHOW_GRACE_MINUTES)
+
+        marked = _mark_no_shows(cutoff_time)
+
+        freed = defaultdict(int)
+        for _, slot_id, machines_used in marked:
+            freed[slot_id] += machines_used or 0
+        for slot_id, machines in freed.items():
+            adjust_slot_occupancy(slot_id, -machines)
+        record_booking_statuses(db.session, [
+            (booking_id, slot_id, BookingStatus.NO_SHOW) for booking_id, slot_id, _ in marked
+        ])
+
+        db.session.commit()
+        swept = time.perf_counter()
+
+        promoted = 0
+        for slot_id in sorted(freed):
+            # Fills every freed machine of the slot in one transaction
+            promoted += len(promote_from_waitlist(slot_id))
+
+        finished = time.perf_counter()
+        run = {
+            'started_at': started_at.isoformat(),
+            'marked': len(marked),
+            'slots': len(freed),
+            'promoted': promoted,
+            'sweep_seconds': swept - started,
+            'promotion_seconds': finished - swept,
+            'total_seconds': finished - started,
+        }
+        sweep_stats.record(run)
+
+        if marked:
+            logger.info("No-show sweep marked %d booking(s) in %d slot(s), promoted %d in %.1f ms "
+                        "(sweep %.1f ms, promotion %.1f ms)",
+                        run['marked'], run['slots'], run['promoted'], run['total_seconds'] * 1000,
+                        run['sweep_seconds'] * 1000, run['promotion_seconds'] * 1000)
+        else:
+            logger.debug("No-show sweep found nothing in %.1f ms", run['total_seconds'] * 1000)
+        return run
+
+    except Exception:
         db.session.rollback()
-        print(f"Error in no-show check: {str(e)}")
+        sweep_stats.record_failure()
+        logger.exception("Error in no-show check")
+        return None
+
+@timed_job('check_no_shows')
+def _run_check_no_shows(app):
+    with app.app_context():
+        try:
+            check_no_shows()
+        finally:
+            db.session.remove()
+
+def create_scheduler(app, blocking=False):
+    """
+    Scheduler with the no-show job, not started yet
+    blocking=True runs the jobs in the foreground of a dedicated process;
+    apscheduler is only imported here, so importing this module stays cheap
+    """
+    if blocking:
+        from apscheduler.schedulers.blocking import BlockingScheduler as Scheduler
+    else:
+        from apscheduler.schedulers.background import BackgroundScheduler as Scheduler
+    scheduler = Scheduler()
 
-def start_scheduler(app):
-    """Initialize and start the scheduler with Flask app context"""
-    
     # Add job to run every minute
     scheduler.add_job(
-        func=lambda: app.app_context().push() or check_no_shows(),
+        func=_run_check_no_shows,
+        args=[app],
         trigger="interval",
         minutes=1,
         id='check_no_shows',
         name='Check for no-show bookings every minute',
         replace_existing=True
     )
-    
+    return scheduler
+
+
+def start_scheduler(app):
+    """Initialize and start the scheduler in the background with Flask app context"""
+    scheduler = create_scheduler(app)
     scheduler.start()
-    print("Scheduler started - checking for no-shows every minute")
+    logger.info("Scheduler started - checking for no-shows every minute")
     
     # Shut down the scheduler when exiting the app
     atexit.register(lambda: scheduler.shutdown())
+    return scheduler
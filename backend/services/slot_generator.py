@@ -1,10 +1,17 @@
 from database import db
 from models import TimeSlot, Machine
 from datetime import datetime, timedelta, time
+import logging
 
-def generate_daily_slots(date, operational_hours={'start': '08:00', 'end': '20:00'}, slot_duration_minutes=60):
+logger = logging.getLogger(__name__)
+
+# Rows per multi-row INSERT, keeps bound parameters under SQLite's limit
+INSERT_BATCH_ROWS = 1000
+
+
+def plan_daily_slots(date, operational_hours={'start': '08:00', 'end': '20:00'}, slot_duration_minutes=60):
     """
-    Generate time slots for all 5 machine pairs with 10-minute stagger
+    Compute the time slots for all 5 machine pairs with 10-minute stagger
     
     Machine Pairs:
     - Pair 1: Machines 1 & 2
@@ -19,60 +26,146 @@ def generate_daily_slots(date, operational_hours={'start': '08:00', 'end': '20:0
     - Pair 3: 8:20-9:20, 9:20-10:20, 10:20-11:20...
     - Pair 4: 8:30-9:30, 9:30-10:30, 10:30-11:30...
     - Pair 5: 8:40-9:40, 9:40-10:40, 10:40-11:40...
+    
+    Pure computation - returns a list of row dicts, nothing touches the database
     """
-    try:
-        # Parse operational hours
-        start_hour, start_minute = map(int, operational_hours['start'].split(':'))
-        end_hour, end_minute = map(int, operational_hours['end'].split(':'))
-        
-        start_time = datetime.combine(date, time(start_hour, start_minute))
-        end_time = datetime.combine(date, time(end_hour, end_minute))
+    # Parse operational hours
+    start_hour, start_minute = map(int, operational_hours['start'].split(':'))
+    end_hour, end_minute = map(int, operational_hours['end'].split(':'))
+    
+    start_time = datetime.combine(date, time(start_hour, start_minute))
+    end_time = datetime.combine(date, time(end_hour, end_minute))
+    duration = timedelta(minutes=slot_duration_minutes)
+    
+    slots = []
+    
+    # Generate slots for each of the 5 pairs
+    for pair_id in range(1, 6):
+        # Calculate stagger offset: 10 minutes * (pair_id - 1)
+        stagger = timedelta(minutes=10 * (pair_id - 1))
         
-        slots_created = 0
+        # Generate slots for this pair
+        current_slot_start = start_time + stagger
         
-        # Generate slots for each of the 5 pairs
-        for pair_id in range(1, 6):
-            # Calculate stagger offset: 10 minutes * (pair_id - 1)
-            stagger_minutes = 10 * (pair_id - 1)
+        while current_slot_start + duration <= end_time + stagger:
+            slots.append({
+                'pair_id': pair_id,
+                'date': date,
+                'start_time': current_slot_start,
+                'end_time': current_slot_start + duration,
+                'available_machines': 2,  # Each pair has 2 machines
+                'booked_machines': 0
+            })
             
-            # Start time for this pair
-            pair_start = start_time + timedelta(minutes=stagger_minutes)
-            
-            # Generate slots for this pair
-            current_slot_start = pair_start
-            
-            while current_slot_start + timedelta(minutes=slot_duration_minutes) <= end_time + timedelta(minutes=stagger_minutes):
-                current_slot_end = current_slot_start + timedelta(minutes=slot_duration_minutes)
-                
-                # Check if slot already exists
-                existing_slot = TimeSlot.query.filter_by(
-                    pair_id=pair_id,
-                    start_time=current_slot_start
-                ).first()
-                
-                if not existing_slot:
-                    slot = TimeSlot(
-                        pair_id=pair_id,
-                        date=date,
-                        start_time=current_slot_start,
-                        end_time=current_slot_end,
-                        available_machines=2  # Each pair has 2 machines
-                    )
-                    db.session.add(slot)
-                    slots_created += 1
-                
-                # Move to next slot
-                current_slot_start += timedelta(minutes=slot_duration_minutes)
-        
-        db.session.commit()
-        print(f"Generated {slots_created} time slots for {date}")
+            # Move to next slot
+            current_slot_start += duration
+    
+    return slots
+
+
+def _insert_ignore_duplicates(rows):
+    """
+    Bulk INSERT ... ON CONFLICT (pair_id, start_time) DO NOTHING
+    Slots created concurrently (another worker's scheduler) are skipped by the
+    unique_pair_time constraint instead of failing the batch
+    """
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    
+    inserted = 0
+    for offset in range(0, len(rows), INSERT_BATCH_ROWS):
+        batch = rows[offset:offset + INSERT_BATCH_ROWS]
+        statement = insert(TimeSlot).values(batch)
+        result = db.session.execute(
+            statement.on_conflict_do_nothing(index_elements=['pair_id', 'start_time'])
+            .execution_options(changed_slot_dates={row['date'] for row in batch})
+        )
+        inserted += result.rowcount
+    return inserted
+
+
+def insert_missing_slots(planned, skip_existing_dates=False):
+    """
+    Insert the planned slots that are not in the database yet
+    
+    Reads the existing slots of the whole date range with one query, diffs
+    in memory and bulk inserts the rest, so the cost does not grow with the
+    number of per-slot existence checks.
+    
+    skip_existing_dates leaves any date that already has slots untouched,
+    so slots an admin deleted are not recreated.
+    
+    Returns the number of slots created.
+    """
+    if not planned:
+        return 0
+    
+    dates = [slot['date'] for slot in planned]
+    existing = db.session.query(TimeSlot.date, TimeSlot.pair_id, TimeSlot.start_time).filter(
+        TimeSlot.date.between(min(dates), max(dates))
+    ).all()
+    
+    existing_keys = {(pair_id, start_time) for _, pair_id, start_time in existing}
+    existing_dates = {date for date, _, _ in existing} if skip_existing_dates else set()
+    
+    missing = [
+        slot for slot in planned
+        if slot['date'] not in existing_dates
+        and (slot['pair_id'], slot['start_time']) not in existing_keys
+    ]
+    
+    created = _insert_ignore_duplicates(missing) if missing else 0
+    db.session.commit()
+    return created
+
+
+def generate_daily_slots(date, operational_hours={'start': '08:00', 'end': '20:00'}, slot_duration_minutes=60):
+    """
+    Generate the missing time slots for one date (see plan_daily_slots)
+    Returns the number of slots created
+    """
+    try:
+        slots_created = insert_missing_slots(plan_daily_slots(date, operational_hours, slot_duration_minutes))
+        logger.info("Generated %d time slots for %s", slots_created, date)
         return slots_created
     
-    except Exception as e:
+    except Exception:
         db.session.rollback()
-        print(f"Error generating slots: {str(e)}")
+        logger.exception("Error generating slots")
         return 0
 
+
+def generate_slot_horizon(start_date, days, hours_by_weekday, slot_duration_minutes=60, skip_existing_dates=True):
+    """
+    Generate slots for `days` consecutive dates starting at start_date
+    
+    hours_by_weekday maps date.weekday() to {'start': 'HH:MM', 'end': 'HH:MM'},
+    or None for days the laundry is closed.
+    
+    Runs a constant number of statements: one range query plus one INSERT per
+    INSERT_BATCH_ROWS missing slots. Returns the number of slots created.
+    """
+    planned = []
+    for day_offset in range(days):
+        target_date = start_date + timedelta(days=day_offset)
+        operational_hours = hours_by_weekday.get(target_date.weekday())
+        
+        # Skip days the laundry is closed
+        if operational_hours is None:
+            logger.debug("Skipping %s (closed)", target_date)
+            continue
+        
+        planned.extend(plan_daily_slots(target_date, operational_hours, slot_duration_minutes))
+    
+    try:
+        return insert_missing_slots(planned, skip_existing_dates=skip_existing_dates)
+    except Exception:
+        db.session.rollback()
+        raise
+
 def initialize_machines():
     """
     Initialize the 10 machines grouped into 5 pairs
@@ -81,7 +174,7 @@ def initialize_machines():
     try:
         # Check if machines already exist
         if Machine.query.count() > 0:
-            print("Machines already initialized")
+            logger.info("Machines already initialized")
             return
         
         # Create 10 machines in 5 pairs
@@ -96,8 +189,8 @@ def initialize_machines():
             db.session.add(machine)
         
         db.session.commit()
-        print("Initialized 10 machines in 5 pairs")
+        logger.info("Initialized 10 machines in 5 pairs")
     
-    except Exception as e:
+    except Exception:
         db.session.rollback()
-        print(f"Error initializing machines: {str(e)}")
+        logger.exception("Error initializing machines")
@@ -1,73 +1,172 @@
 from database import db
 from models import Waitlist, Booking, TimeSlot, WaitlistStatus, BookingStatus, LoadType
+from services.admission import try_reserve_machines, working_machines_in_pair
+from services.notifications import send_waitlist_promotions
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import joinedload
 import uuid
-from datetime import datetime
+import os
+import logging
 
-def promote_from_waitlist(slot_id):
+logger = logging.getLogger(__name__)
+
+# 'fifo' promotes strictly in queue order; 'best_fit' lets a combined load
+# skip past a separate load that needs more machines than are free
+PROMOTION_POLICIES = ('fifo', 'best_fit')
+WAITLIST_PROMOTION_POLICY = os.environ.get('WAITLIST_PROMOTION_POLICY', 'best_fit')
+
+# Entries keep the sequence they were given when they joined; their place in
+# the queue is derived on read, so joining or leaving never rewrites other rows
+
+def waitlist_position():
+    """Window expression: 1-based place of a WAITING entry in its slot's queue"""
+    return func.row_number().over(
+        partition_by=Waitlist.slot_id,
+        order_by=(Waitlist.sequence, Waitlist.id)
+    )
+
+def waiting_entries_with_position(slot_filter=None):
+    """
+    Query of (Waitlist, position) rows for WAITING entries
+    slot_filter narrows the slots that are ranked; it has to keep whole
+    slots, because positions are numbered over the rows the window sees
     """
-    Automatically promote the first person in waitlist for a given slot
+    ranked = db.session.query(
+        Waitlist.id.label('id'),
+        waitlist_position().label('position')
+    ).filter(Waitlist.status == WaitlistStatus.WAITING)
+    if slot_filter is not None:
+        ranked = ranked.filter(slot_filter)
+    ranked = ranked.subquery()
+
+    return db.session.query(Waitlist, ranked.c.position).join(ranked, ranked.c.id == Waitlist.id)
+
+def slots_waited_by(user_id):
+    """Slot filter for waiting_entries_with_position: slots the user is queued for"""
+    return Waitlist.slot_id.in_(
+        select(Waitlist.slot_id).where(
+            Waitlist.user_id == user_id,
+            Waitlist.status == WaitlistStatus.WAITING
+        )
+    )
+
+def get_waitlist_position(entry):
+    """Place of a single WAITING entry in its slot's queue"""
+    return Waitlist.query.filter(
+        Waitlist.slot_id == entry.slot_id,
+        Waitlist.status == WaitlistStatus.WAITING,
+        Waitlist.sequence <= entry.sequence
+    ).count()
+
+def machines_for_load(load_type):
+    """Separate whites/colors loads take both machines of a pair"""
+    return 2 if load_type in (LoadType.SEPARATE_WHITES, LoadType.SEPARATE_COLORS) else 1
+
+def plan_promotions(queue, free_machines, policy=None):
+    """
+    Choose which waiting entries (in queue order) fit into free_machines
+
+    'fifo' stops at the first entry that does not fit, so nobody is ever
+    overtaken; 'best_fit' lets a smaller load behind it take the machines
+    instead of leaving them idle
+    """
+    policy = policy or WAITLIST_PROMOTION_POLICY
+    if policy not in PROMOTION_POLICIES:
+        raise ValueError(f"Unknown promotion policy: {policy}")
+
+    chosen = []
+    for entry in queue:
+        if free_machines <= 0:
+            break
+        needed = machines_for_load(entry.load_type)
+        if needed <= free_machines:
+            chosen.append(entry)
+            free_machines -= needed
+        elif policy == 'fifo':
+            break
+    return chosen
+
+def promote_from_waitlist(slot_id, policy=None, notify=True):
+    """
+    Fill all free machines of a slot from its waitlist in one transaction
     Called when a booking is cancelled or marked as no-show
+
+    Returns the list of promoted bookings (empty when nobody fits); their
+    promotion emails are queued in the same transaction unless notify is False
     """
     try:
-        # Get the slot
-        slot = TimeSlot.query.get(slot_id)
-        if not slot:
-            return False
-        
-        # Check if there are machines available
-        if slot.available_machines <= 0:
-            return False
-        
-        # Find the first person in waitlist (lowest position, oldest created_at)
-        waitlist_entry = Waitlist.query.filter_by(
+        # Lock the slot row so concurrent promoters for it take turns
+        capacity = db.session.query(
+            TimeSlot.available_machines,
+            TimeSlot.booked_machines,
+            working_machines_in_pair()
+        ).filter(TimeSlot.id == slot_id).with_for_update(of=TimeSlot).first()
+
+        if not capacity:
+            return []
+
+        available, booked, working = capacity
+        free_machines = min(available or 0, working) - (booked or 0)
+        if free_machines <= 0:
+            db.session.rollback()
+            return []
+
+        # SKIP LOCKED: an entry another transaction is working on is left to it
+        queue = Waitlist.query.filter_by(
             slot_id=slot_id,
             status=WaitlistStatus.WAITING
-        ).order_by(Waitlist.position, Waitlist.created_at).first()
-        
-        if not waitlist_entry:
-            return False  # No one in waitlist
-        
-        # Check if enough machines are available for their load type
-        machines_needed = 2 if waitlist_entry.load_type in [LoadType.SEPARATE_WHITES, LoadType.SEPARATE_COLORS] else 1
-        
-        if slot.available_machines < machines_needed:
-            return False  # Not enough machines for this person's needs
-        
-        # Create booking for the promoted user
-        ticket_id = str(uuid.uuid4())
-        booking = Booking(
-            ticket_id=ticket_id,
-            user_id=waitlist_entry.user_id,
-            slot_id=slot_id,
-            load_type=waitlist_entry.load_type,
-            status=BookingStatus.CONFIRMED,
-            machines_used=machines_needed
-        )
-        
-        # Decrement available machines
-        slot.available_machines -= machines_needed
-        
-        # Update waitlist entry status
-        waitlist_entry.status = WaitlistStatus.PROMOTED
-        
-        # Update positions of remaining waitlist entries
-        Waitlist.query.filter(
-            Waitlist.slot_id == slot_id,
-            Waitlist.position > waitlist_entry.position,
-            Waitlist.status == WaitlistStatus.WAITING
-        ).update({Waitlist.position: Waitlist.position - 1})
-        
-        db.session.add(booking)
+        ).order_by(Waitlist.sequence, Waitlist.id).with_for_update(skip_locked=True).all()
+
+        chosen = plan_promotions(queue, free_machines, policy)
+        if not chosen:
+            db.session.rollback()
+            return []
+
+        # One conditional update for the machines and one for the entries;
+        # if either lost a race, nothing is promoted
+        machines = sum(machines_for_load(entry.load_type) for entry in chosen)
+        claimed = db.session.execute(
+            update(Waitlist).where(
+                Waitlist.id.in_([entry.id for entry in chosen]),
+                Waitlist.status == WaitlistStatus.WAITING
+            ).values(status=WaitlistStatus.PROMOTED).execution_options(synchronize_session=False)
+        ).rowcount
+
+        if claimed != len(chosen) or not try_reserve_machines(slot_id, machines):
+            db.session.rollback()
+            logger.warning("Waitlist promotion for slot %s lost a race, skipped", slot_id)
+            return []
+
+        bookings = [
+            Booking(
+                ticket_id=str(uuid.uuid4()),
+                user_id=entry.user_id,
+                slot_id=slot_id,
+                load_type=entry.load_type,
+                status=BookingStatus.CONFIRMED,
+                machines_used=machines_for_load(entry.load_type)
+            )
+            for entry in chosen
+        ]
+        db.session.add_all(bookings)
+        db.session.flush()
+
+        # Load their users and slot in one query, not a lazy load per booking
+        bookings = Booking.query.options(
+            joinedload(Booking.user), joinedload(Booking.time_slot)
+        ).filter(Booking.id.in_([booking.id for booking in bookings])).order_by(Booking.id).all()
+
+        logger.info("Promoted %d waitlist entries for slot %s (%d machine(s)): users %s",
+                    len(bookings), slot_id, machines,
+                    [booking.user_id for booking in bookings])
+
+        # Promotion emails are queued in the promotion's transaction
+        if notify:
+            send_waitlist_promotions(bookings)
         db.session.commit()
-        
-        # TODO: Send notification to promoted user
-        # from services.notifications import send_waitlist_promotion
-        # send_waitlist_promotion(waitlist_entry.user, booking)
-        
-        print(f"Promoted user {waitlist_entry.user_id} from waitlist for slot {slot_id}")
-        return True
-    
-    except Exception as e:
+        return bookings
+
+    except Exception:
         db.session.rollback()
-        print(f"Error promoting from waitlist: {str(e)}")
-        return False
+        logger.exception("Error promoting from waitlist")
+        return []
@@ -0,0 +1,147 @@
+"""
+Test the email outbox against a local aiosmtpd server
+Starts an SMTP stand-in on localhost, queues emails into a temporary
+SQLite database and checks that the worker pool delivers them over
+reused connections, retries temporary failures and dead-letters
+permanent ones
+
+Requires: pip install aiosmtpd
+Run: python test_email_outbox.py
+"""
+
+import os
+import tempfile
+import time
+
+from aiosmtpd.controller import Controller
+from flask import Flask
+from flask_mail import Mail
+from database import db, init_db
+from models import EmailOutbox, EmailStatus
+from services import email_outbox
+from services.email_outbox import EmailWorkerPool, enqueue_email, enqueue_template_email, outbox_stats
+
+SMTP_PORT = 8025
+
+
+class StandInHandler:
+    """Accepts mail, rejects 'bounce@' for good and 'flaky@' the first two times"""
+
+    def __init__(self):
+        self.delivered = []
+        self.messages = []
+        self.connections = 0
+        self.flaky_attempts = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.connections += 1
+        session.host_name = hostname
+        return responses
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address.startswith('bounce@'):
+            return '550 No such user'
+        if address.startswith('flaky@'):
+            self.flaky_attempts += 1
+            if self.flaky_attempts <= 2:
+                return '451 Try again later'
+        envelope.rcpt_tos.append(address)
+        return '250 OK'
+
+    async def handle_DATA(self, server, session, envelope):
+        self.delivered.extend(envelope.rcpt_tos)
+        self.messages.append(envelope.content.decode('utf-8', 'replace'))
+        return '250 Message accepted for delivery'
+
+
+def wait_for(condition, timeout=20):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_email_outbox():
+    print("\n=== Testing Email Outbox ===")
+
+    handler = StandInHandler()
+    controller = Controller(handler, hostname='127.0.0.1', port=SMTP_PORT)
+    controller.start()
+
+    app = Flask(__name__)
+    app.config.update(
+        MAIL_SERVER='127.0.0.1',
+        MAIL_PORT=SMTP_PORT,
+        MAIL_USE_TLS=False,
+        MAIL_DEFAULT_SENDER='noreply@laundry.test'
+    )
+    init_db(app, db_path=os.path.join(tempfile.mkdtemp(), 'outbox.db'))
+    mail = Mail(app)
+
+    # Fast retries so the test does not wait for real backoff
+    email_outbox.EMAIL_RETRY_BASE_SECONDS = 0.05
+    email_outbox.POLL_INTERVAL_SECONDS = 0.1
+
+    workers = EmailWorkerPool(app, mail, workers=2, batch_size=10)
+    failed = []
+
+    try:
+        with app.app_context():
+            for i in range(50):
+                enqueue_email(f'Booking {i}', [f'student{i}@aui.ma'], 'text', '<p>html</p>')
+            enqueue_email('Bounce', ['bounce@aui.ma'], 'text', '<p>html</p>')
+            enqueue_email('Flaky', ['flaky@aui.ma'], 'text', '<p>html</p>')
+            enqueue_template_email('booking_confirmation', ['templated@aui.ma'], {
+                'full_name': 'Test <Student>', 'ticket_id': 'T-1', 'date': '2025-03-10',
+                'start_time': '2025-03-10T09:10:00', 'end_time': '2025-03-10T10:10:00',
+                'pair_id': 2, 'load_type': 'separate_whites', 'machines_used': 2
+            })
+            db.session.commit()
+
+        workers.start()
+
+        def settled():
+            with app.app_context():
+                depth = outbox_stats()['queue_depth']
+                db.session.remove()
+                return depth['pending'] == 0 and depth['sending'] == 0
+
+        if not wait_for(settled):
+            print("❌ Outbox did not drain in time")
+            failed.append("outbox drained in time")
+
+        with app.app_context():
+            stats = outbox_stats()
+            bounce = EmailOutbox.query.filter_by(subject='Bounce').one()
+            flaky = EmailOutbox.query.filter_by(subject='Flaky').one()
+
+            print(f"Delivered: {len(handler.delivered)}, SMTP connections: {handler.connections}")
+            print(f"Stats: {stats}")
+
+            templated = [message for message in handler.messages if 'T-1' in message]
+
+            checks = [
+                (stats['queue_depth']['sent'] == 52, "52 emails marked sent"),
+                (len(handler.delivered) == 52, "52 emails received by the SMTP server"),
+                (handler.connections < 52, "SMTP connections reused across emails"),
+                (len(templated) == 1 and 'Booking Confirmed - Ticket #T-1' in templated[0],
+                 "templated email rendered by the worker"),
+                (bounce.status == EmailStatus.DEAD and bounce.attempts == 1, "550 rejection dead-lettered without retry"),
+                (flaky.status == EmailStatus.SENT and flaky.attempts == 3, "451 rejection retried until sent"),
+            ]
+            for ok, description in checks:
+                print(f"{'✓' if ok else '❌'} {description}")
+                if not ok:
+                    failed.append(description)
+    finally:
+        workers.stop()
+        controller.stop()
+
+    assert not failed, f"Email outbox checks failed: {', '.join(failed)}"
+    print("\n✅ Email outbox test passed!")
+
+
+if __name__ == '__main__':
+    test_email_outbox()
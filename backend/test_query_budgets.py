@@ -0,0 +1,21 @@
+"""
+Run check_query_budgets.py as a test, so a route that breaks its SQL
+budget fails the suite. The checker runs in its own process because it
+points DATABASE_URL at a scratch database before importing the app
+
+Run: python -m pytest test_query_budgets.py
+"""
+
+import os
+import subprocess
+import sys
+
+
+def test_query_budgets():
+    result = subprocess.run(
+        [sys.executable, 'check_query_budgets.py'],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True
+    )
+    assert result.returncode == 0, result.stdout + result.stderr
@@ -3,6 +3,9 @@ const API_BASE_URL = import.meta.env.MODE === 'development'
     ? '/api'
     : 'http://localhost:5000/api';
 
+// Delay before reopening a dropped live availability stream
+const LIVE_RECONNECT_MS = 3000;
+
 class ApiClient {
     constructor() {
         this.token = localStorage.getItem('token');
@@ -116,6 +119,16 @@ class ApiClient {
         return this.request('/bookings');
     }
 
+    // One page of bookings: { bookings, next_cursor, has_more, total? }
+    // Filters: date_from, date_to, status, pair_id, user_id; sort: 'slot' or 'created'; pass next_cursor as cursor
+    async getBookingsPage(filters = {}) {
+        const params = new URLSearchParams();
+        Object.entries(filters).forEach(([key, value]) => {
+            if (value !== undefined && value !== null && value !== '') params.append(key, value);
+        });
+        return this.request(`/bookings?${params}`);
+    }
+
     async createBooking(bookingData) {
         return this.request('/bookings', {
             method: 'POST',
@@ -136,6 +149,60 @@ class ApiClient {
         });
     }
 
+    // Admin
+    async getAdminStats(windows) {
+        const params = new URLSearchParams();
+        if (windows) params.append('windows', windows);
+        return this.request(`/admin/stats?${params}`);
+    }
+
+    // Short-lived token that only opens the live stream, so the login token never goes in a URL
+    async getLiveToken() {
+        const data = await this.request('/live/token', { method: 'POST' });
+        return data.token;
+    }
+
+    // Live availability (Server-Sent Events); returns { close }
+    // Every connection uses a fresh stream token: when the stream drops it is
+    // reopened with a new one instead of letting EventSource retry an expired URL
+    subscribeAvailability(dates, handlers = {}) {
+        let source = null;
+        let retryTimer = null;
+        let closed = false;
+
+        const reconnect = () => {
+            if (!closed) retryTimer = setTimeout(open, LIVE_RECONNECT_MS);
+        };
+
+        const open = async () => {
+            try {
+                const params = new URLSearchParams({ token: await this.getLiveToken() });
+                if (dates) params.append('date', dates);
+                if (closed) return;
+                source = new EventSource(`${API_BASE_URL}/live/availability?${params}`);
+                for (const [event, handler] of Object.entries(handlers)) {
+                    source.addEventListener(event, (e) => handler(JSON.parse(e.data)));
+                }
+                source.onerror = () => {
+                    source.close();
+                    reconnect();
+                };
+            } catch (err) {
+                console.error('Live availability unavailable:', err);
+                reconnect();
+            }
+        };
+
+        open();
+        return {
+            close() {
+                closed = true;
+                clearTimeout(retryTimer);
+                if (source) source.close();
+            },
+        };
+    }
+
     // Waitlist
     async getWaitlist() {
         return this.request('/waitlist');
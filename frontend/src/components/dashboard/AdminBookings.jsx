@@ -1,9 +1,14 @@
 import React, { useState, useEffect } from 'react';
 import apiClient from '../../api/client';
 
+const PAGE_SIZE = 50;
+
 const AdminBookings = () => {
     const [bookings, setBookings] = useState([]);
+    const [nextCursor, setNextCursor] = useState(null);
+    const [totalBookings, setTotalBookings] = useState(0);
     const [loading, setLoading] = useState(true);
+    const [loadingMore, setLoadingMore] = useState(false);
     const [filterStatus, setFilterStatus] = useState('all');
     const [filterDate, setFilterDate] = useState(() => {
         // Set today's date as default
@@ -15,14 +20,26 @@ const AdminBookings = () => {
 
     useEffect(() => {
         fetchBookings();
-    }, []);
+    }, [filterStatus, filterDate]);
+
+    // Status and date filters run on the server; pages are fetched by cursor
+    const fetchPage = (cursor) => apiClient.getBookingsPage({
+        limit: PAGE_SIZE,
+        count: cursor ? undefined : 'true',
+        status: filterStatus !== 'all' ? filterStatus : undefined,
+        date_from: filterDate,
+        date_to: filterDate,
+        cursor
+    });
 
     const fetchBookings = async () => {
         setLoading(true);
         try {
-            const bookingsData = await apiClient.getBookings();
+            const page = await fetchPage();
             // Backend already includes slot data in each booking
-            setBookings(bookingsData);
+            setBookings(page.bookings);
+            setNextCursor(page.next_cursor);
+            setTotalBookings(page.total);
         } catch (error) {
             console.error('Failed to fetch bookings:', error);
             setMessage({ type: 'error', text: 'Failed to load bookings' });
@@ -31,6 +48,20 @@ const AdminBookings = () => {
         }
     };
 
+    const loadMoreBookings = async () => {
+        setLoadingMore(true);
+        try {
+            const page = await fetchPage(nextCursor);
+            setBookings(prev => [...prev, ...page.bookings]);
+            setNextCursor(page.next_cursor);
+        } catch (error) {
+            console.error('Failed to fetch more bookings:', error);
+            setMessage({ type: 'error', text: 'Failed to load more bookings' });
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
     const handleUpdateStatus = async (bookingId, newStatus) => {
         try {
             await apiClient.updateBooking(bookingId, { status: newStatus });
@@ -87,13 +118,7 @@ const AdminBookings = () => {
     };
 
     const filteredBookings = bookings.filter(booking => {
-        // Status filter
-        if (filterStatus !== 'all' && booking.status !== filterStatus) return false;
-
-        // Date filter
-        if (filterDate && booking.date !== filterDate) return false;
-
-        // Search filter (user ID or ticket ID)
+        // Search filter (user ID or ticket ID) over the loaded pages
         if (searchQuery) {
             const query = searchQuery.toLowerCase();
             const userId = String(booking.user_id || '').toLowerCase();
@@ -236,7 +261,7 @@ const AdminBookings = () => {
                 fontSize: '14px',
                 color: '#666'
             }}>
-                Showing <strong>{filteredBookings.length}</strong> of <strong>{bookings.length}</strong> bookings
+                Showing <strong>{filteredBookings.length}</strong> of <strong>{totalBookings}</strong> bookings
                 {searchQuery && (
                     <span style={{ marginLeft: '8px' }}>
                         (search: "{searchQuery}")
@@ -489,6 +514,26 @@ const AdminBookings = () => {
                 ))
             )}
 
+            {!loading && nextCursor && (
+                <div style={{ textAlign: 'center', marginTop: '20px' }}>
+                    <button
+                        onClick={loadMoreBookings}
+                        disabled={loadingMore}
+                        style={{
+                            padding: '10px 20px',
+                            backgroundColor: '#007bff',
+                            color: 'white',
+                            border: 'none',
+                            borderRadius: '6px',
+                            cursor: loadingMore ? 'wait' : 'pointer',
+                            fontWeight: '500'
+                        }}
+                    >
+                        {loadingMore ? 'Loading...' : 'Load More'}
+                    </button>
+                </div>
+            )}
+
             <style>{`
                 @keyframes spin {
                     0% { transform: rotate(0deg); }
@@ -9,7 +9,9 @@ const AdminDashboardHome = () => {
         completedToday: 0,
         waitlistCount: 0,
         availableSlots: 0,
-        machinesInUse: 0
+        machinesInUse: 0,
+        utilizationToday: 0,
+        noShowRate: 0
     });
     const [recentBookings, setRecentBookings] = useState([]);
     const [loading, setLoading] = useState(true);
@@ -21,40 +23,24 @@ const AdminDashboardHome = () => {
     const fetchAdminStats = async () => {
         setLoading(true);
         try {
-            const [bookings, waitlist, slots] = await Promise.all([
-                apiClient.getBookings(),
-                apiClient.getWaitlist(),
-                apiClient.getTimeSlots()
+            // Counts are aggregated on the server; only 5 bookings are transferred
+            const [summary, recent] = await Promise.all([
+                apiClient.getAdminStats('7'),
+                apiClient.getBookingsPage({ limit: 5, sort: 'created' })
             ]);
 
-            const today = new Date().toISOString().split('T')[0];
-
-            const activeBookings = bookings.filter(b =>
-                ['confirmed', 'received', 'washing'].includes(b.status)
-            );
-
-            const completedToday = bookings.filter(b =>
-                b.status === 'completed' &&
-                b.created_at?.startsWith(today)
-            );
-
-            const availableSlots = slots.filter(s => s.available_machines > 0);
-
-            // Get recent bookings (last 5)
-            const recent = bookings
-                .sort((a, b) => new Date(b.created_at) - new Date(a.created_at))
-                .slice(0, 5);
-
             setStats({
-                totalBookings: bookings.length,
-                activeBookings: activeBookings.length,
-                completedToday: completedToday.length,
-                waitlistCount: waitlist.length,
-                availableSlots: availableSlots.length,
-                machinesInUse: activeBookings.reduce((sum, b) => sum + b.machines_used, 0)
+                totalBookings: summary.bookings.total,
+                activeBookings: summary.bookings.active,
+                completedToday: summary.bookings.completed_today,
+                waitlistCount: summary.waitlist.waiting,
+                availableSlots: summary.open_upcoming_slots,
+                machinesInUse: summary.bookings.machines_in_use,
+                utilizationToday: Math.round(summary.today.utilization * 100),
+                noShowRate: Math.round(summary.no_show_rate['7d'].rate * 100)
             });
 
-            setRecentBookings(recent);
+            setRecentBookings(recent.bookings);
         } catch (error) {
             console.error('Failed to fetch admin stats:', error);
         } finally {
@@ -138,6 +124,22 @@ const AdminDashboardHome = () => {
                         <p>Machines In Use</p>
                     </div>
                 </div>
+
+                <div className="stat-card" style={{ borderLeft: '4px solid #20c997' }}>
+                    <div className="stat-icon" style={{ fontSize: '32px' }}>📈</div>
+                    <div className="stat-info">
+                        <h3>{stats.utilizationToday}%</h3>
+                        <p>Utilization Today</p>
+                    </div>
+                </div>
+
+                <div className="stat-card" style={{ borderLeft: '4px solid #dc3545' }}>
+                    <div className="stat-icon" style={{ fontSize: '32px' }}>🚫</div>
+                    <div className="stat-info">
+                        <h3>{stats.noShowRate}%</h3>
+                        <p>No-Show Rate (7 days)</p>
+                    </div>
+                </div>
             </div>
 
             {/* Recent Bookings */}
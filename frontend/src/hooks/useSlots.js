@@ -12,8 +12,26 @@ export const useSlots = (date, pairId = null) => {
         }
     }, [date, pairId]);
 
-    const fetchSlots = async () => {
-        setLoading(true);
+    // Live capacity for the selected date; a reconnect refetches the list
+    useEffect(() => {
+        if (!date) return undefined;
+
+        let connected = false;
+        const subscription = apiClient.subscribeAvailability(date, {
+            ready: () => {
+                if (connected) fetchSlots(false);
+                connected = true;
+            },
+            slot: applySlotChange,
+            machine: () => fetchSlots(false),
+            // Committed by another server process: no delta, refetch instead
+            refresh: () => fetchSlots(false),
+        });
+        return () => subscription.close();
+    }, [date, pairId]);
+
+    const fetchSlots = async (showLoading = true) => {
+        if (showLoading) setLoading(true);
         setError(null);
 
         try {
@@ -28,6 +46,18 @@ export const useSlots = (date, pairId = null) => {
         }
     };
 
+    // Same fields as /api/timeslots computes for the slot
+    const applySlotChange = (change) => {
+        setSlots((current) => current.map((slot) => (slot.id !== change.slot_id ? slot : {
+            ...slot,
+            available_machines: change.available_machines,
+            total_machines: change.total_machines,
+            is_disabled: change.is_disabled,
+            is_full: change.available_machines === 0 && !change.is_disabled && change.total_machines > 0,
+            machines_in_maintenance: change.total_machines === 0,
+        })));
+    };
+
     const createBooking = async (bookingData) => {
         try {
             const response = await apiClient.createBooking(bookingData);